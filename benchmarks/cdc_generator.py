@@ -0,0 +1,70 @@
+from pyspark.sql.functions import col, concat, expr, lit, rand, when
+
+from cdc_schemas import SOURCE_COLUMNS
+
+
+BASE_TS_MS = 1706000000000
+
+CATEGORIES = ["electronics", "books", "home", "toys", "sports"]
+STATUSES = ["pending", "confirmed", "shipped", "delivered"]
+
+
+def _pick(values, column):
+    # values[column % len(values)] as a column
+    return expr(f"element_at(array({', '.join(repr(v) for v in values)}), cast({column} % {len(values)} AS INT) + 1)")
+
+
+def _source_values(table, entities):
+    # Column expressions over an `id` column, one per SOURCE_COLUMNS entry
+    if table == "users":
+        values = {
+            "name": concat(lit("user_"), col("id")),
+            "email": concat(lit("user_"), col("id"), lit("@"),
+                            _pick(["gmail.com", "yahoo.com", "corp.com"], "id")),
+        }
+    elif table == "products":
+        values = {
+            "name": concat(lit("product_"), col("id")),
+            "price": (rand(3) * 400).cast("double"),
+            "category": _pick(CATEGORIES, "id"),
+        }
+    elif table == "orders":
+        values = {
+            "user_id": col("id") % max(1, entities // 5),
+            "product_id": col("id") % max(1, entities // 50),
+            "quantity": (rand(5) * 5 + 1).cast("int"),
+            "total_amount": (rand(7) * 800).cast("double"),
+            "status": _pick(STATUSES, "event"),
+        }
+    else:
+        raise ValueError(f"Unknown CDC table: {table}")
+
+    values["id"] = col("id")
+    values["created_at"] = lit(BASE_TS_MS) + col("id")
+    values["updated_at"] = col("__ts_ms")
+    return [values[name].cast(sql_type.lower()).alias(name)
+            for name, sql_type in SOURCE_COLUMNS[table]]
+
+
+def cdc_events(spark, table, records, update_ratio=0.3, delete_ratio=0.02):
+    # The first `entities` events create each id once; the rest update or delete
+    # an existing id, in ts_ms order, as ExtractNewRecordState would emit them.
+    entities = max(1, int(records * (1 - update_ratio - delete_ratio)))
+    events = spark.range(records).withColumnRenamed("id", "event") \
+        .withColumn("id", col("event") % entities) \
+        .withColumn("__op", when(col("event") < entities, lit("c"))
+                    .when(rand(11) < delete_ratio / max(update_ratio + delete_ratio, 1e-9), lit("d"))
+                    .otherwise(lit("u")))
+    # Several changes share each millisecond, as within one transaction; the LSN orders them
+    events = events.withColumn("__ts_ms", lit(BASE_TS_MS) + (col("event") / 4).cast("long")) \
+        .withColumn("__source_lsn", lit(20000000) + col("event") * 64)
+    return events.select(*_source_values(table, entities), col("__op"), col("__ts_ms"), col("__source_lsn"))
+
+
+def write_raw(spark, raw_root, table, records, files, update_ratio=0.3, delete_ratio=0.02):
+    # NDJSON objects under raw/{table}/, the layout the S3 sink connector produces
+    path = f"{raw_root}/{table}/batch_{records}"
+    cdc_events(spark, table, records, update_ratio, delete_ratio) \
+        .repartition(files) \
+        .write.mode("overwrite").json(path)
+    return path
@@ -0,0 +1,83 @@
+import argparse
+import json
+import os
+import time
+
+from local_spark import create_local_spark
+
+from pyspark.sql.functions import col, row_number
+from pyspark.sql.window import Window
+
+from cdc_collapse import collapse_latest, collapse_stats
+from cdc_generator import cdc_events
+from job_metrics import RunMetrics
+
+
+def window_dedup(df):
+    # The pre-collapse implementation: full sort of every id's changes
+    return df.withColumn("row_num", row_number().over(
+        Window.partitionBy("id").orderBy(col("ts_ms").desc())
+    )).filter("row_num = 1").drop("row_num")
+
+
+def run_case(spark, metrics, events, update_ratio, method):
+    df = cdc_events(spark, "orders", events, update_ratio, 0.02) \
+        .withColumnRenamed("__op", "op") \
+        .withColumnRenamed("__ts_ms", "ts_ms") \
+        .withColumnRenamed("__source_lsn", "source_lsn") \
+        .cache()
+    df.count()
+
+    label = f"{method}_{events}_{update_ratio}"
+    started = time.time()
+    with metrics.stage(label):
+        if method == "window":
+            keys = window_dedup(df).count()
+        else:
+            keys = collapse_stats(collapse_latest(df, ["id"]))["keys"]
+    seconds = time.time() - started
+    df.unpersist()
+
+    time.sleep(1)  # let the listener bus deliver the stage-completed events
+    spark_metrics = [s for s in metrics.document()["stages"] if s["label"] == label][0]["spark"]
+    return {
+        "events": events,
+        "update_ratio": update_ratio,
+        "method": method,
+        "keys": keys,
+        "seconds": round(seconds, 3),
+        "shuffle_write_bytes": spark_metrics["shuffle_write_bytes"],
+        "spill_bytes": spark_metrics["memory_spill_bytes"] + spark_metrics["disk_spill_bytes"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latest-state dedup: row_number window vs struct-max collapse")
+    parser.add_argument("--events", default="1000000,10000000")
+    parser.add_argument("--update-ratios", default="0.3,0.9")
+    parser.add_argument("--warehouse", default="/tmp/cdc-bench-warehouse")
+    parser.add_argument("--output", default=os.path.join(os.path.dirname(__file__), "results", "collapse_dedup.json"))
+    args = parser.parse_args()
+
+    spark = create_local_spark(args.warehouse, "collapse-dedup")
+    metrics = RunMetrics(spark, "collapse-dedup")
+
+    results = []
+    for events in [int(e) for e in args.events.split(",")]:
+        for update_ratio in [float(r) for r in args.update_ratios.split(",")]:
+            for method in ["window", "collapse"]:
+                result = run_case(spark, metrics, events, update_ratio, method)
+                print(json.dumps(result))
+                results.append(result)
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    metrics.close()
+    spark.stop()
+
+
+if __name__ == "__main__":
+    main()
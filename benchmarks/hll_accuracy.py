@@ -0,0 +1,92 @@
+import argparse
+import json
+import os
+import time
+
+from local_spark import create_local_spark
+
+from pyspark.sql.functions import col, countDistinct, date_add, date_format, date_trunc, floor, lit, \
+    pow as pow_, rand, to_date
+
+from hll_sketch import hll_error_bound, hll_estimate, hll_merge, hll_sketch
+
+
+def synthetic_orders(spark, orders, users, days):
+    # Skewed customers (a few order daily, most rarely) spread over `days` days
+    return spark.range(orders).select(
+        floor(pow_(rand(7), lit(2)) * users).cast("long").alias("user_id"),
+        date_format(date_add(to_date(lit("2024-01-01")), (col("id") % days).cast("int")), "yyyy-MM-dd").alias("date_key"),
+    )
+
+
+def with_period(df, grain):
+    if grain == "day":
+        return df.withColumn("period_start", col("date_key"))
+    return df.withColumn("period_start", date_format(date_trunc(grain, to_date("date_key")), "yyyy-MM-dd"))
+
+
+def measure(orders_df, daily_df, grain, precision):
+    started = time.time()
+    exact = with_period(orders_df, grain).groupBy("period_start") \
+        .agg(countDistinct("user_id").alias("exact")).collect()
+    exact_seconds = time.time() - started
+
+    # Coarser periods come from the daily sketches alone, as the gold rollups do
+    started = time.time()
+    merged = daily_df if grain == "day" else hll_merge(with_period(daily_df, grain), ["period_start"], "customer_sketch",
+                                                       precision, "customer_sketch")
+    estimates = merged.select(col("date_key" if grain == "day" else "period_start").alias("period_start"),
+                              hll_estimate("customer_sketch").alias("estimate")).collect()
+    sketch_seconds = time.time() - started
+
+    exact_by_period = {row["period_start"]: row["exact"] for row in exact}
+    errors = sorted(abs(row["estimate"] - exact_by_period[row["period_start"]]) / exact_by_period[row["period_start"]]
+                    for row in estimates)
+    bound = hll_error_bound(precision)
+    return {
+        "grain": grain,
+        "precision": precision,
+        "periods": len(errors),
+        "standard_error_bound": round(bound, 5),
+        "mean_relative_error": round(sum(errors) / len(errors), 5),
+        "p95_relative_error": round(errors[int(0.95 * (len(errors) - 1))], 5),
+        "max_relative_error": round(errors[-1], 5),
+        "within_2_sigma": round(sum(1 for e in errors if e <= 2 * bound) / len(errors), 4),
+        "exact_seconds": round(exact_seconds, 3),
+        "sketch_seconds": round(sketch_seconds, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HyperLogLog unique-customer estimates vs exact distinct counts "
+                                                 "per day, week and month")
+    parser.add_argument("--orders", type=int, default=20000000)
+    parser.add_argument("--users", type=int, default=2000000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--precisions", default="10,12,14")
+    parser.add_argument("--warehouse", default="/tmp/cdc-bench-warehouse")
+    parser.add_argument("--output", default=os.path.join(os.path.dirname(__file__), "results", "hll_accuracy.json"))
+    args = parser.parse_args()
+
+    spark = create_local_spark(args.warehouse, "hll-accuracy")
+    orders_df = synthetic_orders(spark, args.orders, args.users, args.days).localCheckpoint()
+
+    results = []
+    for precision in [int(p) for p in args.precisions.split(",")]:
+        daily_df = hll_sketch(orders_df, ["date_key"], "user_id", precision, "customer_sketch").localCheckpoint()
+        for grain in ["day", "week", "month"]:
+            result = measure(orders_df, daily_df, grain, precision)
+            results.append(result)
+            print(json.dumps(result))
+
+    # The error bound itself is asserted by tests/test_hll_sketch.py
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump({"orders": args.orders, "users": args.users, "days": args.days, "results": results}, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    spark.stop()
+
+
+if __name__ == "__main__":
+    main()
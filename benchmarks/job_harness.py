@@ -0,0 +1,200 @@
+import argparse
+import importlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+from local_spark import REPO_ROOT, create_local_spark
+
+from pyspark import StorageLevel
+
+from cdc_generator import write_raw
+from cdc_schemas import CORRUPT_RECORD_COLUMN
+from iceberg_maintenance import MaintenancePolicy, run_action
+from raw_manifest import record_raw_batch
+
+
+DATABASE = "bench_jobs"
+JOB_ARGS = ["--JOB_NAME", "local-bench", "--DATABASE_NAME", DATABASE, "--S3_BUCKET", "local-bench"]
+GOLD_STAGES = ["user_analytics", "product_analytics", "sales_summary"]
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, text=True).strip()
+    except Exception:
+        return None
+
+
+def import_job(module_name, work_dir):
+    # The jobs read their options from sys.argv at import time, as in Glue
+    sys.argv = [module_name] + JOB_ARGS + [
+        "--RAW_PATH", f"file://{work_dir}/raw",
+        "--CHECKPOINT_PATH", f"file://{work_dir}/checkpoints",
+        "--RUN_LAYERS", "bronze,silver",
+        "--METRICS_SINK", "none",
+    ]
+    if module_name in sys.modules:
+        return importlib.reload(sys.modules[module_name])
+    return importlib.import_module(module_name)
+
+
+def reset(spark, work_dir):
+    spark.sql(f"CREATE DATABASE IF NOT EXISTS glue_catalog.{DATABASE}")
+    for row in spark.sql(f"SHOW TABLES IN glue_catalog.{DATABASE}").collect():
+        spark.sql(f"DROP TABLE IF EXISTS glue_catalog.{DATABASE}.{row['tableName']} PURGE")
+    shutil.rmtree(work_dir, ignore_errors=True)
+    os.makedirs(work_dir)
+
+
+def timed_stage(results, base, stage, fn):
+    started = time.time()
+    result = dict(base, stage=stage)
+    try:
+        records = fn()
+        result["records"] = records
+    except Exception as e:
+        result["error"] = str(e).splitlines()[0]
+        records = None
+    result["seconds"] = round(time.time() - started, 3)
+    if records:
+        result["records_per_second"] = round(records / max(result["seconds"], 1e-3), 1)
+    print(json.dumps(result))
+    results.append(result)
+    return records
+
+
+def run_cdc(spark, cdc, results, base, table):
+    base = dict(base, table=table)
+    cdc.create_bronze_table(table)
+    cdc.create_silver_table(table)
+    state = {}
+
+    def read():
+        state["raw_batch"] = cdc.find_raw_batch(table)
+        state["df"], record_count = cdc.materialize_batch(cdc.read_cdc(table, state["raw_batch"]), table)
+        return record_count
+
+    def bronze_append():
+        cdc.write_bronze(state["df"].drop(CORRUPT_RECORD_COLUMN), table, state["raw_batch"])
+        record_raw_batch(spark, cdc.MANIFEST_TABLE, state["raw_batch"])
+        records = state["df"].count()
+        cdc.release_batch(state["df"])
+        return records
+
+    def dedup():
+        state["changes"], state["end_snapshot"] = cdc.read_bronze_changes(table)
+        state["changes"] = state["changes"].persist(StorageLevel.MEMORY_AND_DISK)
+        state["latest"] = cdc.silver_source(state["changes"], table).persist(StorageLevel.MEMORY_AND_DISK)
+        state["latest"].count()
+        return state["changes"].count()
+
+    def merge():
+        # The job's own path: collapse, unchanged-row skip and stats, MERGE, watermark
+        records = state["latest"].count()
+        state["latest"].unpersist()
+        cdc.apply_silver_changes(state["changes"], table, {cdc.SILVER_WATERMARK_PROPERTY: state["end_snapshot"]})
+        state["changes"].unpersist()
+        return records
+
+    def compaction():
+        policy = MaintenancePolicy(min_small_files=1)
+        records = 0
+        for layer in ["bronze", "silver"]:
+            table_identifier = f"glue_catalog.{DATABASE}.{layer}_{table}"
+            run_action(spark, table_identifier, "rewrite_data_files", {}, policy)
+            records += spark.sql(f"SELECT COUNT(*) FROM {table_identifier}").collect()[0][0]
+        return records
+
+    for stage, fn in [("read", read), ("bronze_append", bronze_append), ("dedup", dedup),
+                      ("merge", merge), ("compaction", compaction)]:
+        if timed_stage(results, base, stage, fn) is None:
+            # Later stages depend on this one's output
+            break
+
+
+def run_gold(spark, gold, results, base):
+    silver_orders = f"glue_catalog.{DATABASE}.silver_orders"
+    orders = spark.read.table(silver_orders).count() if spark.catalog.tableExists(silver_orders) else 0
+
+    for stage in GOLD_STAGES:
+        process = getattr(gold, f"process_{stage}")
+
+        def run():
+            process()
+            return orders
+
+        timed_stage(results, dict(base, table=f"gold_{stage}"), "gold", run)
+
+
+def load_baseline(path):
+    with open(path) as f:
+        return {(r["records_target"], r["table"], r["stage"]): r for r in json.load(f)["results"]}
+
+
+def compare(results, baseline):
+    for r in results:
+        old = baseline.get((r["records_target"], r["table"], r["stage"]))
+        if old and old.get("seconds") and r.get("seconds"):
+            change = (r["seconds"] - old["seconds"]) / old["seconds"] * 100
+            print(f"{r['records_target']:>10} {r['table']:<24} {r['stage']:<14} "
+                  f"{old['seconds']:>9.3f}s -> {r['seconds']:>9.3f}s ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stage timings for the CDC and Gold jobs on local Spark")
+    parser.add_argument("--records", default="100000,1000000")
+    parser.add_argument("--tables", default="users,products,orders")
+    parser.add_argument("--files", type=int, default=50, help="raw objects per table")
+    parser.add_argument("--update-ratio", type=float, default=0.3)
+    parser.add_argument("--delete-ratio", type=float, default=0.02)
+    parser.add_argument("--warehouse", default="/tmp/cdc-bench-warehouse")
+    parser.add_argument("--work-dir", default="/tmp/cdc-bench-jobs")
+    parser.add_argument("--output", default=os.path.join(os.path.dirname(__file__), "results", "job_harness.json"))
+    parser.add_argument("--compare", help="previous results file to diff stage times against")
+    args = parser.parse_args()
+
+    # Read first: the baseline is usually the file this run is about to overwrite
+    baseline = load_baseline(args.compare) if args.compare else None
+
+    spark = create_local_spark(args.warehouse, "cdc-job-harness", {"spark.scheduler.mode": "FAIR"})
+    tables = [t.strip() for t in args.tables.split(",")]
+
+    results = []
+    for records in [int(r) for r in args.records.split(",")]:
+        reset(spark, args.work_dir)
+        for table in tables:
+            write_raw(spark, f"{args.work_dir}/raw", table, records, args.files,
+                      args.update_ratio, args.delete_ratio)
+
+        base = {"records_target": records}
+        cdc = import_job("cdc_processor", args.work_dir)
+        for table in tables:
+            run_cdc(spark, cdc, results, base, table)
+
+        gold = import_job("gold_processor", args.work_dir)
+        run_gold(spark, gold, results, base)
+
+    output = {
+        "commit": git_commit(),
+        "run_at": datetime.now(timezone.utc).isoformat(),
+        "spark_version": spark.version,
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(output, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if baseline:
+        compare(results, baseline)
+
+    spark.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+import os
+import sys
+
+from pyspark.sql import SparkSession
+
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GLUE_DIR = os.path.join(REPO_ROOT, "glue")
+
+# Make the Glue helper modules (cdc_schemas, iceberg_tables, ...) importable
+if GLUE_DIR not in sys.path:
+    sys.path.insert(0, GLUE_DIR)
+
+ICEBERG_PACKAGE = os.getenv(
+    "ICEBERG_SPARK_PACKAGE", "org.apache.iceberg:iceberg-spark-runtime-3.3_2.12:1.4.3"
+)
+
+
+def create_local_spark(warehouse, app_name="cdc-benchmark", extra_conf=None):
+    # The catalog keeps the glue_catalog name the jobs use, but is a Hadoop
+    # catalog on local disk so nothing needs AWS credentials.
+    builder = SparkSession.builder \
+        .appName(app_name) \
+        .master(os.getenv("SPARK_MASTER", "local[*]")) \
+        .config("spark.jars.packages", ICEBERG_PACKAGE) \
+        .config("spark.sql.extensions", "org.apache.iceberg.spark.extensions.IcebergSparkSessionExtensions") \
+        .config("spark.sql.catalog.glue_catalog", "org.apache.iceberg.spark.SparkCatalog") \
+        .config("spark.sql.catalog.glue_catalog.type", "hadoop") \
+        .config("spark.sql.catalog.glue_catalog.warehouse", os.path.abspath(warehouse)) \
+        .config("spark.driver.memory", os.getenv("SPARK_DRIVER_MEMORY", "4g")) \
+        .config("spark.ui.showConsoleProgress", "false")
+
+    for key, value in (extra_conf or {}).items():
+        builder = builder.config(key, value)
+
+    spark = builder.getOrCreate()
+    spark.sparkContext.setLogLevel("WARN")
+    return spark
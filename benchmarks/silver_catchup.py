@@ -0,0 +1,139 @@
+import argparse
+import importlib
+import json
+import math
+import os
+import shutil
+import sys
+
+from local_spark import create_local_spark
+
+from pyspark.sql.functions import col
+
+from cdc_generator import cdc_events
+
+
+DATABASE = "bench_catchup"
+TABLE = "orders"
+
+
+def import_cdc(work_dir, chunk_bytes):
+    sys.argv = ["cdc_processor", "--JOB_NAME", "catchup-bench", "--DATABASE_NAME", DATABASE,
+                "--S3_BUCKET", "local-bench", "--RAW_PATH", f"file://{work_dir}/raw",
+                "--CHECKPOINT_PATH", f"file://{work_dir}/checkpoints", "--METRICS_SINK", "none",
+                "--SPARK_TUNING", "off", "--CATCHUP_CHUNK_BYTES", str(chunk_bytes)]
+    if "cdc_processor" in sys.modules:
+        return importlib.reload(sys.modules["cdc_processor"])
+    return importlib.import_module("cdc_processor")
+
+
+def build_backlog(spark, cdc, work_dir, records, batches, files):
+    # One Bronze append per batch, as hourly runs with RUN_LAYERS=bronze would leave them
+    events = cdc_events(spark, TABLE, records)
+    per_batch = math.ceil(records / batches)
+    for batch in range(batches):
+        lsn_from = 20000000 + batch * per_batch * 64
+        events.filter((col("__source_lsn") >= lsn_from) & (col("__source_lsn") < lsn_from + per_batch * 64)) \
+            .repartition(files).write.mode("overwrite").json(f"{work_dir}/raw/{TABLE}/batch_{batch:04d}")
+        cdc.ingest_bronze(TABLE)
+
+
+def reset_silver(spark, cdc):
+    spark.sql(f"DROP TABLE IF EXISTS glue_catalog.{DATABASE}.silver_{TABLE} PURGE")
+    cdc.create_silver_table(TABLE)
+
+
+def merge_stages(cdc):
+    return [s for s in cdc.metrics.document()["stages"] if s["stage"] == "merge_silver"]
+
+
+def run_catchup(spark, cdc, chunk_bytes, fail_after=None):
+    reset_silver(spark, cdc)
+    cdc.CATCHUP_CHUNK_BYTES = chunk_bytes
+    cdc.metrics.flush()
+
+    failed = False
+    if fail_after is not None:
+        # Simulates the job dying mid-backlog: the MERGE after `fail_after` chunks raises
+        merge_silver, calls = cdc.merge_silver, []
+
+        def failing_merge(latest_src, table):
+            if len(calls) == fail_after:
+                raise RuntimeError("injected failure")
+            calls.append(table)
+            return merge_silver(latest_src, table)
+
+        cdc.merge_silver = failing_merge
+        try:
+            cdc.update_silver(TABLE)
+        except RuntimeError:
+            failed = True
+        finally:
+            cdc.merge_silver = merge_silver
+
+    cdc.update_silver(TABLE)
+    stages = merge_stages(cdc)
+    return {
+        "chunk_bytes": chunk_bytes,
+        "resumed_after_failure": failed,
+        "merges": len(stages),
+        "seconds": round(sum(s["seconds"] for s in stages), 3),
+        "max_shuffle_write_bytes": max((s["spark"]["shuffle_write_bytes"] for s in stages), default=0),
+        "max_spill_bytes": max((s["spark"]["memory_spill_bytes"] + s["spark"]["disk_spill_bytes"] for s in stages), default=0),
+    }
+
+
+def silver_rows(spark):
+    return spark.sql(f"SELECT id, is_active, ts_ms FROM glue_catalog.{DATABASE}.silver_{TABLE}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Silver backlog catch-up: one MERGE vs bounded chunks, with a resume check")
+    parser.add_argument("--records", type=int, default=2000000)
+    parser.add_argument("--batches", type=int, default=12, help="Bronze appends in the backlog")
+    parser.add_argument("--files", type=int, default=8, help="raw objects per batch")
+    parser.add_argument("--chunks", type=int, default=4, help="target number of catch-up chunks")
+    parser.add_argument("--warehouse", default="/tmp/cdc-bench-warehouse")
+    parser.add_argument("--work-dir", default="/tmp/cdc-bench-catchup")
+    parser.add_argument("--output", default=os.path.join(os.path.dirname(__file__), "results", "silver_catchup.json"))
+    args = parser.parse_args()
+
+    shutil.rmtree(args.work_dir, ignore_errors=True)
+    spark = create_local_spark(args.warehouse, "silver-catchup")
+    spark.sql(f"CREATE DATABASE IF NOT EXISTS glue_catalog.{DATABASE}")
+    for layer in ["bronze", "silver"]:
+        spark.sql(f"DROP TABLE IF EXISTS glue_catalog.{DATABASE}.{layer}_{TABLE} PURGE")
+    spark.sql(f"DROP TABLE IF EXISTS glue_catalog.{DATABASE}.raw_ingest_manifest PURGE")
+
+    cdc = import_cdc(args.work_dir, 0)
+    cdc.create_bronze_table(TABLE)
+    build_backlog(spark, cdc, args.work_dir, args.records, args.batches, args.files)
+    bronze_bytes = cdc.table_stats(spark, f"glue_catalog.{DATABASE}.bronze_{TABLE}").bytes
+    chunk_bytes = math.ceil(bronze_bytes / args.chunks)
+
+    results = [run_catchup(spark, cdc, 0)]
+    expected = silver_rows(spark).localCheckpoint()
+    results.append(run_catchup(spark, cdc, chunk_bytes))
+    # A snapshot larger than the budget is merged in id hash ranges
+    results.append(run_catchup(spark, cdc, max(1, chunk_bytes // args.batches)))
+    results.append(run_catchup(spark, cdc, chunk_bytes, fail_after=2))
+
+    failures = []
+    if silver_rows(spark).exceptAll(expected).count() or expected.exceptAll(silver_rows(spark)).count():
+        failures.append("Chunked catch-up after a failure differs from the single MERGE")
+    for result in results:
+        print(json.dumps(result))
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump({"bronze_bytes": bronze_bytes, "results": results, "failures": failures}, f, indent=2)
+    print(f"Results written to {args.output}")
+    for failure in failures:
+        print(failure)
+
+    spark.stop()
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
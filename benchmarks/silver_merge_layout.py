@@ -0,0 +1,131 @@
+import argparse
+import json
+import os
+import time
+
+from local_spark import create_local_spark
+
+from pyspark import StorageLevel
+from pyspark.sql.functions import col, current_timestamp, expr, lit, rand, when
+
+from iceberg_tables import current_snapshot_id, latest_snapshot_summary, set_table_properties
+from job_harness import import_job
+from table_stats import active_rows_properties
+
+
+def load_silver_orders(spark, cdc, rows, layout, buckets):
+    # The job creates the table, so the layout, write order and MERGE mode are its own
+    target = f"glue_catalog.{cdc.DATABASE}.silver_orders"
+    spark.sql(f"DROP TABLE IF EXISTS {target} PURGE")
+    cdc.SILVER_LAYOUT, cdc.SILVER_BUCKETS = layout, buckets
+    cdc.create_silver_table("orders")
+
+    # Thirty load days so the days layout has history to scan, as in production
+    spark.range(rows).select(
+        col("id"),
+        (col("id") % 100000).alias("user_id"),
+        (col("id") % 5000).alias("product_id"),
+        lit(1).alias("quantity"),
+        (rand(7) * 800).alias("total_amount"),
+        lit("pending").alias("status"),
+        (lit(1706000000000) + col("id")).alias("created_at"),
+        lit("Small").alias("order_value_category"),
+        lit(True).alias("is_active"),
+        lit("c").alias("op"),
+        (lit(1706000000000) + col("id")).alias("ts_ms"),
+        lit(None).cast("bigint").alias("source_lsn"),
+        expr("timestamp_seconds(1706000000 + (id % 30) * 86400)").alias("processed_at"),
+        current_timestamp().alias("_audit_updated_at"),
+        lit(None).cast("bigint").alias("_row_hash")
+    ).writeTo(target).append()
+    # A maintained active-row counter, as after any earlier run, so the MERGE is not timed with a recount
+    set_table_properties(spark, target, active_rows_properties(rows, current_snapshot_id(spark, target)))
+    return target
+
+
+def change_batch(spark, rows, update_fraction, inserts):
+    # Bronze-shaped changes, as apply_silver_changes reads them from the Bronze delta
+    updates = spark.range(rows).sample(fraction=update_fraction, seed=11)
+    new_rows = spark.range(rows, rows + inserts)
+    return updates.unionByName(new_rows).select(
+        col("id"),
+        (col("id") % 100000).alias("user_id"),
+        (col("id") % 5000).alias("product_id"),
+        lit(1).alias("quantity"),
+        (rand(5) * 800).alias("total_amount"),
+        when(col("id") < rows, lit("shipped")).otherwise(lit("pending")).alias("status"),
+        (lit(1706000000000) + col("id")).alias("created_at"),
+        (lit(1800000000000) + col("id")).alias("updated_at"),
+        when(col("id") < rows, lit("u")).otherwise(lit("c")).alias("op"),
+        (lit(1800000000000) + col("id")).alias("ts_ms"),
+        lit(None).cast("bigint").alias("source_lsn"),
+        current_timestamp().alias("processed_at")
+    )
+
+
+def file_count(spark, target):
+    return spark.sql(f"SELECT COUNT(*) FROM {target}.files").collect()[0][0]
+
+
+def run_case(spark, cdc, rows, layout, buckets, update_fraction, inserts):
+    target = load_silver_orders(spark, cdc, rows, layout, buckets)
+    files_before = file_count(spark, target)
+
+    changes = change_batch(spark, rows, update_fraction, inserts).persist(StorageLevel.MEMORY_AND_DISK)
+    src_rows = changes.count()
+
+    # The job's own path: collapse, unchanged-row skip and stats, MERGE
+    started = time.time()
+    cdc.apply_silver_changes(changes, "orders", {"bench.layout": layout})
+    merge_seconds = time.time() - started
+
+    summary = latest_snapshot_summary(spark, target)
+    changes.unpersist()
+    return {
+        "rows": rows,
+        "layout": layout,
+        "source_rows": src_rows,
+        "merge_seconds": round(merge_seconds, 3),
+        "files_before": files_before,
+        "files_rewritten": int(summary.get("deleted-data-files", 0)),
+        "files_added": int(summary.get("added-data-files", 0)),
+        "bytes_rewritten": int(summary.get("removed-files-size", 0)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Silver MERGE time: days(processed_at) vs bucket(N, id) layout")
+    parser.add_argument("--rows", default="1000000,10000000,100000000")
+    parser.add_argument("--buckets", type=int, default=16)
+    parser.add_argument("--update-fraction", type=float, default=0.001)
+    parser.add_argument("--inserts", type=int, default=1000)
+    parser.add_argument("--warehouse", default="/tmp/cdc-bench-warehouse")
+    parser.add_argument("--work-dir", default="/tmp/cdc-bench-merge-layout")
+    parser.add_argument("--output",
+                        default=os.path.join(os.path.dirname(__file__), "results", "silver_merge_layout.json"))
+    args = parser.parse_args()
+
+    spark = create_local_spark(args.warehouse, "silver-merge-layout", {
+        "spark.sql.sources.v2.bucketing.enabled": "true",
+        "spark.sql.iceberg.planning.preserve-data-grouping": "true",
+        "spark.sql.requireAllClusterKeysForCoPartition": "false",
+    })
+    cdc = import_job("cdc_processor", args.work_dir)
+
+    results = []
+    for rows in [int(r) for r in args.rows.split(",")]:
+        for layout in ["days", "bucket"]:
+            result = run_case(spark, cdc, rows, layout, args.buckets, args.update_fraction, args.inserts)
+            print(json.dumps(result))
+            results.append(result)
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    spark.stop()
+
+
+if __name__ == "__main__":
+    main()
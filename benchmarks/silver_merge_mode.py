@@ -0,0 +1,117 @@
+import argparse
+import json
+import os
+import time
+
+from local_spark import create_local_spark
+
+from pyspark.sql.functions import col, current_timestamp, lit
+
+from cdc_schemas import merge_mode_properties
+from iceberg_tables import latest_snapshot_summary, set_table_properties
+from silver_merge_layout import DATABASE, load_silver_orders
+
+
+# Mirrors the orders update pattern: most changes only move status forward
+STATUS_MERGE_SQL = """
+    MERGE INTO {target} AS tgt
+    USING status_src AS src
+    ON tgt.id = src.src_id
+    WHEN MATCHED AND src.src_ts_ms > tgt.ts_ms THEN
+        UPDATE SET status = src.src_status, op = 'u', ts_ms = src.src_ts_ms,
+                   processed_at = src.processed_at, _audit_updated_at = current_timestamp()
+"""
+
+STATUSES = ["confirmed", "shipped", "delivered"]
+
+
+def status_batch(spark, rows, update_fraction, round_index):
+    return spark.range(rows).sample(fraction=update_fraction, seed=100 + round_index).select(
+        col("id").alias("src_id"),
+        lit(STATUSES[round_index % len(STATUSES)]).alias("src_status"),
+        (lit(1800000000000 + round_index * 1000000) + col("id")).alias("src_ts_ms"),
+        current_timestamp().alias("processed_at")
+    )
+
+
+def run_mode(spark, rows, mode, rounds, update_fraction, layout, buckets):
+    target = f"glue_catalog.{DATABASE}.silver_orders_{mode.replace('-', '_')}"
+    load_silver_orders(spark, target, rows, layout, buckets)
+    set_table_properties(spark, target, merge_mode_properties(mode))
+
+    merge_seconds, bytes_written, rows_updated, delete_files = [], 0, 0, 0
+    for round_index in range(rounds):
+        src = status_batch(spark, rows, update_fraction, round_index).cache()
+        rows_updated += src.count()
+        src.createOrReplaceTempView("status_src")
+
+        started = time.time()
+        spark.sql(STATUS_MERGE_SQL.format(target=target))
+        merge_seconds.append(time.time() - started)
+
+        summary = latest_snapshot_summary(spark, target)
+        bytes_written += int(summary.get("added-files-size", 0))
+        delete_files += int(summary.get("added-delete-files", 0))
+        src.unpersist()
+
+    # Read cost of the accumulated deletes, then the cost of folding them in
+    started = time.time()
+    spark.sql(f"SELECT COUNT(*) FROM {target} WHERE status = 'delivered'").collect()
+    read_seconds = time.time() - started
+
+    started = time.time()
+    spark.sql(f"""
+        CALL glue_catalog.system.rewrite_data_files(
+            table => '{DATABASE}.{target.split('.')[-1]}',
+            options => map('delete-file-threshold', '1')
+        )
+    """).collect()
+    compaction_seconds = time.time() - started
+
+    logical_bytes = rows_updated * 100  # ~100 bytes per Silver orders row in Parquet
+    return {
+        "rows": rows,
+        "mode": mode,
+        "rounds": rounds,
+        "rows_updated": rows_updated,
+        "merge_seconds_avg": round(sum(merge_seconds) / len(merge_seconds), 3),
+        "merge_seconds_max": round(max(merge_seconds), 3),
+        "bytes_written": bytes_written,
+        "write_amplification": round(bytes_written / max(logical_bytes, 1), 1),
+        "delete_files_written": delete_files,
+        "read_seconds_before_compaction": round(read_seconds, 3),
+        "compaction_seconds": round(compaction_seconds, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Silver orders MERGE: copy-on-write vs merge-on-read")
+    parser.add_argument("--rows", default="1000000,10000000")
+    parser.add_argument("--rounds", type=int, default=6)
+    parser.add_argument("--update-fraction", type=float, default=0.0005)
+    parser.add_argument("--layout", default="days", choices=["days", "bucket"])
+    parser.add_argument("--buckets", type=int, default=16)
+    parser.add_argument("--warehouse", default="/tmp/cdc-bench-warehouse")
+    parser.add_argument("--output", default=os.path.join(os.path.dirname(__file__), "results", "silver_merge_mode.json"))
+    args = parser.parse_args()
+
+    spark = create_local_spark(args.warehouse, "silver-merge-mode")
+    spark.sql(f"CREATE DATABASE IF NOT EXISTS glue_catalog.{DATABASE}")
+
+    results = []
+    for rows in [int(r) for r in args.rows.split(",")]:
+        for mode in ["copy-on-write", "merge-on-read"]:
+            result = run_mode(spark, rows, mode, args.rounds, args.update_fraction, args.layout, args.buckets)
+            print(json.dumps(result))
+            results.append(result)
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    spark.stop()
+
+
+if __name__ == "__main__":
+    main()
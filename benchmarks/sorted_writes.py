@@ -0,0 +1,173 @@
+import argparse
+import json
+import os
+import time
+
+from local_spark import create_local_spark
+
+from pyspark.sql.functions import col, current_timestamp, expr, lit, rand
+
+from cdc_schemas import bronze_ddl_columns, silver_ddl_columns, silver_partition_clause, write_order_clause
+from iceberg_tables import latest_snapshot_summary
+from silver_merge_layout import DATABASE
+
+
+# Point lookups as in sql/athena_queries.sql: the latest events on Bronze and a
+# single entity on Silver
+BRONZE_RECENT_SQL = "SELECT * FROM {target} WHERE ts_ms >= {since} ORDER BY ts_ms DESC LIMIT 10"
+SILVER_LOOKUP_SQL = "SELECT * FROM {target} WHERE id = {id}"
+
+MERGE_SQL = """
+    MERGE INTO {target} AS tgt
+    USING merge_src AS src
+    ON tgt.id = src.src_id
+    WHEN MATCHED AND src.src_ts_ms > tgt.ts_ms THEN
+        UPDATE SET status = src.src_status, op = 'u', ts_ms = src.src_ts_ms,
+                   processed_at = src.processed_at, _audit_updated_at = current_timestamp()
+"""
+
+BASE_TS_MS = 1706000000000
+
+
+def create_table(spark, target, ddl_columns, partition_clause, sorted_writes, layer):
+    spark.sql(f"DROP TABLE IF EXISTS {target}")
+    spark.sql(f"""
+        CREATE TABLE {target} ({ddl_columns})
+        USING iceberg
+        PARTITIONED BY ({partition_clause})
+        TBLPROPERTIES ('format-version'='2', 'write.target-file-size-bytes'='134217728')
+    """)
+    if sorted_writes:
+        spark.sql(f"ALTER TABLE {target} {write_order_clause(layer)}")
+
+
+def load_bronze_users(spark, target, rows, batches, sorted_writes):
+    create_table(spark, target, bronze_ddl_columns("users"), "days(processed_at)", sorted_writes, "bronze")
+    # Debezium batches arrive out of order across partitions of the topic
+    per_batch = rows // batches
+    for b in range(batches):
+        spark.range(b * per_batch, (b + 1) * per_batch).select(
+            col("id"),
+            expr("concat('user_', id)").alias("name"),
+            expr("concat('user_', id, '@example.com')").alias("email"),
+            lit(BASE_TS_MS).alias("created_at"),
+            lit(BASE_TS_MS).alias("updated_at"),
+            lit("c").alias("op"),
+            (lit(BASE_TS_MS) + (rand(b) * rows).cast("long")).alias("ts_ms"),
+            lit(None).cast("bigint").alias("source_lsn"),
+            expr("timestamp_seconds(1706000000)").alias("processed_at")
+        ).repartition(8).writeTo(target).append()
+
+
+def load_silver_orders(spark, target, rows, batches, sorted_writes):
+    create_table(spark, target, silver_ddl_columns("orders"), silver_partition_clause("days", 16),
+                 sorted_writes, "silver")
+    per_batch = rows // batches
+    for b in range(batches):
+        spark.range(b * per_batch, (b + 1) * per_batch).select(
+            col("id"),
+            (col("id") % 100000).alias("user_id"),
+            (col("id") % 5000).alias("product_id"),
+            lit(1).alias("quantity"),
+            (rand(7) * 800).alias("total_amount"),
+            lit("pending").alias("status"),
+            (lit(BASE_TS_MS) + col("id")).alias("created_at"),
+            lit("Small").alias("order_value_category"),
+            lit(True).alias("is_active"),
+            lit("c").alias("op"),
+            (lit(BASE_TS_MS) + col("id")).alias("ts_ms"),
+            lit(None).cast("bigint").alias("source_lsn"),
+            expr("timestamp_seconds(1706000000)").alias("processed_at"),
+            current_timestamp().alias("_audit_updated_at"),
+            lit(None).cast("bigint").alias("_row_hash")
+        ).repartition(8).writeTo(target).append()
+
+
+def files_matching(spark, target, column, low, high):
+    # Files whose min/max range overlaps the predicate, i.e. the ones a scan must open
+    total, matching = spark.sql(f"""
+        SELECT COUNT(*),
+               SUM(CASE WHEN readable_metrics.{column}.lower_bound <= {high}
+                         AND readable_metrics.{column}.upper_bound >= {low} THEN 1 ELSE 0 END)
+        FROM {target}.files
+    """).collect()[0]
+    return total, matching or 0
+
+
+def timed(spark, sql):
+    started = time.time()
+    spark.sql(sql).collect()
+    return round(time.time() - started, 3)
+
+
+def run_case(spark, rows, batches, sorted_writes, merge_rows):
+    suffix = "sorted" if sorted_writes else "unsorted"
+    bronze = f"glue_catalog.{DATABASE}.bronze_users_{suffix}"
+    silver = f"glue_catalog.{DATABASE}.silver_orders_{suffix}"
+
+    load_bronze_users(spark, bronze, rows, batches, sorted_writes)
+    load_silver_orders(spark, silver, rows, batches, sorted_writes)
+
+    since = BASE_TS_MS + rows - rows // 1000
+    bronze_files, bronze_scanned = files_matching(spark, bronze, "ts_ms", since, BASE_TS_MS + rows)
+    lookup_id = rows // 2
+    silver_files, silver_scanned = files_matching(spark, silver, "id", lookup_id, lookup_id)
+
+    bronze_seconds = timed(spark, BRONZE_RECENT_SQL.format(target=bronze, since=since))
+    silver_seconds = timed(spark, SILVER_LOOKUP_SQL.format(target=silver, id=lookup_id))
+
+    # Recent orders are the ones that change; a narrow id range is the realistic batch
+    spark.range(rows - merge_rows, rows).select(
+        col("id").alias("src_id"),
+        lit("shipped").alias("src_status"),
+        (lit(1800000000000) + col("id")).alias("src_ts_ms"),
+        current_timestamp().alias("processed_at")
+    ).createOrReplaceTempView("merge_src")
+    merge_seconds = timed(spark, MERGE_SQL.format(target=silver))
+    summary = latest_snapshot_summary(spark, silver)
+
+    return {
+        "rows": rows,
+        "batches": batches,
+        "sorted_writes": sorted_writes,
+        "bronze_files": bronze_files,
+        "bronze_recent_files_scanned": bronze_scanned,
+        "bronze_recent_seconds": bronze_seconds,
+        "silver_files": silver_files,
+        "silver_lookup_files_scanned": silver_scanned,
+        "silver_lookup_seconds": silver_seconds,
+        "merge_seconds": merge_seconds,
+        "merge_files_rewritten": int(summary.get("deleted-data-files", 0)),
+        "merge_bytes_rewritten": int(summary.get("removed-files-size", 0)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Unsorted vs declared sort order: point lookups and MERGE file skipping")
+    parser.add_argument("--rows", default="1000000,10000000")
+    parser.add_argument("--batches", type=int, default=20)
+    parser.add_argument("--merge-rows", type=int, default=1000)
+    parser.add_argument("--warehouse", default="/tmp/cdc-bench-warehouse")
+    parser.add_argument("--output", default=os.path.join(os.path.dirname(__file__), "results", "sorted_writes.json"))
+    args = parser.parse_args()
+
+    spark = create_local_spark(args.warehouse, "sorted-writes")
+    spark.sql(f"CREATE DATABASE IF NOT EXISTS glue_catalog.{DATABASE}")
+
+    results = []
+    for rows in [int(r) for r in args.rows.split(",")]:
+        for sorted_writes in [False, True]:
+            result = run_case(spark, rows, args.batches, sorted_writes, args.merge_rows)
+            print(json.dumps(result))
+            results.append(result)
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    spark.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+from pyspark.sql.functions import col, count, lit, struct, sum as spark_sum
+from pyspark.sql.functions import max as spark_max
+
+# Source position of a change: Debezium's source.lsn first (commit order in the
+# WAL), then the event timestamp. Rows from before the LSN was captured have a
+# null source_lsn, which sorts below any captured one, and order by ts_ms among
+# themselves.
+CHANGE_ORDER = ["source_lsn", "ts_ms"]
+
+CHANGE_COUNT_COLUMN = "_change_events"
+
+
+def change_is_newer_sql(source, target):
+    # SQL predicate: the (source_lsn, ts_ms) expressions in `source` come after
+    # those in `target`, in the CHANGE_ORDER collapse_latest picks by. Struct
+    # comparison orders field by field with nulls lowest, as max() does.
+    def position(lsn, ts_ms):
+        return f"named_struct('lsn', {lsn}, 'ts_ms', {ts_ms})"
+    return f"{position(*source)} > {position(*target)}"
+
+
+def collapse_latest(df, keys, order_by=None, count_column=CHANGE_COUNT_COLUMN):
+    # max() over a struct compares field by field, so with the ordering columns
+    # first it picks each key's latest change, and the remaining columns make
+    # exact ties deterministic. Unlike row_number() over a window this needs no
+    # sort and is partially aggregated before the shuffle, so update-heavy
+    # batches send at most one row per key and input partition across the network.
+    order_by = order_by or CHANGE_ORDER
+    values = [c for c in df.columns if c not in keys and c not in order_by]
+
+    aggregations = [spark_max(struct(*[col(c) for c in order_by + values])).alias("_latest")]
+    if count_column:
+        aggregations.append(count(lit(1)).alias(count_column))
+
+    return df.groupBy(*keys).agg(*aggregations).select(
+        *[col(k) for k in keys],
+        *[col(f"_latest.{c}").alias(c) for c in order_by + values],
+        *([col(count_column)] if count_column else [])
+    )
+
+
+def collapse_stats(collapsed_df, count_column=CHANGE_COUNT_COLUMN):
+    row = collapsed_df.agg(count(lit(1)), spark_sum(count_column)).first()
+    keys, events = row[0], row[1] or 0
+    return {"events": events, "keys": keys, "collapsed": events - keys}
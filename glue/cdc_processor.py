@@ -1,12 +1,39 @@
 import sys
 import logging
-from awsglue.utils import getResolvedOptions
-from pyspark.context import SparkContext
-from awsglue.context import GlueContext
-from awsglue.job import Job
+from dataclasses import asdict
 from pyspark.sql.functions import *
 from pyspark.sql.types import *
-from pyspark.sql.window import Window
+from pyspark import SparkConf, StorageLevel
+
+from cdc_collapse import CHANGE_COUNT_COLUMN, change_is_newer_sql, collapse_latest, collapse_stats
+from cdc_schemas import (
+    CDC_FIELDS, CORRUPT_RECORD_COLUMN, ROW_HASH_COLUMN, ROW_HASH_COLUMNS, SILVER_COLUMNS, SOURCE_COLUMNS,
+    WRITE_ORDER, bloom_filter_properties, bronze_columns, bronze_ddl_columns, detect_schema_drift,
+    merge_mode_properties, raw_schema, row_hash_sql, silver_ddl_columns, silver_partition_clause,
+    sort_order_sql, sort_order_terms, source_tables, write_order_clause
+)
+from raw_compactor import compact_raw_table, prefer_compacted
+from raw_manifest import (
+    BATCH_ID_PROPERTY, create_manifest_table, find_new_raw_files,
+    batch_committed, clear_pinned_batch, committed_paths, list_raw_files, listing_cursor, load_pinned_batch,
+    pin_raw_batch, record_raw_batch
+)
+from iceberg_maintenance import MaintenancePolicy, maintain_tables
+from job_metrics import RunMetrics, create_sinks
+from job_runtime import IN_GLUE, commit_job, configure_glue_catalog, init_job, location_clause, resolve_options
+from iceberg_tables import (
+    add_missing_columns, added_bytes_between, ancestor_snapshots_between, current_snapshot_id,
+    get_table_properties, get_table_property, is_current_ancestor,
+    latest_snapshot_summary, partition_transforms, read_appends_between,
+    set_table_properties
+)
+from silver_catchup import CATCHUP_PROGRESS_PROPERTY, completed_buckets, plan_catchup_chunks, progress_value
+from skew_joins import plan_size_bytes
+from spark_tuning import (
+    TuningPolicy, apply_tuning, broadcast_threshold, combine_plans, parquet_input_bytes, plan_tuning, raw_input_bytes
+)
+from table_scheduler import run_tables
+from table_stats import active_row_delta, active_rows, active_rows_properties, table_stats
 
 
 logging.basicConfig(
@@ -15,61 +42,131 @@ logging.basicConfig(
 )
 logger = logging.getLogger("cdc-iceberg-job")
 
-args = getResolvedOptions(sys.argv, ["JOB_NAME", "DATABASE_NAME", "S3_BUCKET"])
+args = resolve_options(sys.argv, ["JOB_NAME", "DATABASE_NAME", "S3_BUCKET"])
+
+# FAIR scheduling lets the per-table jobs submitted from main() share executors
+spark, job = init_job(args, SparkConf().set("spark.scheduler.mode", "FAIR"))
+
+
+def get_optional_arg(name, default):
+    if f"--{name}" in sys.argv:
+        return resolve_options(sys.argv, [name])[name]
+    return default
+
+
+def parse_table_options(value):
+    # "orders=merge-on-read,users=copy-on-write" -> {"orders": "merge-on-read", ...}
+    options = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        table, _, option = item.partition("=")
+        options[table.strip()] = option.strip()
+    return options
 
-sc = SparkContext()
-glueContext = GlueContext(sc)
-spark = glueContext.spark_session
-job = Job(glueContext)
-job.init(args["JOB_NAME"], args)
 
 DATABASE = args["DATABASE_NAME"]
 BUCKET = args["S3_BUCKET"]
 
+# incremental: read only raw objects not yet recorded in the ingest manifest
+# full: re-read the whole raw/{table}/ prefix (pre-manifest behaviour)
+INGEST_MODE = get_optional_arg("INGEST_MODE", "incremental")
+RAW_ROOT = get_optional_arg("RAW_PATH", f"s3://{BUCKET}/raw").rstrip("/")
+# Incremental ingest lists only the raw/{table}/ subdirectories from the one holding
+# the newest committed object, plus this many before it for late arrivals; the
+# subdirectories must sort in arrival order (dates, zero-padded batch numbers).
+# -1 lists the whole prefix on every run.
+RAW_LISTING_LOOKBACK = int(get_optional_arg("RAW_LISTING_LOOKBACK", "1"))
+MANIFEST_TABLE = f"glue_catalog.{DATABASE}.raw_ingest_manifest"
+# Packs small raw objects into gzip NDJSON segments before ingestion (incremental mode only);
+# readers prefer segments listed in the compacted manifest whenever it exists
+RAW_COMPACTION = get_optional_arg("RAW_COMPACTION", "false").lower() == "true"
+RAW_COMPACTED_ROOT = get_optional_arg("RAW_COMPACTED_PATH", f"{RAW_ROOT}_compacted").rstrip("/")
+
+# persist: cache the typed batch (memory, spilling to disk) for the run
+# checkpoint: write it once to CHECKPOINT_PATH and cut the lineage to the JSON scan
+# none: no materialization, every action re-reads raw
+MATERIALIZE_MODE = get_optional_arg("MATERIALIZE_MODE", "persist")
+SCHEMA_DRIFT_SAMPLE = int(get_optional_arg("SCHEMA_DRIFT_SAMPLE", "5"))
+# Layers this run maintains; Silver catches up from Bronze snapshots, so the two
+# can be scheduled at different cadences (e.g. RUN_LAYERS=bronze hourly, silver daily),
+# and maintenance can run on its own schedule away from the MERGE path
+RUN_LAYERS = [layer.strip() for layer in get_optional_arg("RUN_LAYERS", "bronze,silver,maintenance").split(",")]
+SILVER_WATERMARK_PROPERTY = "cdc.silver.last-bronze-snapshot-id"
+SILVER_LAYOUT = get_optional_arg("SILVER_LAYOUT", "days")
+SILVER_BUCKETS = int(get_optional_arg("SILVER_BUCKETS", "16"))
+# Per-table Silver MERGE mode, e.g. "orders=merge-on-read"; unlisted tables stay copy-on-write
+SILVER_MERGE_MODES = parse_table_options(get_optional_arg("SILVER_MERGE_MODES", ""))
+# Declared sort order / distribution from cdc_schemas.WRITE_ORDER (Bronze by ts_ms, Silver by id)
+SORTED_WRITES = get_optional_arg("SORTED_WRITES", "true").lower() == "true"
+# Drop changes whose business-column hash equals the Silver row's before the MERGE;
+# Silver ts_ms then records the last change that moved a business column
+SKIP_UNCHANGED_ROWS = get_optional_arg("SKIP_UNCHANGED_ROWS", "true").lower() == "true"
+SILVER_BLOOM_FILTER = get_optional_arg("SILVER_BLOOM_FILTER", "false").lower() == "true"
+# Bronze bytes (on storage) merged into Silver per commit; a larger backlog, e.g. after
+# an outage, is split by Bronze snapshot range and, within one snapshot, by id hash.
+# 0 merges the whole backlog in one statement.
+CATCHUP_CHUNK_BYTES = int(get_optional_arg("CATCHUP_CHUNK_BYTES", str(2 * 1024 ** 3)))
+MIGRATE_SILVER_LAYOUT = get_optional_arg("MIGRATE_SILVER_LAYOUT", "false").lower() == "true"
+MAINTENANCE_BUDGET_SECONDS = int(get_optional_arg("MAINTENANCE_BUDGET_SECONDS", "900"))
+SNAPSHOT_RETENTION_HOURS = int(get_optional_arg("SNAPSHOT_RETENTION_HOURS", "72"))
+# Soft-deleted Silver rows older than this many days move to silver_{table}_deleted
+# during maintenance (0 keeps them); without the archive they are only deleted.
+# A change arriving for a purged id after the horizon is inserted as a new row.
+TOMBSTONE_RETENTION_DAYS = int(get_optional_arg("TOMBSTONE_RETENTION_DAYS", "30"))
+TOMBSTONE_ARCHIVE = get_optional_arg("TOMBSTONE_ARCHIVE", "true").lower() == "true"
+TABLE_PARALLELISM = int(get_optional_arg("TABLE_PARALLELISM", "3"))
+CHECKPOINT_PATH = get_optional_arg("CHECKPOINT_PATH", f"s3://{BUCKET}/checkpoints/{args['JOB_NAME']}")
+# auto: size shuffle partitions, AQE advisory size and broadcast threshold from the
+# pending raw bytes and Bronze delta before planning; off: leave Spark defaults
+SPARK_TUNING = get_optional_arg("SPARK_TUNING", "auto")
+TUNING_POLICY = TuningPolicy()
+# metadata: counts from snapshot summaries plus the maintained active-row counter
+# scan: the original COUNT(*) queries over Bronze and Silver after every table
+TABLE_STATS = get_optional_arg("TABLE_STATS", "metadata")
+# Comma list of metrics sinks: emf (CloudWatch via the log stream), s3://... or a local directory
+METRICS_SINK = get_optional_arg("METRICS_SINK", "emf")
+# Per-stage Spark metrics from the status store next to the stage timings
+METRICS_LISTENER = get_optional_arg("METRICS_LISTENER", "true").lower() == "true"
+
 logger.info(f"Starting CDC Processor - Database: {DATABASE}, Bucket: {BUCKET}")
 
-spark.conf.set("spark.sql.catalog.glue_catalog", "org.apache.iceberg.spark.SparkCatalog")
-spark.conf.set("spark.sql.catalog.glue_catalog.catalog-impl", "org.apache.iceberg.aws.glue.GlueCatalog")
-spark.conf.set("spark.sql.catalog.glue_catalog.warehouse", f"s3://{BUCKET}/iceberg/")
-spark.conf.set("spark.sql.catalog.glue_catalog.io-impl", "org.apache.iceberg.aws.s3.S3FileIO")
+configure_glue_catalog(spark, f"s3://{BUCKET}/iceberg/")
+metrics = RunMetrics(spark, args["JOB_NAME"], create_sinks(spark, METRICS_SINK), listen=METRICS_LISTENER)
+
+if SILVER_LAYOUT == "bucket":
+    # Storage-partitioned joins (Spark 3.4+ / Glue 5.0) let joins on id between
+    # bucketed tables skip the shuffle; older runtimes ignore these settings.
+    spark.conf.set("spark.sql.sources.v2.bucketing.enabled", "true")
+    spark.conf.set("spark.sql.sources.v2.bucketing.pushPartValues.enabled", "true")
+    spark.conf.set("spark.sql.requireAllClusterKeysForCoPartition", "false")
+    spark.conf.set("spark.sql.iceberg.planning.preserve-data-grouping", "true")
 
 spark.sql(f"CREATE DATABASE IF NOT EXISTS glue_catalog.{DATABASE}")
 logger.info(f"Glue Catalog database glue_catalog.{DATABASE} verified/created")
 
+if MATERIALIZE_MODE == "checkpoint":
+    spark.sparkContext.setCheckpointDir(CHECKPOINT_PATH)
+
+if INGEST_MODE == "incremental":
+    create_manifest_table(spark, MANIFEST_TABLE,
+                          f"s3://{BUCKET}/iceberg/{DATABASE}/raw_ingest_manifest" if IN_GLUE else None)
+
 
 def create_bronze_table(table):
     try:
-        if table == "users":
-            spark.sql(f"""
-                CREATE TABLE IF NOT EXISTS glue_catalog.{DATABASE}.bronze_users (
-                    id BIGINT, name STRING, email STRING, created_at BIGINT,
-                    updated_at BIGINT, op STRING, ts_ms BIGINT, processed_at TIMESTAMP
-                ) USING iceberg
-                LOCATION 's3://{BUCKET}/iceberg/{DATABASE}/bronze_users'
-                PARTITIONED BY (days(processed_at))
-                TBLPROPERTIES ('format-version'='2', 'write.target-file-size-bytes'='134217728')
-            """)
-        elif table == "products":
-            spark.sql(f"""
-                CREATE TABLE IF NOT EXISTS glue_catalog.{DATABASE}.bronze_products (
-                    id BIGINT, name STRING, price DOUBLE, category STRING,
-                    created_at BIGINT, updated_at BIGINT, op STRING, ts_ms BIGINT, processed_at TIMESTAMP
-                ) USING iceberg
-                LOCATION 's3://{BUCKET}/iceberg/{DATABASE}/bronze_products'
-                PARTITIONED BY (days(processed_at))
-                TBLPROPERTIES ('format-version'='2', 'write.target-file-size-bytes'='134217728')
-            """)
-        elif table == "orders":
-            spark.sql(f"""
-                CREATE TABLE IF NOT EXISTS glue_catalog.{DATABASE}.bronze_orders (
-                    id BIGINT, user_id BIGINT, product_id BIGINT, quantity INT,
-                    total_amount DOUBLE, status STRING, created_at BIGINT, updated_at BIGINT,
-                    op STRING, ts_ms BIGINT, processed_at TIMESTAMP
-                ) USING iceberg
-                LOCATION 's3://{BUCKET}/iceberg/{DATABASE}/bronze_orders'
-                PARTITIONED BY (days(processed_at))
-                TBLPROPERTIES ('format-version'='2', 'write.target-file-size-bytes'='134217728')
-            """)
+        spark.sql(f"""
+            CREATE TABLE IF NOT EXISTS glue_catalog.{DATABASE}.bronze_{table} (
+                {bronze_ddl_columns(table)}
+            ) USING iceberg
+            {location_clause(f"s3://{BUCKET}/iceberg/{DATABASE}/bronze_{table}")}
+            PARTITIONED BY (days(processed_at))
+            TBLPROPERTIES ('format-version'='2', 'write.target-file-size-bytes'='134217728')
+        """)
+        # Tables created before a CDC field was captured get it as a nullable column
+        added = add_missing_columns(spark, f"glue_catalog.{DATABASE}.bronze_{table}", bronze_columns(table))
+        if added:
+            logger.info(f"Added columns {added} to Bronze {table}")
+        if SORTED_WRITES:
+            ensure_write_order(f"glue_catalog.{DATABASE}.bronze_{table}", "bronze")
         logger.info(f"Bronze table glue_catalog.{DATABASE}.bronze_{table} created/verified")
     except Exception as e:
         logger.error(f"Error creating bronze table {table}: {str(e)}")
@@ -78,112 +175,245 @@ def create_bronze_table(table):
 
 def create_silver_table(table):
     try:
-        if table == "users":
-            spark.sql(f"""
-                CREATE TABLE IF NOT EXISTS glue_catalog.{DATABASE}.silver_users (
-                    id BIGINT, name STRING, email STRING, email_domain STRING,
-                    is_active BOOLEAN, op STRING, ts_ms BIGINT, processed_at TIMESTAMP,
-                    _audit_updated_at TIMESTAMP
-                ) USING iceberg
-                LOCATION 's3://{BUCKET}/iceberg/{DATABASE}/silver_users'
-                PARTITIONED BY (days(processed_at))
-                TBLPROPERTIES ('format-version'='2', 'write.target-file-size-bytes'='134217728')
-            """)
-        elif table == "products":
-            spark.sql(f"""
-                CREATE TABLE IF NOT EXISTS glue_catalog.{DATABASE}.silver_products (
-                    id BIGINT, name STRING, price DOUBLE, category STRING,
-                    price_category STRING, is_active BOOLEAN, op STRING, ts_ms BIGINT, processed_at TIMESTAMP,
-                    _audit_updated_at TIMESTAMP
-                ) USING iceberg
-                LOCATION 's3://{BUCKET}/iceberg/{DATABASE}/silver_products'
-                PARTITIONED BY (days(processed_at))
-                TBLPROPERTIES ('format-version'='2', 'write.target-file-size-bytes'='134217728')
-            """)
-        elif table == "orders":
-            spark.sql(f"""
-                CREATE TABLE IF NOT EXISTS glue_catalog.{DATABASE}.silver_orders (
-                    id BIGINT, user_id BIGINT, product_id BIGINT, quantity INT,
-                    total_amount DOUBLE, status STRING, order_value_category STRING,
-                    is_active BOOLEAN, op STRING, ts_ms BIGINT, processed_at TIMESTAMP,
-                    _audit_updated_at TIMESTAMP
-                ) USING iceberg
-                LOCATION 's3://{BUCKET}/iceberg/{DATABASE}/silver_orders'
-                PARTITIONED BY (days(processed_at))
-                TBLPROPERTIES ('format-version'='2', 'write.target-file-size-bytes'='134217728')
-            """)
+        spark.sql(f"""
+            CREATE TABLE IF NOT EXISTS glue_catalog.{DATABASE}.silver_{table} (
+                {silver_ddl_columns(table)}
+            ) USING iceberg
+            {location_clause(f"s3://{BUCKET}/iceberg/{DATABASE}/silver_{table}")}
+            PARTITIONED BY ({silver_partition_clause(SILVER_LAYOUT, SILVER_BUCKETS)})
+            TBLPROPERTIES ('format-version'='2', 'write.target-file-size-bytes'='134217728')
+        """)
+        # Rows merged before a column existed carry NULL; a NULL _row_hash always counts as changed
+        added = add_missing_columns(spark, f"glue_catalog.{DATABASE}.silver_{table}", SILVER_COLUMNS[table])
+        if added:
+            logger.info(f"Added columns {added} to Silver {table}")
+        ensure_silver_layout(table)
+        if SORTED_WRITES:
+            ensure_write_order(f"glue_catalog.{DATABASE}.silver_{table}", silver_write_layer())
+        ensure_silver_merge_mode(table)
+        if TOMBSTONE_RETENTION_DAYS > 0 and TOMBSTONE_ARCHIVE:
+            create_tombstone_archive(table)
         logger.info(f"Silver table glue_catalog.{DATABASE}.silver_{table} created/verified")
     except Exception as e:
         logger.error(f"Error creating silver table {table}: {str(e)}")
         raise
 
 
-def read_cdc(table):
+def create_tombstone_archive(table):
+    archive_table = f"glue_catalog.{DATABASE}.silver_{table}_deleted"
+    spark.sql(f"""
+        CREATE TABLE IF NOT EXISTS {archive_table} (
+            {silver_ddl_columns(table)}, _archived_at TIMESTAMP
+        ) USING iceberg
+        {location_clause(f"s3://{BUCKET}/iceberg/{DATABASE}/silver_{table}_deleted")}
+        PARTITIONED BY (days(_archived_at))
+        TBLPROPERTIES ('format-version'='2', 'write.target-file-size-bytes'='134217728')
+    """)
+    # Keeps the archive appendable by name when Silver gains a column
+    added = add_missing_columns(spark, archive_table, SILVER_COLUMNS[table])
+    if added:
+        logger.info(f"Added columns {added} to {archive_table}")
+
+
+def ensure_silver_layout(table):
+    if SILVER_LAYOUT != "bucket":
+        return
+
+    silver_table = f"glue_catalog.{DATABASE}.silver_{table}"
+    wanted = silver_partition_clause(SILVER_LAYOUT, SILVER_BUCKETS)
+    current = partition_transforms(spark, silver_table)
+    if current == [wanted]:
+        return
+
+    if not MIGRATE_SILVER_LAYOUT:
+        logger.warning(
+            f"Silver {table} is partitioned by {current}, not {wanted}; "
+            f"run with --MIGRATE_SILVER_LAYOUT true to convert it"
+        )
+        return
+    migrate_silver_layout(table, current, wanted)
+
+
+def silver_write_layer():
+    return "silver_bucket" if SILVER_LAYOUT == "bucket" else "silver"
+
+
+def ensure_write_order(table_identifier, layer):
+    properties = get_table_properties(spark, table_identifier)
+    distribution, _ = WRITE_ORDER[layer]
+    if sort_order_terms(properties.get("sort-order")) != sort_order_terms(sort_order_sql(layer)) or \
+            properties.get("write.distribution-mode") != distribution:
+        spark.sql(f"ALTER TABLE {table_identifier} {write_order_clause(layer)}")
+        logger.info(f"{table_identifier}: {write_order_clause(layer)}")
+
+    if layer.startswith("silver") and SILVER_BLOOM_FILTER:
+        wanted = bloom_filter_properties(["id"])
+        if any(properties.get(k) != v for k, v in wanted.items()):
+            set_table_properties(spark, table_identifier, wanted)
+
+
+def ensure_silver_merge_mode(table):
+    silver_table = f"glue_catalog.{DATABASE}.silver_{table}"
+    wanted = merge_mode_properties(SILVER_MERGE_MODES.get(table, "copy-on-write"))
+    current = get_table_properties(spark, silver_table)
+    # Only commit when the mode actually changes; missing properties mean copy-on-write
+    changed = {k: v for k, v in wanted.items() if current.get(k, "copy-on-write") != v}
+    if changed:
+        set_table_properties(spark, silver_table, wanted)
+        logger.info(f"Silver {table} MERGE mode set to {wanted['write.merge.mode']}")
+
+
+def migrate_silver_layout(table, current, wanted):
+    silver_table = f"glue_catalog.{DATABASE}.silver_{table}"
+    logger.info(f"Migrating Silver {table} layout from {current} to {wanted}")
+
+    # Spec evolution is metadata-only: new writes use the bucket spec right away
+    for index, transform in enumerate(current):
+        if index == 0:
+            spark.sql(f"ALTER TABLE {silver_table} REPLACE PARTITION FIELD {transform} WITH {wanted}")
+        else:
+            spark.sql(f"ALTER TABLE {silver_table} DROP PARTITION FIELD {transform}")
+    if not current:
+        spark.sql(f"ALTER TABLE {silver_table} ADD PARTITION FIELD {wanted}")
+    if SORTED_WRITES:
+        # Buckets only prune well when rows are sorted by id inside them
+        ensure_write_order(silver_table, silver_write_layer())
+
+    # Existing files still carry the old spec; a full sorted rewrite moves them
+    # into buckets so MERGE pruning applies to history as well as new data.
+    result = spark.sql(f"""
+        CALL glue_catalog.system.rewrite_data_files(
+            table => '{DATABASE}.silver_{table}',
+            strategy => 'sort',
+            sort_order => '{sort_order_sql("silver")}',
+            options => map('rewrite-all', 'true')
+        )
+    """).collect()
+    logger.info(f"Silver {table} rewritten into {wanted}: {result[0].asDict() if result else {}}")
+
+
+def find_raw_batch(table):
     try:
-        path = f"s3://{BUCKET}/raw/{table}/"
-        logger.info(f"Reading CDC data from: {path}")
+        path = f"{RAW_ROOT}/{table}/"
+        cursor = listing_cursor(spark, MANIFEST_TABLE, table, path) if RAW_LISTING_LOOKBACK >= 0 else None
+        listed = prefer_compacted(spark, f"{RAW_COMPACTED_ROOT}/{table}",
+                                  list_raw_files(spark, path, cursor, RAW_LISTING_LOOKBACK))
+        return find_new_raw_files(spark, MANIFEST_TABLE, table, path, listed)
+    except Exception as e:
+        logger.error(f"Error listing raw files for {table}: {str(e)}")
+        raise
 
-        df = spark.read.option("mode", "PERMISSIVE").json(path)
 
-        if df.rdd.isEmpty():
-            logger.info(f"No new CDC data for {table}")
-            return None
+def check_schema_drift(table, raw_batch=None):
+    if SCHEMA_DRIFT_SAMPLE <= 0:
+        return
+    try:
+        files = raw_batch.files if raw_batch is not None else list_raw_files(spark, f"{RAW_ROOT}/{table}/")
+        newest = sorted(files, key=lambda f: f.modification_time)[-SCHEMA_DRIFT_SAMPLE:]
+        drift = detect_schema_drift(spark, table, [f.path for f in newest])
+        if drift:
+            logger.warning(f"Schema drift in raw {table} (declared schema kept): {drift}")
+    except Exception as e:
+        logger.warning(f"Schema drift check failed for {table}: {str(e)}")
 
-        record_count = df.count()
-        logger.info(f"Read {record_count} records from {table}")
 
-        df = df.withColumnRenamed("__op", "op") \
-               .withColumnRenamed("__ts_ms", "ts_ms") \
-               .withColumn("processed_at", current_timestamp())
+def read_cdc(table, raw_batch=None):
+    try:
+        reader = spark.read.schema(raw_schema(table)) \
+            .option("mode", "PERMISSIVE") \
+            .option("columnNameOfCorruptRecord", CORRUPT_RECORD_COLUMN)
+
+        if raw_batch is not None:
+            logger.info(f"Reading {len(raw_batch.files)} new raw files for {table}")
+            df = reader.json(raw_batch.paths)
+        else:
+            path = f"{RAW_ROOT}/{table}/"
+            logger.info(f"Reading CDC data from: {path}")
+            files = prefer_compacted(
+                spark, f"{RAW_COMPACTED_ROOT}/{table}", list_raw_files(spark, path), include_ingested=True
+            )
+            if files:
+                df = reader.json([f.path for f in files])
+            else:
+                df = spark.createDataFrame([], raw_schema(table))
+
+        check_schema_drift(table, raw_batch)
+
+        return bronze_projection(df, table)
 
-        if table == "users":
-            df = df.select(
-                "id", "name", "email", "created_at", "updated_at",
-                "op", "ts_ms", "processed_at"
-            ).withColumn("id", col("id").cast("long"))
+    except Exception as e:
+        logger.error(f"Error reading CDC data for {table}: {str(e)}")
+        raise
 
-        elif table == "products":
-            df = df.select(
-                "id", "name", "price", "category", "created_at", "updated_at",
-                "op", "ts_ms", "processed_at"
-            ).withColumn("id", col("id").cast("long")) \
-                  .withColumn("price", col("price").cast("double"))
 
-        elif table == "orders":
-            df = df.select(
-                "id", "user_id", "product_id", "quantity", "total_amount", "status",
-                "created_at", "updated_at", "op", "ts_ms", "processed_at"
-            ).withColumn("id", col("id").cast("long")) \
-                  .withColumn("user_id", col("user_id").cast("long")) \
-                  .withColumn("product_id", col("product_id").cast("long")) \
-                  .withColumn("quantity", col("quantity").cast("int")) \
-                  .withColumn("total_amount", col("total_amount").cast("double"))
+def bronze_projection(df, table):
+    # Types come from the declared schema, so no cast chain is needed
+    return df.select(
+        *[col(name) for name, _ in SOURCE_COLUMNS[table]],
+        *[col(raw).alias(name) for raw, name, _ in CDC_FIELDS],
+        current_timestamp().alias("processed_at"),
+        col(CORRUPT_RECORD_COLUMN)
+    )
 
-        return df
 
-    except Exception as e:
-        logger.error(f"Error reading CDC data for {table}: {str(e)}")
-        raise
+def materialize_batch(df, table):
+    if MATERIALIZE_MODE == "checkpoint":
+        df = df.checkpoint(eager=True)
+    elif MATERIALIZE_MODE == "persist":
+        df = df.persist(StorageLevel.MEMORY_AND_DISK)
+
+    # The only action over the raw scan; everything after reads the materialized batch.
+    # Spark refuses queries over raw JSON that reference only the corrupt record
+    # column, so malformed rows are counted only when the batch is materialized.
+    if MATERIALIZE_MODE == "none":
+        record_count, corrupt_count = df.count(), 0
+    else:
+        stats = df.select(count(lit(1)), count(col(CORRUPT_RECORD_COLUMN))).first()
+        record_count, corrupt_count = stats[0], stats[1]
+
+    logger.info(f"Read {record_count} records from {table} ({MATERIALIZE_MODE})")
+    if corrupt_count:
+        logger.warning(f"{corrupt_count} records in {table} did not match the declared schema")
+    return df, record_count
+
+
+def release_batch(df):
+    if MATERIALIZE_MODE == "persist":
+        df.unpersist()
 
 
-def write_bronze(df, table):
+def write_bronze(df, table, raw_batch=None, batch_id=None):
     try:
         target_table = f"glue_catalog.{DATABASE}.bronze_{table}"
         logger.info(f"Writing to Bronze: {target_table}")
 
-        df.writeTo(target_table) \
-          .option("mergeSchema", "true") \
-          .append()
+        writer = df.writeTo(target_table).option("mergeSchema", "true")
 
-        logger.info(f"Appended {df.count()} records to Bronze {table}")
+        if raw_batch is not None:
+            batch_id = raw_batch.batch_id
+        if batch_id is not None:
+            # A previous run may have appended this batch and died before the
+            # manifest was updated; the batch id on the Bronze snapshot tells us.
+            if batch_committed(spark, target_table, batch_id):
+                logger.warning(f"Batch {batch_id} already in Bronze {table}, skipping append")
+                return
+            writer = writer.option(f"snapshot-property.{BATCH_ID_PROPERTY}", batch_id)
+
+        writer.append()
+
+        summary = latest_snapshot_summary(spark, target_table)
+        logger.info(f"Appended {summary.get('added-records', 'unknown')} records to Bronze {table}")
 
     except Exception as e:
         logger.error(f"Error writing to bronze {table}: {str(e)}")
         raise
 
 
-def merge_silver_proper(df, table):
+def silver_source(df, table):
+    # Latest change per id, shaped for the Silver MERGE
     try:
+        df = collapse_latest(df, ["id"])
+
         if table == "users":
             src_df = df.select(
                 col("id").alias("src_id"),
@@ -192,11 +422,11 @@ def merge_silver_proper(df, table):
                 regexp_extract(col("email"), "@(.+)", 1).alias("email_domain"),
                 when(col("op") == "d", False).otherwise(True).alias("is_active"),
                 col("op"),
-                col("ts_ms"),
-                col("processed_at")
-            ).withColumn("row_num", row_number().over(
-                Window.partitionBy("src_id").orderBy(col("ts_ms").desc())
-            ))
+                col("ts_ms").alias("src_ts_ms"),
+                col("source_lsn").alias("src_source_lsn"),
+                col("processed_at"),
+                col(CHANGE_COUNT_COLUMN)
+            )
 
         elif table == "products":
             src_df = df.select(
@@ -209,11 +439,11 @@ def merge_silver_proper(df, table):
                     .otherwise("High").alias("price_category"),
                 when(col("op") == "d", False).otherwise(True).alias("is_active"),
                 col("op"),
-                col("ts_ms"),
-                col("processed_at")
-            ).withColumn("row_num", row_number().over(
-                Window.partitionBy("src_id").orderBy(col("ts_ms").desc())
-            ))
+                col("ts_ms").alias("src_ts_ms"),
+                col("source_lsn").alias("src_source_lsn"),
+                col("processed_at"),
+                col(CHANGE_COUNT_COLUMN)
+            )
 
         elif table == "orders":
             src_df = df.select(
@@ -223,27 +453,42 @@ def merge_silver_proper(df, table):
                 col("quantity").alias("src_quantity"),
                 col("total_amount").alias("src_total_amount"),
                 col("status").alias("src_status"),
+                col("created_at").alias("src_created_at"),
                 when(col("total_amount") < 100, "Small")
                     .when(col("total_amount") < 500, "Medium")
                     .otherwise("Large").alias("order_value_category"),
                 when(col("op") == "d", False).otherwise(True).alias("is_active"),
                 col("op"),
-                col("ts_ms"),
-                col("processed_at")
-            ).withColumn("row_num", row_number().over(
-                Window.partitionBy("src_id").orderBy(col("ts_ms").desc())
-            ))
+                col("ts_ms").alias("src_ts_ms"),
+                col("source_lsn").alias("src_source_lsn"),
+                col("processed_at"),
+                col(CHANGE_COUNT_COLUMN)
+            )
+
+        hashed = {c: c if c == "is_active" else f"src_{c}" for c in ROW_HASH_COLUMNS[table]}
+        return src_df.withColumn(ROW_HASH_COLUMN, expr(row_hash_sql(table, hashed)))
 
-        latest_src = src_df.filter("row_num = 1").drop("row_num")
+    except Exception as e:
+        logger.error(f"Error deduplicating changes for {table}: {str(e)}")
+        raise
+
+
+def merge_silver(latest_src, table):
+    try:
         latest_src.createOrReplaceTempView(f"silver_src_{table}")
         target_table = f"glue_catalog.{DATABASE}.silver_{table}"
+        # A stale delete only deactivates the row, so its hash is recomputed from the target
+        deleted_hash = row_hash_sql(table, {c: "false" if c == "is_active" else f"tgt.{c}"
+                                            for c in ROW_HASH_COLUMNS[table]})
+        # Changes sharing a ts_ms millisecond are ordered by their WAL position
+        newer = change_is_newer_sql(("src.src_source_lsn", "src.src_ts_ms"), ("tgt.source_lsn", "tgt.ts_ms"))
 
         if table == "users":
             spark.sql(f"""
                 MERGE INTO {target_table} AS tgt
                 USING silver_src_{table} AS src
                 ON tgt.id = src.src_id
-                WHEN MATCHED AND src.src_ts_ms > tgt.ts_ms THEN
+                WHEN MATCHED AND {newer} THEN
                     UPDATE SET
                         name = src.src_name,
                         email = src.src_email,
@@ -251,17 +496,22 @@ def merge_silver_proper(df, table):
                         is_active = src.is_active,
                         op = src.op,
                         ts_ms = src.src_ts_ms,
+                        source_lsn = src.src_source_lsn,
                         processed_at = src.processed_at,
-                        _audit_updated_at = current_timestamp()
+                        _audit_updated_at = current_timestamp(),
+                        _row_hash = src._row_hash
                 WHEN MATCHED AND src.op = 'd' THEN
                     UPDATE SET
                         is_active = False,
                         op = 'd',
-                        _audit_updated_at = current_timestamp()
+                        _audit_updated_at = current_timestamp(),
+                        _row_hash = {deleted_hash}
                 WHEN NOT MATCHED THEN
-                    INSERT (id, name, email, email_domain, is_active, op, ts_ms, processed_at, _audit_updated_at)
+                    INSERT (id, name, email, email_domain, is_active, op, ts_ms, source_lsn, processed_at,
+                            _audit_updated_at, _row_hash)
                     VALUES (src.src_id, src.src_name, src.src_email, src.email_domain,
-                            src.is_active, src.op, src.src_ts_ms, src.processed_at, current_timestamp())
+                            src.is_active, src.op, src.src_ts_ms, src.src_source_lsn, src.processed_at,
+                            current_timestamp(), src._row_hash)
             """)
 
         elif table == "products":
@@ -269,7 +519,7 @@ def merge_silver_proper(df, table):
                 MERGE INTO {target_table} AS tgt
                 USING silver_src_{table} AS src
                 ON tgt.id = src.src_id
-                WHEN MATCHED AND src.src_ts_ms > tgt.ts_ms THEN
+                WHEN MATCHED AND {newer} THEN
                     UPDATE SET
                         name = src.src_name,
                         price = src.src_price,
@@ -278,17 +528,22 @@ def merge_silver_proper(df, table):
                         is_active = src.is_active,
                         op = src.op,
                         ts_ms = src.src_ts_ms,
+                        source_lsn = src.src_source_lsn,
                         processed_at = src.processed_at,
-                        _audit_updated_at = current_timestamp()
+                        _audit_updated_at = current_timestamp(),
+                        _row_hash = src._row_hash
                 WHEN MATCHED AND src.op = 'd' THEN
                     UPDATE SET
                         is_active = False,
                         op = 'd',
-                        _audit_updated_at = current_timestamp()
+                        _audit_updated_at = current_timestamp(),
+                        _row_hash = {deleted_hash}
                 WHEN NOT MATCHED THEN
-                    INSERT (id, name, price, category, price_category, is_active, op, ts_ms, processed_at, _audit_updated_at)
+                    INSERT (id, name, price, category, price_category, is_active, op, ts_ms, source_lsn, processed_at,
+                            _audit_updated_at, _row_hash)
                     VALUES (src.src_id, src.src_name, src.src_price, src.src_category,
-                            src.price_category, src.is_active, src.op, src.src_ts_ms, src.processed_at, current_timestamp())
+                            src.price_category, src.is_active, src.op, src.src_ts_ms, src.src_source_lsn,
+                            src.processed_at, current_timestamp(), src._row_hash)
             """)
 
         elif table == "orders":
@@ -296,30 +551,36 @@ def merge_silver_proper(df, table):
                 MERGE INTO {target_table} AS tgt
                 USING silver_src_{table} AS src
                 ON tgt.id = src.src_id
-                WHEN MATCHED AND src.src_ts_ms > tgt.ts_ms THEN
+                WHEN MATCHED AND {newer} THEN
                     UPDATE SET
                         user_id = src.src_user_id,
                         product_id = src.src_product_id,
                         quantity = src.src_quantity,
                         total_amount = src.src_total_amount,
                         status = src.src_status,
+                        created_at = src.src_created_at,
                         order_value_category = src.order_value_category,
                         is_active = src.is_active,
                         op = src.op,
                         ts_ms = src.src_ts_ms,
+                        source_lsn = src.src_source_lsn,
                         processed_at = src.processed_at,
-                        _audit_updated_at = current_timestamp()
+                        _audit_updated_at = current_timestamp(),
+                        _row_hash = src._row_hash
                 WHEN MATCHED AND src.op = 'd' THEN
                     UPDATE SET
                         is_active = False,
                         op = 'd',
-                        _audit_updated_at = current_timestamp()
+                        _audit_updated_at = current_timestamp(),
+                        _row_hash = {deleted_hash}
                 WHEN NOT MATCHED THEN
-                    INSERT (id, user_id, product_id, quantity, total_amount, status,
-                            order_value_category, is_active, op, ts_ms, processed_at, _audit_updated_at)
+                    INSERT (id, user_id, product_id, quantity, total_amount, status, created_at,
+                            order_value_category, is_active, op, ts_ms, source_lsn, processed_at,
+                            _audit_updated_at, _row_hash)
                     VALUES (src.src_id, src.src_user_id, src.src_product_id, src.src_quantity,
-                            src.src_total_amount, src.src_status, src.order_value_category,
-                            src.is_active, src.op, src.src_ts_ms, src.processed_at, current_timestamp())
+                            src.src_total_amount, src.src_status, src.src_created_at, src.order_value_category,
+                            src.is_active, src.op, src.src_ts_ms, src.src_source_lsn, src.processed_at,
+                            current_timestamp(), src._row_hash)
             """)
 
         logger.info(f"MERGE completed for Silver {table}")
@@ -329,45 +590,376 @@ def merge_silver_proper(df, table):
         raise
 
 
-def process_table(table):
+def merge_silver_proper(df, table):
+    merge_silver(silver_source(df, table), table)
+
+
+def compact_raw(table):
+    try:
+        compact_raw_table(
+            spark, table, f"{RAW_ROOT}/{table}/", f"{RAW_COMPACTED_ROOT}/{table}", MANIFEST_TABLE
+        )
+    except Exception as e:
+        # Uncompacted objects are still read directly, so this never blocks ingestion
+        logger.warning(f"Raw compaction failed for {table}: {str(e)}")
+
+
+def raw_batch_pin_path(table):
+    return f"{CHECKPOINT_PATH}/raw_batches/{table}.json"
+
+
+def resume_pinned_batch(table):
+    # A previous run stopped between pinning its batch and recording it in the
+    # manifest; the same files give the same batch id, so an append that did
+    # commit is not repeated and only the manifest rows are written
+    pinned = load_pinned_batch(spark, raw_batch_pin_path(table))
+    if pinned is None:
+        return
+    if len(committed_paths(spark, MANIFEST_TABLE, table, pinned.files)) < len(pinned.files):
+        logger.warning(f"Resuming raw batch {pinned.batch_id} for {table} ({len(pinned.files)} files)")
+        if batch_committed(spark, f"glue_catalog.{DATABASE}.bronze_{table}", pinned.batch_id):
+            record_raw_batch(spark, MANIFEST_TABLE, pinned)
+        else:
+            write_raw_batch(table, pinned)
+    clear_pinned_batch(spark, raw_batch_pin_path(table))
+
+
+def ingest_bronze(table):
+    raw_batch = None
+    if INGEST_MODE == "incremental":
+        # Before compaction, which may pack and delete the pinned objects
+        resume_pinned_batch(table)
+        if RAW_COMPACTION:
+            compact_raw(table)
+        raw_batch = find_raw_batch(table)
+        if not raw_batch.files:
+            logger.info(f"No new raw files for {table}")
+            return
+        pin_raw_batch(spark, raw_batch_pin_path(table), raw_batch)
+
+    write_raw_batch(table, raw_batch)
+    if raw_batch is not None:
+        clear_pinned_batch(spark, raw_batch_pin_path(table))
+
+
+def write_raw_batch(table, raw_batch):
+    with metrics.stage("read_cdc", table=table) as timing:
+        cached_df, record_count = materialize_batch(read_cdc(table, raw_batch), table)
+        timing["records"] = record_count
+
+    try:
+        if record_count == 0:
+            logger.info(f"No new data for {table}")
+        else:
+            with metrics.stage("write_bronze", table=table) as timing:
+                write_bronze(cached_df.drop(CORRUPT_RECORD_COLUMN), table, raw_batch)
+                timing["records"] = record_count
+
+        if raw_batch is not None:
+            # Objects with no parseable records still count as consumed
+            record_raw_batch(spark, MANIFEST_TABLE, raw_batch)
+    finally:
+        release_batch(cached_df)
+
+
+def pending_bronze_range(table):
+    # (start, end] of Bronze snapshots Silver has not applied; end is None when
+    # Bronze is empty and start == end when Silver is up to date
+    bronze_table = f"glue_catalog.{DATABASE}.bronze_{table}"
+    silver_table = f"glue_catalog.{DATABASE}.silver_{table}"
+
+    end_snapshot = current_snapshot_id(spark, bronze_table)
+    if end_snapshot is None:
+        return None, None
+
+    last_applied = get_table_property(spark, silver_table, SILVER_WATERMARK_PROPERTY)
+    if last_applied is not None and int(last_applied) == end_snapshot:
+        return end_snapshot, end_snapshot
+
+    start_snapshot = int(last_applied) if last_applied is not None else None
+    if start_snapshot is not None and not is_current_ancestor(spark, bronze_table, start_snapshot):
+        # The watermark snapshot was expired; replaying all of Bronze is safe
+        # because the MERGE only applies changes newer than the target row.
+        logger.warning(f"Bronze snapshot {start_snapshot} no longer available, rebuilding Silver {table} from full Bronze")
+        start_snapshot = None
+    return start_snapshot, end_snapshot
+
+
+def read_bronze_changes(table):
+    start_snapshot, end_snapshot = pending_bronze_range(table)
+    if end_snapshot is None or start_snapshot == end_snapshot:
+        return None, end_snapshot
+
+    logger.info(f"Silver {table} source: Bronze snapshots ({start_snapshot}, {end_snapshot}]")
+    bronze_table = f"glue_catalog.{DATABASE}.bronze_{table}"
+    return read_appends_between(spark, bronze_table, start_snapshot, end_snapshot), end_snapshot
+
+
+def flag_unchanged(latest_df, table):
+    # Joins the collapsed changes to the target's row once; the flags drive the
+    # skip counts and the filtered MERGE source, the target's is_active and
+    # ts_ms the active-row delta
+    target = spark.table(f"glue_catalog.{DATABASE}.silver_{table}").select(
+        col("id").alias("_tgt_id"), col(ROW_HASH_COLUMN).alias("_tgt_row_hash"), col("_file").alias("_tgt_file"),
+        col("is_active").alias("_tgt_is_active"), col("ts_ms").alias("_tgt_ts_ms"),
+        col("source_lsn").alias("_tgt_source_lsn")
+    )
+    return latest_df.join(target, col("src_id") == col("_tgt_id"), "left") \
+        .withColumn("_unchanged", coalesce(col(ROW_HASH_COLUMN) == col("_tgt_row_hash"), lit(False))) \
+        .persist(StorageLevel.MEMORY_AND_DISK)
+
+
+def unchanged_stats(flagged_df):
+    # A target file is skipped when every change matched to it is a no-op; under
+    # copy-on-write that is a whole data file the MERGE no longer rewrites
+    row = flagged_df.filter(col("_tgt_file").isNotNull()) \
+        .groupBy("_tgt_file") \
+        .agg(min(col("_unchanged").cast("int")).alias("all_unchanged"),
+             sum(col("_unchanged").cast("int")).alias("unchanged")) \
+        .agg(count(lit(1)).alias("matched_files"),
+             sum("all_unchanged").alias("skipped_files"),
+             sum("unchanged").alias("skipped_rows")) \
+        .collect()[0]
+    return {"matched_files": row["matched_files"], "skipped_files": row["skipped_files"] or 0,
+            "skipped_rows": row["skipped_rows"] or 0}
+
+
+def tune_merge_broadcast(latest_df, table):
+    # The planned threshold is estimated from byte counts before the run; the
+    # cached collapsed source is measured, so the MERGE is sized from it.
+    # Concurrent tables share the session conf and keep the combined plan's.
+    if TABLE_PARALLELISM > 1 and len(source_tables()) > 1:
+        return
+    size = plan_size_bytes(latest_df)
+    if size is not None:
+        threshold = broadcast_threshold(size, TUNING_POLICY)
+        spark.conf.set("spark.sql.autoBroadcastJoinThreshold", str(threshold))
+        logger.info(f"Silver {table}: collapsed MERGE source ~{size // (1024 * 1024)} MB -> "
+                    f"broadcast below {threshold // (1024 * 1024)} MB")
+
+
+def apply_silver_changes(changes_df, table, properties, chunk_label=None):
+    silver_table = f"glue_catalog.{DATABASE}.silver_{table}"
+    # Collapsed to one row per id; persisted so the stats and the MERGE share it
+    latest_df = silver_source(changes_df, table).persist(StorageLevel.MEMORY_AND_DISK)
+    flagged_df = None
+    try:
+        labels = {"table": table} if chunk_label is None else {"table": table, "chunk": chunk_label}
+        with metrics.stage("merge_silver", **labels) as timing:
+            stats = collapse_stats(latest_df)
+            timing.update(records=stats["events"], collapsed=stats["collapsed"])
+            logger.info(f"Silver {table}: {stats['events']} changes collapsed to {stats['keys']} ids")
+            if SPARK_TUNING == "auto":
+                tune_merge_broadcast(latest_df, table)
+
+            source_df = latest_df
+            if SKIP_UNCHANGED_ROWS or TABLE_STATS == "metadata":
+                flagged_df = flag_unchanged(latest_df, table)
+            if SKIP_UNCHANGED_ROWS:
+                skipped = unchanged_stats(flagged_df)
+                timing.update(skipped)
+                logger.info(f"Silver {table}: skipping {skipped['skipped_rows']} unchanged rows, "
+                            f"{skipped['skipped_files']} of {skipped['matched_files']} matched files")
+                source_df = flagged_df.filter(~col("_unchanged")).select(*latest_df.columns)
+
+            active = None
+            if TABLE_STATS == "metadata":
+                # Skipped rows are unchanged, is_active included, so they move nothing
+                active = active_rows(spark, silver_table) + active_row_delta(flagged_df)
+            merge_silver(source_df, table)
+
+        # Recorded after the MERGE commit; a crash in between only replays
+        # changes the MERGE already applied, which it ignores on (source_lsn,
+        # ts_ms). The active-row counter is tied to the MERGE's snapshot, so a
+        # crash here leaves it stale and the next run recounts once.
+        properties = dict(properties)
+        if active is not None:
+            properties.update(active_rows_properties(active, current_snapshot_id(spark, silver_table)))
+        set_table_properties(spark, silver_table, properties)
+    finally:
+        if flagged_df is not None:
+            flagged_df.unpersist()
+        latest_df.unpersist()
+
+
+def merge_catchup_chunk(table, chunk, chunk_label=None):
+    bronze_table = f"glue_catalog.{DATABASE}.bronze_{table}"
+    silver_table = f"glue_catalog.{DATABASE}.silver_{table}"
+    changes_df = read_appends_between(spark, bronze_table, chunk.start_snapshot_id, chunk.end_snapshot_id)
+    if chunk.buckets == 1:
+        apply_silver_changes(changes_df, table, {SILVER_WATERMARK_PROPERTY: chunk.end_snapshot_id}, chunk_label)
+        return
+
+    # A single snapshot larger than the budget is split by id hash; each bucket
+    # rescans the chunk's files but shuffles and merges only its own ids
+    done = completed_buckets(chunk, get_table_property(spark, silver_table, CATCHUP_PROGRESS_PROPERTY))
+    if done:
+        logger.info(f"Silver {table}: resuming Bronze snapshot {chunk.end_snapshot_id} at bucket {done}/{chunk.buckets}")
+    for bucket in range(done, chunk.buckets):
+        properties = {CATCHUP_PROGRESS_PROPERTY: progress_value(chunk, bucket + 1)}
+        if bucket == chunk.buckets - 1:
+            properties[SILVER_WATERMARK_PROPERTY] = chunk.end_snapshot_id
+        apply_silver_changes(changes_df.filter(expr(f"pmod(hash(id), {chunk.buckets}) = {bucket}")),
+                             table, properties, f"{chunk_label or 1}.{bucket + 1}")
+
+
+def update_silver(table):
+    bronze_table = f"glue_catalog.{DATABASE}.bronze_{table}"
+    start_snapshot, end_snapshot = pending_bronze_range(table)
+    if end_snapshot is None or start_snapshot == end_snapshot:
+        logger.info(f"Silver {table} is up to date with Bronze")
+        return
+
+    chunks = plan_catchup_chunks(
+        ancestor_snapshots_between(spark, bronze_table, start_snapshot, end_snapshot),
+        start_snapshot, CATCHUP_CHUNK_BYTES
+    )
+    split = len(chunks) > 1 or any(c.buckets > 1 for c in chunks)
+    if split:
+        logger.info(f"Silver {table} catch-up: Bronze snapshots ({start_snapshot}, {end_snapshot}] "
+                    f"in {len(chunks)} chunks of at most {CATCHUP_CHUNK_BYTES // (1024 * 1024)} MB")
+        metrics.record(f"catchup/{table}", {"chunks": len(chunks), "buckets": sum(c.buckets for c in chunks)})
+
+    # Every chunk moves the watermark, so a failed run resumes after the last committed chunk
+    for number, chunk in enumerate(chunks, 1):
+        logger.info(f"Silver {table} source: Bronze snapshots ({chunk.start_snapshot_id}, {chunk.end_snapshot_id}] "
+                    f"({number}/{len(chunks)}, ~{chunk.bytes // (1024 * 1024)} MB)")
+        merge_catchup_chunk(table, chunk, str(number) if split else None)
+    logger.info(f"Silver {table} caught up to Bronze snapshot {end_snapshot}")
+
+
+def log_table_counts(table):
+    bronze_table = f"glue_catalog.{DATABASE}.bronze_{table}"
+    silver_table = f"glue_catalog.{DATABASE}.silver_{table}"
+
+    if TABLE_STATS == "scan":
+        bronze_count = spark.sql(f"SELECT COUNT(*) FROM {bronze_table}").collect()[0][0]
+        silver_count = spark.sql(f"SELECT COUNT(*) FROM {silver_table}").collect()[0][0]
+        active_count = spark.sql(f"SELECT COUNT(*) FROM {silver_table} WHERE is_active = true").collect()[0][0]
+        logger.info(f"Counts - Bronze: {bronze_count}, Silver: {silver_count}, Active: {active_count}")
+        return
+
+    bronze_stats = table_stats(spark, bronze_table)
+    silver_stats = table_stats(spark, silver_table)
+    metrics.record(bronze_table, bronze_stats.as_dict())
+    metrics.record(silver_table, silver_stats.as_dict())
+    active = silver_stats.active_rows if silver_stats.active_rows is not None else "unknown"
+    silver_rows = silver_stats.rows if silver_stats.rows_exact else f">={silver_stats.rows}"
+    logger.info(
+        f"Counts - Bronze: {bronze_stats.rows} ({bronze_stats.data_files} files), "
+        f"Silver: {silver_rows} ({silver_stats.data_files} files, "
+        f"{silver_stats.delete_files} delete files), Active: {active}"
+    )
+
+
+def pending_silver_bytes(table):
+    # In-memory size of the Bronze delta Silver has not applied yet
+    bronze_table = f"glue_catalog.{DATABASE}.bronze_{table}"
+    silver_table = f"glue_catalog.{DATABASE}.silver_{table}"
+    if not (spark.catalog.tableExists(bronze_table) and spark.catalog.tableExists(silver_table)):
+        return 0
+    watermark = get_table_property(spark, silver_table, SILVER_WATERMARK_PROPERTY)
+    delta = added_bytes_between(spark, bronze_table, int(watermark) if watermark else None,
+                                current_snapshot_id(spark, bronze_table))
+    return merge_source_bytes(parquet_input_bytes(delta, TUNING_POLICY))
+
+
+def merge_source_bytes(delta_bytes):
+    if CATCHUP_CHUNK_BYTES > 0:
+        # A backlog is merged chunk by chunk, so no MERGE sees more than this
+        return min(delta_bytes, parquet_input_bytes(CATCHUP_CHUNK_BYTES, TUNING_POLICY))
+    return delta_bytes
+
+
+def plan_table_tuning(table):
+    # Shuffle sizing covers the whole run: pending raw objects for Bronze plus
+    # the Bronze delta Silver has not applied yet
+    raw_bytes = 0
+    if "bronze" in RUN_LAYERS:
+        if INGEST_MODE == "incremental":
+            files = find_raw_batch(table).files
+        else:
+            files = list_raw_files(spark, f"{RAW_ROOT}/{table}/")
+        raw_bytes = raw_input_bytes(files, TUNING_POLICY)
+    if "silver" not in RUN_LAYERS:
+        # No MERGE joins against Silver, so the broadcast threshold stays at its floor
+        return plan_tuning(raw_bytes, spark.sparkContext.defaultParallelism, TUNING_POLICY)
+
+    # The broadcast side is the MERGE source alone: the Bronze delta one MERGE
+    # reads, this run's raw batch included; collapsing only shrinks it
+    pending = pending_silver_bytes(table)
+    return plan_tuning(raw_bytes + pending, spark.sparkContext.defaultParallelism, TUNING_POLICY,
+                       broadcast_side_bytes=merge_source_bytes(pending + raw_bytes))
+
+
+def plan_tuning_for_tables(tables):
+    plans = {}
+    for table in tables:
+        try:
+            plans[table] = plan_table_tuning(table)
+            metrics.record(f"tuning/{table}", asdict(plans[table]))
+        except Exception as e:
+            logger.warning(f"Could not size input for {table}, keeping current Spark settings: {str(e)}")
+    return plans
+
+
+def process_table(table, tuning_plan=None):
     try:
         logger.info(f"Processing table: {table}")
+        if tuning_plan is not None:
+            apply_tuning(spark, tuning_plan, table)
 
         create_bronze_table(table)
         create_silver_table(table)
 
-        df = read_cdc(table)
-        if df is None or df.rdd.isEmpty():
-            logger.info(f"No new data for {table}, skipping")
-            return
-
-        write_bronze(df, table)
-        merge_silver_proper(df, table)
+        if "bronze" in RUN_LAYERS:
+            ingest_bronze(table)
+        if "silver" in RUN_LAYERS:
+            update_silver(table)
 
         try:
-            bronze_count = spark.sql(f"SELECT COUNT(*) FROM glue_catalog.{DATABASE}.bronze_{table}").collect()[0][0]
-            silver_count = spark.sql(f"SELECT COUNT(*) FROM glue_catalog.{DATABASE}.silver_{table}").collect()[0][0]
-            active_count = spark.sql(f"SELECT COUNT(*) FROM glue_catalog.{DATABASE}.silver_{table} WHERE is_active = true").collect()[0][0]
-            logger.info(f"Counts - Bronze: {bronze_count}, Silver: {silver_count}, Active: {active_count}")
+            log_table_counts(table)
         except Exception as count_e:
             logger.warning(f"Could not get counts: {str(count_e)}")
 
     except Exception as e:
         logger.error(f"Failed processing table {table}: {str(e)}")
-        logger.warning(f"Skipping table {table} due to error")
+        raise
 
 
 def optimize_tables():
     try:
-        logger.info("Running Iceberg compaction...")
-        for table in ["users", "products", "orders"]:
-            for layer in ["bronze", "silver"]:
-                try:
-                    full_table = f"glue_catalog.{DATABASE}.{layer}_{table}"
-                    spark.sql(f"OPTIMIZE {full_table} REWRITE DATA USING BIN_PACK")
-                    logger.info(f"Optimized: {full_table}")
-                except Exception as opt_e:
-                    logger.warning(f"Optimization skip for {full_table}: {str(opt_e)}")
+        logger.info("Running Iceberg maintenance...")
+        policy = MaintenancePolicy(
+            time_budget_seconds=MAINTENANCE_BUDGET_SECONDS,
+            snapshot_retention_hours=SNAPSHOT_RETENTION_HOURS,
+            tombstone_retention_days=TOMBSTONE_RETENTION_DAYS or None
+        )
+
+        tables = []
+        protected = {}
+        archives = {}
+        for table in source_tables():
+            bronze_table = f"glue_catalog.{DATABASE}.bronze_{table}"
+            silver_table = f"glue_catalog.{DATABASE}.silver_{table}"
+            tables += [bronze_table, silver_table]
+            # Silver still has to read Bronze incrementally from its watermark
+            watermark = get_table_property(spark, silver_table, SILVER_WATERMARK_PROPERTY)
+            if watermark is not None:
+                protected[bronze_table] = int(watermark)
+            if TOMBSTONE_RETENTION_DAYS > 0:
+                archive_table = f"glue_catalog.{DATABASE}.silver_{table}_deleted" if TOMBSTONE_ARCHIVE else None
+                archives[silver_table] = archive_table
+                if archive_table is not None and spark.catalog.tableExists(archive_table):
+                    tables.append(archive_table)
+        # One small append per table per run; compacted and expired like the layers
+        if spark.catalog.tableExists(MANIFEST_TABLE):
+            tables.append(MANIFEST_TABLE)
+
+        results = maintain_tables(spark, tables, policy, protected, archives)
+        for result in results:
+            if result.action == "purge_tombstones" and result.error is None:
+                metrics.record(f"tombstones/{result.table}", result.details)
     except Exception as e:
         logger.warning(f"Optimization failed: {str(e)}")
 
@@ -376,19 +968,34 @@ def main():
     logger.info("Starting CDC Processing Pipeline")
 
     try:
-        for tbl in ["users", "products", "orders"]:
-            process_table(tbl)
-
-        optimize_tables()
+        tables = source_tables()
+        plans = plan_tuning_for_tables(tables) if SPARK_TUNING == "auto" else {}
+        if TABLE_PARALLELISM > 1 and len(tables) > 1:
+            # Concurrent tables share the session confs
+            if plans:
+                apply_tuning(spark, combine_plans(plans.values()), "all tables")
+            results = run_tables(spark, tables, process_table, TABLE_PARALLELISM)
+        else:
+            results = run_tables(spark, tables, lambda t: process_table(t, plans.get(t)), TABLE_PARALLELISM)
+        failed = [r.table for r in results if not r.succeeded]
+        if failed:
+            logger.warning(f"Tables skipped due to errors: {failed}")
+
+        if "maintenance" in RUN_LAYERS:
+            with metrics.stage("optimize_tables"):
+                optimize_tables()
 
         logger.info("CDC Processing Pipeline Completed Successfully!")
 
     except Exception as e:
         logger.error(f"Pipeline failed: {str(e)}")
         raise
+    finally:
+        metrics.emit()
+        metrics.close()
 
 
 if __name__ == "__main__":
     main()
-    job.commit()
+    commit_job(job)
 
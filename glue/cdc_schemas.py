@@ -0,0 +1,220 @@
+import logging
+
+from pyspark.sql.types import (
+    StructType, StructField, LongType, IntegerType, DoubleType,
+    StringType, BooleanType, TimestampType
+)
+
+
+logger = logging.getLogger("cdc-iceberg-job")
+
+SQL_TYPES = {
+    "BIGINT": LongType(),
+    "INT": IntegerType(),
+    "DOUBLE": DoubleType(),
+    "STRING": StringType(),
+    "BOOLEAN": BooleanType(),
+    "TIMESTAMP": TimestampType(),
+}
+
+# Source table columns as captured by Debezium. Bronze DDL, the raw JSON read
+# schema and the Bronze projection are all derived from these.
+SOURCE_COLUMNS = {
+    "users": [
+        ("id", "BIGINT"), ("name", "STRING"), ("email", "STRING"),
+        ("created_at", "BIGINT"), ("updated_at", "BIGINT"),
+    ],
+    "products": [
+        ("id", "BIGINT"), ("name", "STRING"), ("price", "DOUBLE"), ("category", "STRING"),
+        ("created_at", "BIGINT"), ("updated_at", "BIGINT"),
+    ],
+    "orders": [
+        ("id", "BIGINT"), ("user_id", "BIGINT"), ("product_id", "BIGINT"), ("quantity", "INT"),
+        ("total_amount", "DOUBLE"), ("status", "STRING"),
+        ("created_at", "BIGINT"), ("updated_at", "BIGINT"),
+    ],
+}
+
+# Fields added by the ExtractNewRecordState transform: (raw field, bronze column, type)
+CDC_FIELDS = [
+    ("__op", "op", "STRING"),
+    ("__ts_ms", "ts_ms", "BIGINT"),
+    # add.fields=source.lsn; orders changes that share a ts_ms millisecond
+    ("__source_lsn", "source_lsn", "BIGINT"),
+]
+
+# Silver keeps the latest state per id plus derived and audit columns
+SILVER_COLUMNS = {
+    "users": [
+        ("id", "BIGINT"), ("name", "STRING"), ("email", "STRING"), ("email_domain", "STRING"),
+        ("is_active", "BOOLEAN"), ("op", "STRING"), ("ts_ms", "BIGINT"), ("source_lsn", "BIGINT"),
+        ("processed_at", "TIMESTAMP"), ("_audit_updated_at", "TIMESTAMP"), ("_row_hash", "BIGINT"),
+    ],
+    "products": [
+        ("id", "BIGINT"), ("name", "STRING"), ("price", "DOUBLE"), ("category", "STRING"),
+        ("price_category", "STRING"), ("is_active", "BOOLEAN"), ("op", "STRING"), ("ts_ms", "BIGINT"),
+        ("source_lsn", "BIGINT"), ("processed_at", "TIMESTAMP"), ("_audit_updated_at", "TIMESTAMP"),
+        ("_row_hash", "BIGINT"),
+    ],
+    "orders": [
+        ("id", "BIGINT"), ("user_id", "BIGINT"), ("product_id", "BIGINT"), ("quantity", "INT"),
+        ("total_amount", "DOUBLE"), ("status", "STRING"), ("created_at", "BIGINT"),
+        ("order_value_category", "STRING"), ("is_active", "BOOLEAN"), ("op", "STRING"), ("ts_ms", "BIGINT"),
+        ("source_lsn", "BIGINT"), ("processed_at", "TIMESTAMP"), ("_audit_updated_at", "TIMESTAMP"),
+        ("_row_hash", "BIGINT"),
+    ],
+}
+
+# Hash of the business columns a Silver row carries; a change that hashes the
+# same as the current row (e.g. only updated_at moved) is not merged
+ROW_HASH_COLUMN = "_row_hash"
+ROW_HASH_COLUMNS = {
+    "users": ["name", "email", "is_active"],
+    "products": ["name", "price", "category", "is_active"],
+    "orders": ["user_id", "product_id", "quantity", "total_amount", "status", "created_at", "is_active"],
+}
+
+# days: original layout, partitions by load day; a MERGE on id has to scan every day.
+# bucket: hashes id into N buckets and sorts by id inside each, so the MERGE's
+# runtime filter on changed ids only opens the buckets (and row groups) holding them.
+SILVER_LAYOUTS = ("days", "bucket")
+
+# copy-on-write: a MERGE rewrites every data file holding a matched row.
+# merge-on-read: a MERGE writes small position delete files plus the new rows;
+# maintenance later folds the deletes back into the data files.
+MERGE_MODES = ("copy-on-write", "merge-on-read")
+
+# Declared write ordering per layer: (distribution, sort columns).
+# Bronze is range-distributed on ts_ms so files cover disjoint time ranges;
+# Silver is sorted by id so min/max stats prune point lookups and the MERGE's
+# runtime id filter. Under the days layout Silver is range-distributed on id:
+# hashing by partition would send a MERGE's whole rewrite of a busy day to one
+# task. Bucket partitions are already id slices, so each is hashed to one task.
+WRITE_ORDER = {
+    "bronze": ("range", ["ts_ms"]),
+    "silver": ("range", ["id"]),
+    "silver_bucket": ("hash", ["id"]),
+}
+# Sort direction for every write order and sort rewrite
+SORT_TERM = "ASC NULLS LAST"
+
+CORRUPT_RECORD_COLUMN = "_corrupt_record"
+
+
+def source_tables():
+    return list(SOURCE_COLUMNS)
+
+
+def _source_columns(table):
+    if table not in SOURCE_COLUMNS:
+        raise ValueError(f"Unknown CDC table: {table}")
+    return SOURCE_COLUMNS[table]
+
+
+def raw_schema(table):
+    fields = [StructField(name, SQL_TYPES[sql_type], True) for name, sql_type in _source_columns(table)]
+    fields += [StructField(raw, SQL_TYPES[sql_type], True) for raw, _, sql_type in CDC_FIELDS]
+    fields.append(StructField(CORRUPT_RECORD_COLUMN, StringType(), True))
+    return StructType(fields)
+
+
+def bronze_columns(table):
+    columns = list(_source_columns(table))
+    columns += [(name, sql_type) for _, name, sql_type in CDC_FIELDS]
+    columns.append(("processed_at", "TIMESTAMP"))
+    return columns
+
+
+def bronze_ddl_columns(table):
+    return ", ".join(f"{name} {sql_type}" for name, sql_type in bronze_columns(table))
+
+
+def silver_ddl_columns(table):
+    if table not in SILVER_COLUMNS:
+        raise ValueError(f"Unknown CDC table: {table}")
+    return ", ".join(f"{name} {sql_type}" for name, sql_type in SILVER_COLUMNS[table])
+
+
+def row_hash_sql(table, columns=None):
+    # columns maps a hashed column to the SQL expression holding its value; by
+    # default the Silver column itself. Values are cast to the Silver type so
+    # source and target hash alike, and each is preceded by its null flag
+    # because xxhash64 skips nulls.
+    silver_types = dict(SILVER_COLUMNS[table])
+    values = []
+    for name in ROW_HASH_COLUMNS[table]:
+        value = f"CAST({(columns or {}).get(name, name)} AS {silver_types[name]})"
+        values.append(f"isnull({value}), {value}")
+    return f"xxhash64({', '.join(values)})"
+
+
+def silver_partition_clause(layout, buckets):
+    if layout == "days":
+        return "days(processed_at)"
+    if layout == "bucket":
+        return f"bucket({int(buckets)}, id)"
+    raise ValueError(f"Unknown Silver layout: {layout}")
+
+
+def sort_order_sql(layer):
+    # e.g. "id ASC NULLS LAST"; also the sort_order of rewrite_data_files
+    _, columns = WRITE_ORDER[layer]
+    return ", ".join(f"{c} {SORT_TERM}" for c in columns)
+
+
+def write_order_clause(layer):
+    distribution, _ = WRITE_ORDER[layer]
+    if distribution == "range":
+        return f"WRITE ORDERED BY {sort_order_sql(layer)}"
+    return f"WRITE DISTRIBUTED BY PARTITION LOCALLY ORDERED BY {sort_order_sql(layer)}"
+
+
+def sort_order_terms(sort_order):
+    # Iceberg reports the order as e.g. "ts_ms ASC NULLS FIRST, id ASC NULLS FIRST"
+    if not sort_order:
+        return []
+    return [" ".join(term.split()).upper() for term in sort_order.split(",")]
+
+
+def bloom_filter_properties(columns):
+    return {f"write.parquet.bloom-filter-enabled.column.{c}": "true" for c in columns}
+
+
+def merge_mode_properties(mode):
+    if mode not in MERGE_MODES:
+        raise ValueError(f"Unknown merge mode: {mode}")
+    return {"write.merge.mode": mode, "write.update.mode": mode, "write.delete.mode": mode}
+
+
+def detect_schema_drift(spark, table, sample_paths):
+    # Infers only over a handful of recent objects; the main read never infers.
+    if not sample_paths:
+        return {}
+
+    sampled = spark.read.json(sample_paths).schema
+    declared = {name: SQL_TYPES[sql_type] for name, sql_type in _source_columns(table)}
+    declared.update({raw: SQL_TYPES[sql_type] for raw, _, sql_type in CDC_FIELDS})
+
+    observed = {f.name: f.dataType for f in sampled.fields if f.name != CORRUPT_RECORD_COLUMN}
+    drift = {
+        # Other "__" fields are Debezium metadata (__deleted, __source_*), not source columns
+        "unexpected": sorted(n for n in observed if n not in declared and not n.startswith("__")),
+        "missing": sorted(n for n in declared if n not in observed),
+        "type_changed": sorted(
+            f"{n}: {declared[n].simpleString()} -> {observed[n].simpleString()}"
+            for n in declared
+            if n in observed and not _compatible(declared[n], observed[n])
+        ),
+    }
+    return {k: v for k, v in drift.items() if v}
+
+
+def _compatible(declared, observed):
+    # JSON inference widens every integer to bigint and every decimal to double
+    if declared == observed:
+        return True
+    if isinstance(declared, (IntegerType, LongType)) and isinstance(observed, LongType):
+        return True
+    if isinstance(declared, DoubleType) and isinstance(observed, (LongType, DoubleType)):
+        return True
+    return False
@@ -0,0 +1,111 @@
+import logging
+
+from pyspark.sql.functions import col, from_json
+
+# Importing the batch job sets up the session, catalog, options and table helpers
+import cdc_processor as cdc
+from cdc_schemas import CORRUPT_RECORD_COLUMN, raw_schema, source_tables
+
+
+logger = logging.getLogger("cdc-iceberg-job")
+
+spark = cdc.spark
+
+KAFKA_BOOTSTRAP_SERVERS = cdc.get_optional_arg("KAFKA_BOOTSTRAP_SERVERS", "localhost:9092")
+# Debezium topics are {topic.prefix}.{schema}.{table}
+TOPIC_PREFIX = cdc.get_optional_arg("TOPIC_PREFIX", "cdc.public.")
+TRIGGER_SECONDS = int(cdc.get_optional_arg("TRIGGER_SECONDS", "60"))
+MAX_OFFSETS_PER_TRIGGER = int(cdc.get_optional_arg("MAX_OFFSETS_PER_TRIGGER", "500000"))
+STARTING_OFFSETS = cdc.get_optional_arg("STARTING_OFFSETS", "earliest")
+STREAM_NAME = cdc.get_optional_arg("STREAM_NAME", "cdc-stream")
+STREAM_CHECKPOINT_PATH = cdc.get_optional_arg(
+    "STREAM_CHECKPOINT_PATH", f"s3://{cdc.BUCKET}/checkpoints/{cdc.args['JOB_NAME']}/stream"
+)
+
+
+def stream_batch_id(table, batch_id):
+    # Stable across restarts: the query resumes from its checkpoint with the same batch ids
+    return f"{STREAM_NAME}-{table}-{batch_id}"
+
+
+def parse_topic(batch_df, table):
+    options = {"mode": "PERMISSIVE", "columnNameOfCorruptRecord": CORRUPT_RECORD_COLUMN}
+    parsed = batch_df.filter(col("topic") == f"{TOPIC_PREFIX}{table}") \
+        .select(from_json(col("value"), raw_schema(table), options).alias("r")) \
+        .select("r.*")
+    return cdc.bronze_projection(parsed, table)
+
+
+def tune_silver(table):
+    # Sized per micro-batch from the Bronze delta the MERGE is about to read;
+    # a quiet trigger gets few shuffle partitions, a replayed backlog many
+    try:
+        pending = cdc.pending_silver_bytes(table)
+        if pending:
+            cdc.apply_tuning(spark, cdc.plan_tuning(pending, spark.sparkContext.defaultParallelism, cdc.TUNING_POLICY,
+                                                    broadcast_side_bytes=pending), table)
+    except Exception as e:
+        logger.warning(f"Could not size Silver input for {table}, keeping current Spark settings: {str(e)}")
+
+
+def process_micro_batch(batch_df, batch_id):
+    # A failed micro-batch is re-run with the same batch id. The Bronze append
+    # is skipped when its batch id is already on a snapshot, and Silver catches
+    # up from its Bronze snapshot watermark, so a replay changes nothing.
+    batch_df = batch_df.select(col("topic"), col("value").cast("string").alias("value")).persist()
+    try:
+        counts = {r["topic"]: r["count"] for r in batch_df.groupBy("topic").count().collect()}
+        for table in source_tables():
+            records = counts.get(f"{TOPIC_PREFIX}{table}", 0)
+            if records:
+                with cdc.metrics.stage("stream_bronze", table=table) as timing:
+                    cdc.write_bronze(parse_topic(batch_df, table).drop(CORRUPT_RECORD_COLUMN), table,
+                                     batch_id=stream_batch_id(table, batch_id))
+                    timing["records"] = records
+            if cdc.SPARK_TUNING == "auto":
+                tune_silver(table)
+            # Also catches Silver up after a crash between the two commits
+            cdc.update_silver(table)
+        logger.info(f"Micro-batch {batch_id}: {counts}")
+    finally:
+        batch_df.unpersist()
+        cdc.metrics.flush()
+
+
+def kafka_source():
+    return spark.readStream.format("kafka") \
+        .option("kafka.bootstrap.servers", KAFKA_BOOTSTRAP_SERVERS) \
+        .option("subscribe", ",".join(f"{TOPIC_PREFIX}{t}" for t in source_tables())) \
+        .option("startingOffsets", STARTING_OFFSETS) \
+        .option("maxOffsetsPerTrigger", MAX_OFFSETS_PER_TRIGGER) \
+        .option("failOnDataLoss", "false") \
+        .load()
+
+
+def start_stream(source_df):
+    # source_df needs topic and value columns, as the Kafka source provides
+    for table in source_tables():
+        cdc.create_bronze_table(table)
+        cdc.create_silver_table(table)
+
+    return source_df.writeStream \
+        .queryName(STREAM_NAME) \
+        .foreachBatch(process_micro_batch) \
+        .option("checkpointLocation", STREAM_CHECKPOINT_PATH) \
+        .trigger(processingTime=f"{TRIGGER_SECONDS} seconds") \
+        .start()
+
+
+def main():
+    logger.info(f"Starting CDC stream {STREAM_NAME} from {KAFKA_BOOTSTRAP_SERVERS} "
+                f"(trigger {TRIGGER_SECONDS}s, max {MAX_OFFSETS_PER_TRIGGER} offsets)")
+    query = start_stream(kafka_source())
+    try:
+        query.awaitTermination()
+    finally:
+        cdc.metrics.close()
+
+
+if __name__ == "__main__":
+    main()
+    cdc.commit_job(cdc.job)
@@ -1,34 +1,129 @@
 import sys
 import logging
-from awsglue.utils import getResolvedOptions
-from pyspark.context import SparkContext
-from awsglue.context import GlueContext
-from awsglue.job import Job
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Dict, Tuple
 from pyspark.sql.functions import *
 from pyspark.sql.types import *
 from pyspark.sql.window import Window
+from pyspark import SparkConf, StorageLevel
+from pyspark.sql import DataFrame
+
+from gold_incremental import (
+    can_diff, changed_rows, compare_gold, gold_watermarks, merge_gold_keys, overwrite_gold_keys,
+    overwrite_partitions, read_silver_at, watermark_properties
+)
+from gold_rollups import (
+    ROLLUP_DIMENSIONS, ROLLUP_GRAINS, ROLLUP_PARTITIONS, ROLLUP_SOURCES, aggregate_rollup, derive_rollup,
+    finish_rollup, partition_keys, partition_range, rollup_columns, route_rollup, source_date_keys
+)
+from hll_sketch import DEFAULT_PRECISION, hll_estimate, hll_merge, hll_sketch
+from iceberg_tables import (
+    add_missing_columns, current_snapshot_id, get_table_properties, latest_snapshot_summary, partition_transforms,
+    set_table_properties
+)
+from job_metrics import RunMetrics, create_sinks
+from job_runtime import commit_job, configure_glue_catalog, init_job, location_clause, resolve_options
+from skew_joins import SkewPolicy, skew_join
+from spark_tuning import MB, TuningPolicy, apply_tuning, parquet_input_bytes, plan_tuning
+from table_scheduler import run_tables
+from table_stats import table_stats
 
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-args = getResolvedOptions(sys.argv, ['JOB_NAME', 'DATABASE_NAME', 'S3_BUCKET'])
+args = resolve_options(sys.argv, ['JOB_NAME', 'DATABASE_NAME', 'S3_BUCKET'])
 
-sc = SparkContext()
-glueContext = GlueContext(sc)
-spark = glueContext.spark_session
-job = Job(glueContext)
-job.init(args['JOB_NAME'], args)
+# FAIR scheduling lets the concurrent gold writes share executors
+spark, job = init_job(args, SparkConf().set("spark.scheduler.mode", "FAIR"))
 
 DATABASE_NAME = args['DATABASE_NAME']
 S3_BUCKET = args['S3_BUCKET']
 
+
+def get_optional_arg(name, default):
+    if f"--{name}" in sys.argv:
+        return resolve_options(sys.argv, [name])[name]
+    return default
+
+
+# Comma list of metrics sinks: emf (CloudWatch via the log stream), s3://... or a local directory
+METRICS_SINK = get_optional_arg("METRICS_SINK", "emf")
+# auto: size shuffle partitions and the broadcast threshold from the Silver tables' metadata
+SPARK_TUNING = get_optional_arg("SPARK_TUNING", "auto")
+# incremental: recompute only the gold keys whose Silver rows changed since the
+# snapshots the gold table records, falling back to a full rebuild when needed
+# full: rebuild every gold table from all active Silver rows
+# verify: rebuild in memory and diff against the gold tables, writing nothing
+GOLD_MODE = get_optional_arg("GOLD_MODE", "incremental")
+# Beyond this share of a table's keys, one full rebuild beats a keyed MERGE
+GOLD_FULL_REFRESH_RATIO = float(get_optional_arg("GOLD_FULL_REFRESH_RATIO", "0.3"))
+GOLD_CHANGE_MARGIN_MINUTES = int(get_optional_arg("GOLD_CHANGE_MARGIN_MINUTES", "10"))
+# Gold tables written concurrently from the shared Silver scans
+GOLD_PARALLELISM = int(get_optional_arg("GOLD_PARALLELISM", "3"))
+
+# auto: sample the order side of the order joins for heavy users and products
+# and join those through a broadcast of their dimension rows; off: plain joins
+SKEW_JOINS = get_optional_arg("SKEW_JOINS", "auto")
+SKEW_SAMPLE_FRACTION = float(get_optional_arg("SKEW_SAMPLE_FRACTION", "0.01"))
+# Dimension sides estimated below this in memory are broadcast whole
+BROADCAST_DIMENSION_MB = int(get_optional_arg("BROADCAST_DIMENSION_MB", "64"))
+
+# Hour, day, week and month revenue by category and user segment (gold_sales_rollup_{grain})
+SALES_ROLLUP = get_optional_arg("SALES_ROLLUP", "true").lower() == "true"
+
+GOLD_TABLES = ["user_analytics", "product_analytics", "sales_summary"]
+# The rollup grains are planned, refreshed and verified together under one name
+ROLLUP_NAME = "sales_rollup"
+GOLD_KEYS = {"user_analytics": "user_id", "product_analytics": "product_id", "sales_summary": "date_key"}
+# Silver inputs per gold table; the first is the dimension the table is keyed on
+GOLD_SOURCES = {
+    "user_analytics": ["users", "orders"],
+    "product_analytics": ["products", "orders"],
+    "sales_summary": ["orders"],
+    ROLLUP_NAME: ["products", "orders"],
+}
+# Gold tables partitioned by their key; their incremental refresh overwrites the
+# affected partitions instead of merging rows
+GOLD_PARTITIONS = {"sales_summary": "date_key"}
+# Days after which a change to an order no longer reopens its sales_summary day;
+# older days stay as they are until a full refresh (0: no limit)
+SALES_SUMMARY_LATE_DAYS = int(get_optional_arg("SALES_SUMMARY_LATE_DAYS", "0"))
+# Store a HyperLogLog sketch of the customers next to unique_customers, so unique
+# counts over several products or days merge from gold without reading Silver
+GOLD_SKETCHES = get_optional_arg("GOLD_SKETCHES", "false").lower() == "true"
+# exact: countDistinct over the orders
+# approx: unique_customers estimated from the sketches, which are then always stored
+UNIQUE_CUSTOMERS_MODE = get_optional_arg("UNIQUE_CUSTOMERS_MODE", "exact")
+HLL_PRECISION = int(get_optional_arg("HLL_PRECISION", str(DEFAULT_PRECISION)))
+if UNIQUE_CUSTOMERS_MODE not in ("exact", "approx"):
+    raise ValueError(f"UNIQUE_CUSTOMERS_MODE must be exact or approx, got {UNIQUE_CUSTOMERS_MODE}")
+if (GOLD_SKETCHES or UNIQUE_CUSTOMERS_MODE == "approx") and not 4 <= HLL_PRECISION <= 16:
+    raise ValueError(f"HLL_PRECISION must be between 4 and 16, got {HLL_PRECISION}")
+# Gold tables with a customer_sketch column; the precision the stored sketches
+# were built at is recorded so sketches of different sizes are never merged
+SKETCH_TABLES = ["product_analytics", "sales_summary"]
+SKETCH_PRECISION_PROPERTY = "cdc.gold.hll-precision"
+SKETCH_COLUMN = ("customer_sketch", "ARRAY<TINYINT>")
+
+# The only Silver columns the gold builds read
+SILVER_INPUT_COLUMNS = {
+    "users": ["id", "name", "email_domain", "processed_at"],
+    "products": ["id", "name", "category", "price"],
+    "orders": ["user_id", "product_id", "total_amount", "created_at"],
+}
+# Columns of changed Silver rows that locate the gold keys they affect
+CHANGE_COLUMNS = {
+    "users": ["id"],
+    "products": ["id", "category", "is_active"],
+    "orders": ["id", "user_id", "product_id", "created_at"],
+}
+
 logger.info(f"Starting Gold Processor - Database: {DATABASE_NAME}")
 
-spark.conf.set("spark.sql.catalog.glue_catalog", "org.apache.iceberg.spark.SparkCatalog")
-spark.conf.set("spark.sql.catalog.glue_catalog.catalog-impl", "org.apache.iceberg.aws.glue.GlueCatalog")
-spark.conf.set("spark.sql.catalog.glue_catalog.warehouse", f"s3://{S3_BUCKET}/iceberg/")
-spark.conf.set("spark.sql.catalog.glue_catalog.io-impl", "org.apache.iceberg.aws.s3.S3FileIO")
+configure_glue_catalog(spark, f"s3://{S3_BUCKET}/iceberg/")
+metrics = RunMetrics(spark, args['JOB_NAME'], create_sinks(spark, METRICS_SINK))
 
 spark.sql(f"CREATE DATABASE IF NOT EXISTS glue_catalog.{DATABASE_NAME}")
 logger.info(f"Glue Catalog database glue_catalog.{DATABASE_NAME} verified/created")
@@ -46,7 +141,7 @@ def create_gold_table(table_name: str):
                     avg_order_value DOUBLE, user_segment STRING, last_activity TIMESTAMP,
                     refresh_date TIMESTAMP
                 ) USING iceberg
-                LOCATION 's3://{S3_BUCKET}/iceberg/{DATABASE_NAME}/gold_user_analytics'
+                {location_clause(f"s3://{S3_BUCKET}/iceberg/{DATABASE_NAME}/gold_user_analytics")}
                 TBLPROPERTIES ('format-version'='2')
             """)
         elif table_name == "product_analytics":
@@ -55,9 +150,9 @@ def create_gold_table(table_name: str):
                     product_id BIGINT, product_name STRING, category STRING,
                     price DOUBLE, total_orders BIGINT, total_revenue DOUBLE,
                     unique_customers BIGINT, performance_category STRING,
-                    refresh_date TIMESTAMP
+                    refresh_date TIMESTAMP, customer_sketch ARRAY<TINYINT>
                 ) USING iceberg
-                LOCATION 's3://{S3_BUCKET}/iceberg/{DATABASE_NAME}/gold_product_analytics'
+                {location_clause(f"s3://{S3_BUCKET}/iceberg/{DATABASE_NAME}/gold_product_analytics")}
                 TBLPROPERTIES ('format-version'='2')
             """)
         elif table_name == "sales_summary":
@@ -65,176 +160,706 @@ def create_gold_table(table_name: str):
                 CREATE TABLE IF NOT EXISTS {table_identifier} (
                     date_key STRING, total_orders BIGINT, total_revenue DOUBLE,
                     avg_order_value DOUBLE, unique_customers BIGINT, top_product BIGINT,
-                    refresh_date TIMESTAMP
+                    refresh_date TIMESTAMP, customer_sketch ARRAY<TINYINT>
                 ) USING iceberg
-                LOCATION 's3://{S3_BUCKET}/iceberg/{DATABASE_NAME}/gold_sales_summary'
+                {location_clause(f"s3://{S3_BUCKET}/iceberg/{DATABASE_NAME}/gold_sales_summary")}
+                PARTITIONED BY (date_key)
                 TBLPROPERTIES ('format-version'='2')
             """)
+        if table_name in SKETCH_TABLES:
+            add_missing_columns(spark, table_identifier, [SKETCH_COLUMN])
         logger.info(f"Gold table {table_identifier} verified/created")
     except Exception as e:
         logger.error(f"Error creating gold table {table_name}: {str(e)}")
         raise
 
 
-def process_user_analytics():
-    logger.info("Processing user analytics")
+def create_rollup_table(grain):
+    table_identifier = rollup_table_name(grain)
+    try:
+        spark.sql(f"""
+            CREATE TABLE IF NOT EXISTS {table_identifier} (
+                {', '.join(f'{name} {sql_type}' for name, sql_type in rollup_columns(grain))}
+            ) USING iceberg
+            {location_clause(f"s3://{S3_BUCKET}/iceberg/{DATABASE_NAME}/gold_sales_rollup_{grain}")}
+            PARTITIONED BY ({ROLLUP_PARTITIONS[grain]})
+            TBLPROPERTIES ('format-version'='2')
+        """)
+        logger.info(f"Gold table {table_identifier} verified/created")
+    except Exception as e:
+        logger.error(f"Error creating gold table sales_rollup_{grain}: {str(e)}")
+        raise
 
-    silver_users = f"glue_catalog.{DATABASE_NAME}.silver_users"
-    silver_orders = f"glue_catalog.{DATABASE_NAME}.silver_orders"
-    gold_table = f"glue_catalog.{DATABASE_NAME}.gold_user_analytics"
 
-    try:
-        if not spark.catalog.tableExists(silver_users):
-            logger.warning(f"{silver_users} does not exist, skipping")
-            return
-        if not spark.catalog.tableExists(silver_orders):
-            logger.warning(f"{silver_orders} does not exist, skipping")
-            return
+def with_date_key(orders_df):
+    return orders_df.withColumn(
+        "date_key", date_format(from_unixtime(col("created_at") / 1000), "yyyy-MM-dd")
+    )
+
+
+def sketch_precision():
+    # 0 when no sketches are stored
+    if GOLD_SKETCHES or UNIQUE_CUSTOMERS_MODE == "approx":
+        return HLL_PRECISION
+    return 0
+
+
+def customer_counts(orders_df, key):
+    # (unique_customers, customer_sketch) per key; approx mode skips the exact
+    # distinct, whose shuffle carries every (key, user_id) pair
+    precision = sketch_precision()
+    if UNIQUE_CUSTOMERS_MODE != "approx" or not precision:
+        exact = orders_df.groupBy(key).agg(countDistinct("user_id").alias("unique_customers"))
+    if not precision:
+        return exact.withColumn("customer_sketch", lit(None).cast("array<tinyint>"))
+    sketches = hll_sketch(orders_df, [key], "user_id", precision, "customer_sketch")
+    if UNIQUE_CUSTOMERS_MODE == "approx":
+        return sketches.withColumn("unique_customers", hll_estimate("customer_sketch"))
+    return exact.join(sketches, key, "left")
+
+
+def user_segment(total_spent):
+    spent = coalesce(total_spent, lit(0.0))
+    return when(spent > 1000, "Premium").when(spent > 500, "Regular").otherwise("New")
+
+
+def user_segments(orders_df):
+    return orders_df.groupBy("user_id").agg(sum("total_amount").alias("total_spent")) \
+        .select("user_id", user_segment(col("total_spent")).alias("user_segment"))
+
+
+def order_join(orders_df, other_df, key, how, name, dimension_source=None):
+    # Orders are the skewed side: a few marketplace accounts and best sellers
+    # hold a large share of them
+    if SKEW_JOINS == "off":
+        return orders_df.join(other_df, key, how)
+    small_bytes = None
+    if dimension_source:
+        small_bytes = parquet_input_bytes(table_stats(spark, silver_table(dimension_source)).bytes, TuningPolicy())
+    policy = SkewPolicy(sample_fraction=SKEW_SAMPLE_FRACTION, broadcast_bytes=BROADCAST_DIMENSION_MB * MB)
+    joined, report = skew_join(orders_df, other_df, key, how, name,
+                               int(spark.conf.get("spark.sql.shuffle.partitions")), small_bytes, policy)
+    metrics.record(f"skew_join/{name}", report.as_dict())
+    return joined
+
+
+def build_user_analytics(users_df, orders_df):
+    user_stats = orders_df.groupBy("user_id").agg(
+        count("*").alias("total_orders"),
+        sum("total_amount").alias("total_spent"),
+        avg("total_amount").alias("avg_order_value")
+    )
+
+    return users_df.join(
+        user_stats, users_df["id"] == user_stats["user_id"], "left"
+    ).select(
+        users_df["id"].alias("user_id"),
+        users_df["name"].alias("full_name"),
+        users_df["email_domain"],
+        date_format(users_df["processed_at"], "yyyy-MM-dd").alias("registration_date"),
+        coalesce(user_stats["total_orders"], lit(0)).alias("total_orders"),
+        coalesce(user_stats["total_spent"], lit(0.0)).alias("total_spent"),
+        coalesce(user_stats["avg_order_value"], lit(0.0)).alias("avg_order_value"),
+        user_segment(user_stats["total_spent"]).alias("user_segment"),
+        users_df["processed_at"].alias("last_activity"),
+        current_timestamp().alias("refresh_date")
+    )
+
+
+def build_product_analytics(products_df, orders_df):
+    product_stats = orders_df.groupBy("product_id").agg(
+        count("*").alias("total_orders"),
+        sum("total_amount").alias("total_revenue")
+    ).join(customer_counts(orders_df, "product_id"), "product_id", "left")
+
+    return products_df.join(
+        product_stats, products_df["id"] == product_stats["product_id"], "left"
+    ).select(
+        products_df["id"].alias("product_id"),
+        products_df["name"].alias("product_name"),
+        products_df["category"],
+        products_df["price"],
+        coalesce(product_stats["total_orders"], lit(0)).alias("total_orders"),
+        coalesce(product_stats["total_revenue"], lit(0.0)).alias("total_revenue"),
+        coalesce(product_stats["unique_customers"], lit(0)).alias("unique_customers"),
+        when(coalesce(product_stats["total_revenue"], lit(0.0)) > 5000, "Top Performer")
+            .when(coalesce(product_stats["total_revenue"], lit(0.0)) > 1000, "Good")
+            .otherwise("Average").alias("performance_category"),
+        current_timestamp().alias("refresh_date"),
+        product_stats["customer_sketch"]
+    )
+
+
+def build_sales_summary(orders_df):
+    # Orders merged before Silver carried created_at have no date to report under
+    orders_df = with_date_key(orders_df).filter(col("date_key").isNotNull())
+
+    sales_summary = orders_df.groupBy("date_key").agg(
+        count("*").alias("total_orders"),
+        sum("total_amount").alias("total_revenue"),
+        avg("total_amount").alias("avg_order_value")
+    ).join(customer_counts(orders_df, "date_key"), "date_key", "left")
+
+    product_revenue = orders_df.groupBy("date_key", "product_id").agg(
+        sum("total_amount").alias("product_revenue")
+    )
+
+    # product_id breaks revenue ties so full and incremental builds pick the same product
+    window = Window.partitionBy("date_key").orderBy(col("product_revenue").desc(), col("product_id"))
+    top_product_per_day = product_revenue.withColumn("rank", row_number().over(window)) \
+        .filter("rank = 1") \
+        .select("date_key", col("product_id").alias("top_product"))
+
+    return sales_summary.join(top_product_per_day, "date_key", "left").select(
+        col("date_key"),
+        col("total_orders"),
+        col("total_revenue"),
+        col("avg_order_value"),
+        col("unique_customers"),
+        coalesce(col("top_product"), lit(0)).alias("top_product"),
+        current_timestamp().alias("refresh_date"),
+        col("customer_sketch")
+    )
+
+
+def build_rollup_hours(orders_df, products_df, all_orders_df, precision):
+    # Segments follow each customer's spend over all their orders, as in
+    # user_analytics, not only the orders being rolled up
+    customers = orders_df.select("user_id").distinct()
+    segments = user_segments(order_join(all_orders_df, customers, "user_id", "left_semi", "rollup_customers"))
+    rows = orders_df \
+        .withColumn("period_start", date_trunc("hour", from_unixtime(col("created_at") / 1000))) \
+        .filter(col("period_start").isNotNull())
+    rows = order_join(rows, products_df.select(col("id").alias("product_id"), "category"), "product_id", "left",
+                      "rollup_products", "products")
+    rows = order_join(rows, segments, "user_id", "left", "rollup_segments") \
+        .withColumn("category", coalesce(col("category"), lit("unknown"))) \
+        .withColumn("user_segment", coalesce(col("user_segment"), lit("unknown")))
+
+    groups = ["period_start"] + ROLLUP_DIMENSIONS
+    totals = rows.groupBy(*groups).agg(
+        count("*").alias("total_orders"),
+        sum("total_amount").alias("total_revenue")
+    )
+    if precision:
+        totals = totals.join(hll_sketch(rows, groups, "user_id", precision, "customer_sketch"), groups, "left")
+    return finish_rollup(totals, "hour", precision)
+
+
+def silver_table(source):
+    return f"glue_catalog.{DATABASE_NAME}.silver_{source}"
+
+
+def gold_table_name(name):
+    return f"glue_catalog.{DATABASE_NAME}.gold_{name}"
+
+
+def rollup_table_name(grain):
+    return gold_table_name(f"{ROLLUP_NAME}_{grain}")
+
+
+def gold_table_names(name):
+    if name == ROLLUP_NAME:
+        return [rollup_table_name(grain) for grain in ROLLUP_GRAINS]
+    return [gold_table_name(name)]
+
+
+def enabled_gold_tables():
+    return GOLD_TABLES + ([ROLLUP_NAME] if SALES_ROLLUP else [])
+
+
+def watermark_table(name):
+    # The rollup grains record their watermarks on the hour table, after all of them commit
+    return rollup_table_name("hour") if name == ROLLUP_NAME else gold_table_name(name)
+
+
+def gold_partitions(name):
+    if name == ROLLUP_NAME:
+        return {rollup_table_name(grain): ROLLUP_PARTITIONS[grain] for grain in ROLLUP_GRAINS}
+    if name in GOLD_PARTITIONS:
+        return {gold_table_name(name): GOLD_PARTITIONS[name]}
+    return {}
+
+
+def build_gold(name, inputs):
+    if name == "user_analytics":
+        return build_user_analytics(inputs["users"], inputs["orders"])
+    if name == "product_analytics":
+        return build_product_analytics(inputs["products"], inputs["orders"])
+    if name == "sales_summary":
+        return build_sales_summary(inputs["orders"])
+    raise ValueError(f"Unknown gold table: {name}")
+
+
+def active_inputs(sources, snapshots):
+    return {
+        source: read_silver_at(spark, silver_table(source), snapshots[source])
+            .filter("is_active = true")
+            .select(*SILVER_INPUT_COLUMNS[source])
+        for source in sources
+    }
+
+
+@dataclass
+class GoldInputs:
+    # Pinned Silver snapshots and the scans every gold table of the run shares
+    snapshots: Dict[str, int]
+    silver: Dict[str, DataFrame] = field(default_factory=dict)
+    # (source, start snapshot) -> changed rows up to the pinned snapshot
+    changes: Dict[Tuple[str, int], DataFrame] = field(default_factory=dict)
+
+    def release(self):
+        # unpersist is a no-op for the inputs that were never persisted
+        for df in list(self.silver.values()) + list(self.changes.values()):
+            df.unpersist()
+
+
+def plan_gold(name, snapshots):
+    # (watermarks, reason): watermarks is None when the table needs a full rebuild
+    sources = GOLD_SOURCES[name]
+    gold_table = watermark_table(name)
+    if GOLD_MODE == "full":
+        return None, "GOLD_MODE=full"
+    if not all(spark.catalog.tableExists(t) for t in gold_table_names(name)):
+        return None, "new table"
+    for table, partition in gold_partitions(name).items():
+        if partition_transforms(spark, table) != [partition]:
+            # Partition overwrites need every file under the current spec; the replace rewrites them
+            return None, f"partitioning by {partition}"
+    if (name in SKETCH_TABLES or name == ROLLUP_NAME) and \
+            get_table_properties(spark, gold_table).get(SKETCH_PRECISION_PROPERTY, "0") != str(sketch_precision()):
+        # Rows written before the setting changed hold no sketch or one of another size
+        return None, f"customer sketches at precision {sketch_precision()}"
+    watermarks = gold_watermarks(spark, gold_table, sources)
+    for source in sources:
+        if not can_diff(spark, silver_table(source), watermarks[source]):
+            return None, f"no usable silver_{source} snapshot recorded"
+    return watermarks, None
+
+
+def load_gold_inputs(names):
+    # Each Silver table a full rebuild needs is scanned once, projected to the
+    # columns gold reads and persisted for the run; changed rows are shared the same way
+    sources = sorted({source for name in names for source in GOLD_SOURCES[name]})
+    snapshots = {}
+    for source in sources:
+        if spark.catalog.tableExists(silver_table(source)):
+            snapshot_id = current_snapshot_id(spark, silver_table(source))
+            if snapshot_id is not None:
+                snapshots[source] = snapshot_id
+
+    inputs = GoldInputs(snapshots)
+    plans = {}
+    for name in names:
+        missing = [source for source in GOLD_SOURCES[name] if source not in snapshots]
+        if missing:
+            logger.warning(f"Silver inputs {missing} of gold_{name} missing or empty, skipping")
+            continue
+        plans[name] = plan_gold(name, snapshots)
+
+    # Changed rows are read first: a table whose window cannot be read
+    # incrementally falls back to a full rebuild
+    failed = set()
+    for name, (watermarks, _) in plans.items():
+        for source in GOLD_SOURCES[name] if watermarks is not None else []:
+            key = (source, watermarks[source])
+            if watermarks[source] == snapshots[source] or key in inputs.changes or key in failed:
+                continue
+            try:
+                inputs.changes[key] = changed_rows(
+                    spark, silver_table(source), CHANGE_COLUMNS[source], watermarks[source], snapshots[source],
+                    timedelta(minutes=GOLD_CHANGE_MARGIN_MINUTES)
+                ).persist(StorageLevel.MEMORY_AND_DISK)
+                logger.info(f"Read {inputs.changes[key].count()} changed silver_{source} rows "
+                            f"between snapshots {watermarks[source]} and {snapshots[source]}")
+            except Exception as e:
+                logger.warning(f"Incremental read of silver_{source} from snapshot {watermarks[source]} "
+                               f"failed: {str(e).splitlines()[0] if str(e) else type(e).__name__}")
+                if key in inputs.changes:
+                    inputs.changes.pop(key).unpersist()
+                failed.add(key)
+        if watermarks is not None and any((source, watermarks[source]) in failed for source in GOLD_SOURCES[name]):
+            plans[name] = None, "incremental read of the changed Silver rows failed"
+
+    # Tables already at the pinned snapshots read nothing. Incremental tables
+    # only read the rows of their affected keys, so a source is persisted and
+    # materialized only for the full rebuilds that scan it whole
+    readers, full_readers = {}, {}
+    for name, (watermarks, _) in plans.items():
+        if watermarks != {source: snapshots[source] for source in GOLD_SOURCES[name]}:
+            for source in GOLD_SOURCES[name]:
+                readers[source] = readers.get(source, 0) + 1
+                if watermarks is None:
+                    full_readers[source] = full_readers.get(source, 0) + 1
+    for source, df in active_inputs(sorted(readers), snapshots).items():
+        if readers[source] == 1 or source not in full_readers:
+            inputs.silver[source] = df
+            continue
+        inputs.silver[source] = df.persist(StorageLevel.MEMORY_AND_DISK)
+        # Materialized before the concurrent writes so none of them scans Silver itself
+        logger.info(f"Loaded {inputs.silver[source].count()} active silver_{source} rows "
+                    f"at snapshot {snapshots[source]} for {readers[source]} gold tables")
+    return inputs, plans
+
+
+def restrict_inputs(name, inputs, keys_df):
+    # Only the Silver rows that feed the affected gold keys
+    if name == "user_analytics":
+        return {"users": inputs["users"].join(keys_df.withColumnRenamed("user_id", "id"), "id", "left_semi"),
+                "orders": order_join(inputs["orders"], keys_df, "user_id", "left_semi", "restrict_user_analytics")}
+    if name == "product_analytics":
+        return {"products": inputs["products"].join(keys_df.withColumnRenamed("product_id", "id"), "id", "left_semi"),
+                "orders": order_join(inputs["orders"], keys_df, "product_id", "left_semi", "restrict_product_analytics")}
+    return {"orders": with_date_key(inputs["orders"]).join(keys_df, "date_key", "left_semi").drop("date_key")}
+
+
+def affected_keys(name, watermarks, inputs):
+    def changes(source):
+        return inputs.changes.get((source, watermarks[source]))
+
+    key = GOLD_KEYS[name]
+    orders = changes("orders")
+    parts = []
+    if name == "sales_summary":
+        if orders is not None:
+            parts.append(with_date_key(orders).select("date_key"))
+    else:
+        dimension = changes(GOLD_SOURCES[name][0])
+        if dimension is not None:
+            parts.append(dimension.select(col("id").alias(key)))
+        if orders is not None:
+            parts.append(orders.select(key))
+
+    if not parts:
+        return None
+    keys_df = parts[0]
+    for part in parts[1:]:
+        keys_df = keys_df.unionByName(part)
+    return keys_df.filter(col(key).isNotNull()).distinct()
+
+
+def within_late_horizon(keys_df):
+    cutoff = (date.today() - timedelta(days=SALES_SUMMARY_LATE_DAYS)).isoformat()
+    late = keys_df.filter(col("date_key") < cutoff).count()
+    if late:
+        logger.warning(f"Skipping {late} sales_summary days before {cutoff} with late order changes")
+    return keys_df.filter(col("date_key") >= cutoff), late
+
+
+def commit_counts(gold_table):
+    # Rows written and removed, from the summary of the snapshot the write committed
+    summary = latest_snapshot_summary(spark, gold_table)
+    return {"written_rows": int(summary.get("added-records", 0)),
+            "removed_rows": int(summary.get("deleted-records", 0)),
+            "rows": int(summary.get("total-records", 0)) - int(summary.get("total-position-deletes", 0))}
+
+
+def rollup_affected_days(watermarks, inputs):
+    # date_key values whose hourly rollups change: the days of changed orders,
+    # and every day with orders of a customer whose segment moved or of a
+    # product whose category or active flag changed
+    order_changes = inputs.changes.get(("orders", watermarks["orders"]))
+    product_changes = inputs.changes.get(("products", watermarks["products"]))
+    parts = []
+    if order_changes is not None:
+        orders = inputs.silver["orders"]
+        parts.append(with_date_key(order_changes).select("date_key"))
+        customers = order_changes.select("user_id").distinct()
+        before = read_silver_at(spark, silver_table("orders"), watermarks["orders"]) \
+            .filter("is_active = true") \
+            .select("user_id", "total_amount") \
+            .join(customers, "user_id", "left_semi")
+        moved = user_segments(before).withColumnRenamed("user_segment", "previous_segment") \
+            .join(user_segments(orders.join(customers, "user_id", "left_semi")), "user_id", "full") \
+            .filter(~col("previous_segment").eqNullSafe(col("user_segment"))) \
+            .select("user_id")
+        parts.append(with_date_key(orders.join(moved, "user_id", "left_semi")).select("date_key"))
+    if product_changes is not None:
+        # A product updated since start has its previous and current version; one version is a new product
+        switched = product_changes.groupBy("id").agg(
+            count("*").alias("versions"),
+            countDistinct(coalesce(col("category"), lit("")), col("is_active")).alias("states")
+        ).filter("versions = 1 OR states > 1").select(col("id").alias("product_id"))
+        parts.append(with_date_key(inputs.silver["orders"].join(switched, "product_id", "left_semi")).select("date_key"))
+
+    if not parts:
+        return None
+    days_df = parts[0]
+    for part in parts[1:]:
+        days_df = days_df.unionByName(part)
+    return days_df.filter(col("date_key").isNotNull()).distinct()
+
+
+def build_rollup(grain, silver, date_keys, precision):
+    # date_keys: the days whose `grain` periods to rebuild; None rebuilds the whole table
+    if grain == "hour":
+        orders = silver["orders"]
+        if date_keys is not None:
+            orders = with_date_key(orders).filter(col("date_key").isin(date_keys)).drop("date_key")
+        return build_rollup_hours(orders, silver["products"], silver["orders"], precision)
+    source = ROLLUP_SOURCES[grain]
+    source_df = spark.table(rollup_table_name(source))
+    if date_keys is not None:
+        # A filter on the source's own partition column, so only its touched partitions are read
+        source_df = source_df.filter(col(ROLLUP_PARTITIONS[source]).isin(source_date_keys(grain, date_keys)))
+    return derive_rollup(source_df, grain, precision)
+
+
+def process_sales_rollup(inputs, plan):
+    # Grains are written finest first; each coarser one reads the grain it
+    # derives from after that grain has committed
+    snapshots = {source: inputs.snapshots[source] for source in GOLD_SOURCES[ROLLUP_NAME]}
+    watermarks, reason = plan
+    precision = sketch_precision()
+    result = {"mode": "incremental", "affected_keys": 0, "written_rows": 0}
+    for grain in ROLLUP_GRAINS:
+        create_rollup_table(grain)
+    if watermarks == snapshots:
+        # load_gold_inputs loads no Silver input for a table already at the pinned snapshots
+        logger.info("Sales rollups are up to date with Silver")
+        return result
+
+    if watermarks is not None:
+        days_df = rollup_affected_days(watermarks, inputs)
+        if days_df is not None:
+            # One date_key per affected day; small enough to plan every grain's partitions on the driver
+            date_keys = sorted(row["date_key"] for row in days_df.collect())
+            affected = len(date_keys)
+            days = spark.sql(f"SELECT COUNT(*) FROM {rollup_table_name('hour')}.partitions").collect()[0][0]
+            result["affected_keys"] = affected
+            if affected > GOLD_FULL_REFRESH_RATIO * max(days, 1):
+                watermarks, reason = None, f"{affected} of {days} days affected"
+            elif affected:
+                for grain in ROLLUP_GRAINS:
+                    built_df = build_rollup(grain, inputs.silver, date_keys, precision)
+                    overwrite_partitions(rollup_table_name(grain), built_df, ROLLUP_PARTITIONS[grain],
+                                         partition_keys(grain, date_keys))
+                    counts = commit_counts(rollup_table_name(grain))
+                    result["written_rows"] += counts["written_rows"]
+                    result.update({f"{grain}_{key}": value for key, value in counts.items()})
+                logger.info(f"Rebuilt the sales rollups of {affected} days")
+        if watermarks is not None and not result["affected_keys"]:
+            logger.info("Sales rollups are up to date with Silver")
+
+    if watermarks is None:
+        logger.info(f"Full refresh of the sales rollups: {reason}")
+        result["mode"] = "full"
+        for grain in ROLLUP_GRAINS:
+            build_rollup(grain, inputs.silver, None, precision).writeTo(rollup_table_name(grain)) \
+                .partitionedBy(col(ROLLUP_PARTITIONS[grain])) \
+                .replace()
+            counts = commit_counts(rollup_table_name(grain))
+            result["written_rows"] += counts["written_rows"]
+            result.update({f"{grain}_{key}": value for key, value in counts.items()})
+
+    if watermarks != snapshots:
+        properties = watermark_properties(snapshots)
+        properties[SKETCH_PRECISION_PROPERTY] = str(precision)
+        set_table_properties(spark, watermark_table(ROLLUP_NAME), properties)
+    return result
+
+
+def process_gold(name, inputs=None, plan=None):
+    logger.info(f"Processing {name.replace('_', ' ')}")
+    gold_table = gold_table_name(name)
+    owned = inputs is None
+    if owned:
+        inputs, plans = load_gold_inputs([name])
+        if name not in plans:
+            return {"mode": "skipped"}
+        plan = plans[name]
 
-        users_df = spark.read.table(silver_users).filter("is_active = true")
-        orders_df = spark.read.table(silver_orders).filter("is_active = true")
-
-        user_stats = orders_df.groupBy("user_id").agg(
-            count("*").alias("total_orders"),
-            sum("total_amount").alias("total_spent"),
-            avg("total_amount").alias("avg_order_value")
-        )
-
-        user_analytics = users_df.join(
-            user_stats, users_df["id"] == user_stats["user_id"], "left"
-        ).select(
-            users_df["id"].alias("user_id"),
-            users_df["name"].alias("full_name"),
-            users_df["email_domain"],
-            date_format(users_df["processed_at"], "yyyy-MM-dd").alias("registration_date"),
-            coalesce(user_stats["total_orders"], lit(0)).alias("total_orders"),
-            coalesce(user_stats["total_spent"], lit(0.0)).alias("total_spent"),
-            coalesce(user_stats["avg_order_value"], lit(0.0)).alias("avg_order_value"),
-            when(coalesce(user_stats["total_spent"], lit(0.0)) > 1000, "Premium")
-                .when(coalesce(user_stats["total_spent"], lit(0.0)) > 500, "Regular")
-                .otherwise("New").alias("user_segment"),
-            users_df["processed_at"].alias("last_activity"),
-            current_timestamp().alias("refresh_date")
-        )
-
-        create_gold_table("user_analytics")
-        user_analytics.writeTo(gold_table).replace()
-
-        user_count = user_analytics.count()
-        logger.info(f"Written {user_count} user analytics records")
+    try:
+        if name == ROLLUP_NAME:
+            return process_sales_rollup(inputs, plan)
+        create_gold_table(name)
+        snapshots = {source: inputs.snapshots[source] for source in GOLD_SOURCES[name]}
+        watermarks, reason = plan
+        result = {"mode": "incremental", "affected_keys": 0}
+
+        if watermarks is not None:
+            keys_df = affected_keys(name, watermarks, inputs)
+            if keys_df is not None:
+                keys_df = keys_df.persist(StorageLevel.MEMORY_AND_DISK)
+                try:
+                    if name == "sales_summary" and SALES_SUMMARY_LATE_DAYS > 0:
+                        keys_df, result["late_keys_skipped"] = within_late_horizon(keys_df)
+                    affected = keys_df.count()
+                    gold_rows = table_stats(spark, gold_table).rows
+                    result["affected_keys"] = affected
+                    if affected > GOLD_FULL_REFRESH_RATIO * max(gold_rows, 1):
+                        watermarks, reason = None, f"{affected} of {gold_rows} keys affected"
+                    elif affected:
+                        built_df = build_gold(name, restrict_inputs(name, inputs.silver, keys_df))
+                        if name in GOLD_PARTITIONS:
+                            overwrite_gold_keys(gold_table, built_df, keys_df, GOLD_KEYS[name])
+                            logger.info(f"Overwrote {affected} {GOLD_KEYS[name]} partitions of {gold_table}")
+                        else:
+                            merge_gold_keys(spark, gold_table, built_df, keys_df, GOLD_KEYS[name], f"gold_src_{name}")
+                            logger.info(f"Merged {affected} recomputed {GOLD_KEYS[name]} values into {gold_table}")
+                        result.update(commit_counts(gold_table))
+                finally:
+                    keys_df.unpersist()
+            if watermarks is not None and not result["affected_keys"]:
+                logger.info(f"{gold_table} is up to date with Silver")
+
+        if watermarks is None:
+            logger.info(f"Full refresh of {gold_table}: {reason}")
+            result["mode"] = "full"
+            writer = build_gold(name, inputs.silver).writeTo(gold_table)
+            if name in GOLD_PARTITIONS:
+                writer = writer.partitionedBy(col(GOLD_PARTITIONS[name]))
+            writer.replace()
+            result.update(commit_counts(gold_table))
+
+        # Recorded after the write commits; a crash in between recomputes the same keys next run
+        if watermarks != snapshots:
+            properties = watermark_properties(snapshots)
+            if name in SKETCH_TABLES:
+                properties[SKETCH_PRECISION_PROPERTY] = str(sketch_precision())
+            set_table_properties(spark, gold_table, properties)
+        logger.info(f"Written {result.get('written_rows', 0)} {name.replace('_', ' ')} records")
+        return result
 
     except Exception as e:
-        logger.error(f"Error in user analytics: {str(e)}")
+        logger.error(f"Error in {name.replace('_', ' ')}: {str(e)}")
         raise
+    finally:
+        if owned:
+            inputs.release()
 
 
-def process_product_analytics():
-    logger.info("Processing product analytics")
+def process_gold_tables(names):
+    inputs, plans = load_gold_inputs(names)
+    results = {}
 
-    silver_products = f"glue_catalog.{DATABASE_NAME}.silver_products"
-    silver_orders = f"glue_catalog.{DATABASE_NAME}.silver_orders"
-    gold_table = f"glue_catalog.{DATABASE_NAME}.gold_product_analytics"
+    def process(name):
+        with metrics.stage(f"process_{name}") as timing:
+            results[name] = process_gold(name, inputs, plans[name])
+            timing.update(results[name])
 
     try:
-        if not spark.catalog.tableExists(silver_products):
-            logger.warning(f"{silver_products} does not exist, skipping")
-            return
-        if not spark.catalog.tableExists(silver_orders):
-            logger.warning(f"{silver_orders} does not exist, skipping")
-            return
+        # Gold tables are independent once the Silver scans are shared
+        run = run_tables(spark, list(plans), process, GOLD_PARALLELISM, "gold")
+    finally:
+        inputs.release()
+    failed = [r.table for r in run if not r.succeeded]
+    if failed:
+        raise RuntimeError(f"Gold tables failed: {failed}")
+    return results
+
+
+def verify_sales_rollup():
+    hour_table = watermark_table(ROLLUP_NAME)
+    sources = GOLD_SOURCES[ROLLUP_NAME]
+    if not all(spark.catalog.tableExists(t) for t in gold_table_names(ROLLUP_NAME)):
+        return {"status": "missing"}
+    watermarks = gold_watermarks(spark, hour_table, sources)
+    if None in watermarks.values():
+        return {"status": "no watermark"}
+
+    precision = int(get_table_properties(spark, hour_table).get(SKETCH_PRECISION_PROPERTY, "0"))
+    silver = active_inputs(sources, watermarks)
+    built = {"hour": build_rollup_hours(silver["orders"], silver["products"], silver["orders"], precision)
+             .persist(StorageLevel.MEMORY_AND_DISK)}
+    try:
+        for grain in ROLLUP_GRAINS[1:]:
+            built[grain] = derive_rollup(built[ROLLUP_SOURCES[grain]], grain, precision)
+        result = {"missing_rows": 0, "unexpected_rows": 0}
+        for grain in ROLLUP_GRAINS:
+            for key, value in compare_gold(built[grain], spark.table(rollup_table_name(grain))).items():
+                result[key] += value
+                result[f"{grain}_{key}"] = value
+    finally:
+        built["hour"].unpersist()
+    result["status"] = "ok" if not result["missing_rows"] and not result["unexpected_rows"] else "mismatch"
+    logger.info(f"Consistency check of the sales rollups at Silver snapshots {watermarks}: {result}")
+    return result
+
+
+def verify_gold(name):
+    # Rebuilds the table in full from the Silver snapshots it records and diffs it
+    if name == ROLLUP_NAME:
+        return verify_sales_rollup()
+    gold_table = gold_table_name(name)
+    sources = GOLD_SOURCES[name]
+    if not spark.catalog.tableExists(gold_table):
+        return {"status": "missing"}
+    watermarks = gold_watermarks(spark, gold_table, sources)
+    if None in watermarks.values():
+        return {"status": "no watermark"}
+
+    result = compare_gold(build_gold(name, active_inputs(sources, watermarks)), spark.table(gold_table))
+    result["status"] = "ok" if not result["missing_rows"] and not result["unexpected_rows"] else "mismatch"
+    logger.info(f"Consistency check of {gold_table} at Silver snapshots {watermarks}: {result}")
+    return result
+
+
+def unique_customers_by_period(grain, start_date=None, end_date=None):
+    # Weekly or monthly unique customers merged from the daily sales_summary
+    # sketches; Silver is not read
+    if grain not in ("week", "month"):
+        raise ValueError(f"Unknown period grain: {grain}")
+    gold_table = gold_table_name("sales_summary")
+    precision = get_table_properties(spark, gold_table).get(SKETCH_PRECISION_PROPERTY, "0")
+    if precision == "0":
+        raise RuntimeError(f"{gold_table} stores no customer sketches; run with GOLD_SKETCHES=true")
+    days = spark.table(gold_table)
+    if start_date:
+        days = days.filter(col("date_key") >= start_date)
+    if end_date:
+        days = days.filter(col("date_key") <= end_date)
+    days = days.withColumn("period_start", date_format(date_trunc(grain, to_date("date_key")), "yyyy-MM-dd"))
+    return hll_merge(days, ["period_start"], "customer_sketch", int(precision), "customer_sketch") \
+        .select("period_start", hll_estimate("customer_sketch").alias("unique_customers"), "customer_sketch")
+
+
+def query_sales_rollup(grain, start, end, dimensions=ROLLUP_DIMENSIONS):
+    # Orders, revenue and, with sketches, unique customers per `grain` period
+    # (None: one total) in [start, end), from the coarsest rollup that answers
+    # them exactly
+    source = route_rollup(grain, start, end)
+    table = rollup_table_name(source)
+    precision = int(get_table_properties(spark, watermark_table(ROLLUP_NAME)).get(SKETCH_PRECISION_PROPERTY, "0"))
+    logger.info(f"Answering {grain or 'total'} sales by {list(dimensions)} from {table}")
+    rows = spark.table(table) \
+        .filter(partition_range(source, start, end)) \
+        .filter((col("period_start") >= lit(start)) & (col("period_start") < lit(end)))
+    return aggregate_rollup(rows, grain, dimensions, precision)
+
+
+def process_sales_rollups():
+    return process_gold(ROLLUP_NAME)
 
-        products_df = spark.read.table(silver_products).filter("is_active = true")
-        orders_df = spark.read.table(silver_orders).filter("is_active = true")
-
-        product_stats = orders_df.groupBy("product_id").agg(
-            count("*").alias("total_orders"),
-            sum("total_amount").alias("total_revenue"),
-            countDistinct("user_id").alias("unique_customers")
-        )
-
-        product_analytics = products_df.join(
-            product_stats, products_df["id"] == product_stats["product_id"], "left"
-        ).select(
-            products_df["id"].alias("product_id"),
-            products_df["name"].alias("product_name"),
-            products_df["category"],
-            products_df["price"],
-            coalesce(product_stats["total_orders"], lit(0)).alias("total_orders"),
-            coalesce(product_stats["total_revenue"], lit(0.0)).alias("total_revenue"),
-            coalesce(product_stats["unique_customers"], lit(0)).alias("unique_customers"),
-            when(coalesce(product_stats["total_revenue"], lit(0.0)) > 5000, "Top Performer")
-                .when(coalesce(product_stats["total_revenue"], lit(0.0)) > 1000, "Good")
-                .otherwise("Average").alias("performance_category"),
-            current_timestamp().alias("refresh_date")
-        )
-
-        create_gold_table("product_analytics")
-        product_analytics.writeTo(gold_table).replace()
-
-        product_count = product_analytics.count()
-        logger.info(f"Written {product_count} product analytics records")
 
-    except Exception as e:
-        logger.error(f"Error in product analytics: {str(e)}")
-        raise
+def process_user_analytics():
+    return process_gold("user_analytics")
 
 
-def process_sales_summary():
-    logger.info("Processing sales summary")
+def process_product_analytics():
+    return process_gold("product_analytics")
 
-    silver_orders = f"glue_catalog.{DATABASE_NAME}.silver_orders"
-    gold_table = f"glue_catalog.{DATABASE_NAME}.gold_sales_summary"
 
-    try:
-        if not spark.catalog.tableExists(silver_orders):
-            logger.warning(f"{silver_orders} does not exist, skipping")
-            return
+def process_sales_summary():
+    return process_gold("sales_summary")
 
-        orders_df = spark.read.table(silver_orders).filter("is_active = true")
-
-        orders_df = orders_df.withColumn(
-            "created_at_ts",
-            from_unixtime(col("created_at") / 1000)
-        ).withColumn(
-            "date_key",
-            date_format(col("created_at_ts"), "yyyy-MM-dd")
-        )
-
-        sales_summary = orders_df.groupBy("date_key").agg(
-            count("*").alias("total_orders"),
-            sum("total_amount").alias("total_revenue"),
-            avg("total_amount").alias("avg_order_value"),
-            countDistinct("user_id").alias("unique_customers")
-        )
-
-        product_revenue = orders_df.groupBy("date_key", "product_id").agg(
-            sum("total_amount").alias("product_revenue")
-        )
-
-        window = Window.partitionBy("date_key").orderBy(col("product_revenue").desc())
-        top_product_per_day = product_revenue.withColumn("rank", row_number().over(window)) \
-            .filter("rank = 1") \
-            .select("date_key", col("product_id").alias("top_product"))
-
-        final_summary = sales_summary.join(top_product_per_day, "date_key", "left").select(
-            col("date_key"),
-            col("total_orders"),
-            col("total_revenue"),
-            col("avg_order_value"),
-            col("unique_customers"),
-            coalesce(col("top_product"), lit(0)).alias("top_product"),
-            current_timestamp().alias("refresh_date")
-        )
-
-        create_gold_table("sales_summary")
-        final_summary.writeTo(gold_table).replace()
-
-        sales_count = final_summary.count()
-        logger.info(f"Written {sales_count} sales summary records")
 
-    except Exception as e:
-        logger.error(f"Error in sales summary: {str(e)}")
-        raise
+def tune_for_silver():
+    # Every aggregate scans silver_orders and joins it to a dimension; the
+    # smaller dimension decides whether those joins can broadcast
+    policy = TuningPolicy()
+    sizes = {}
+    for table in ["users", "products", "orders"]:
+        silver_table = f"glue_catalog.{DATABASE_NAME}.silver_{table}"
+        if spark.catalog.tableExists(silver_table):
+            sizes[table] = parquet_input_bytes(table_stats(spark, silver_table).bytes, policy)
+    if not sizes:
+        return
+
+    dimensions = [sizes[t] for t in ["users", "products"] if t in sizes]
+    plan = plan_tuning(sum(sizes.values()), spark.sparkContext.defaultParallelism, policy,
+                       broadcast_side_bytes=min(dimensions) if dimensions else None)
+    apply_tuning(spark, plan, "gold")
 
 
 def main():
@@ -243,20 +868,34 @@ def main():
     logger.info("=" * 50)
 
     try:
-        process_user_analytics()
-        process_product_analytics()
-        process_sales_summary()
+        if SPARK_TUNING == "auto":
+            try:
+                tune_for_silver()
+            except Exception as e:
+                logger.warning(f"Could not size Silver inputs, keeping current Spark settings: {str(e)}")
+
+        if GOLD_MODE == "verify":
+            mismatched = []
+            for table in enabled_gold_tables():
+                with metrics.stage("verify_gold", table=table) as timing:
+                    timing.update(verify_gold(table))
+                    if timing["status"] == "mismatch":
+                        mismatched.append(table)
+            if mismatched:
+                raise RuntimeError(f"Gold tables out of sync with Silver: {mismatched}; rerun with GOLD_MODE=full")
+            return
+
+        process_gold_tables(enabled_gold_tables())
 
         logger.info("=" * 50)
         logger.info("Gold Tables Summary:")
-        gold_tables = ["user_analytics", "product_analytics", "sales_summary"]
-        for table in gold_tables:
+        for table in [t for name in enabled_gold_tables() for t in gold_table_names(name)]:
             try:
-                result = spark.sql(f"SELECT COUNT(*) FROM glue_catalog.{DATABASE_NAME}.gold_{table}")
-                count = result.collect()[0][0]
-                logger.info(f"  glue_catalog.{DATABASE_NAME}.gold_{table}: {count} records")
+                stats = table_stats(spark, table)
+                metrics.record(table, stats.as_dict())
+                logger.info(f"  {table}: {stats.rows} records")
             except Exception as e:
-                logger.warning(f"  glue_catalog.{DATABASE_NAME}.gold_{table}: Error - {str(e)}")
+                logger.warning(f"  {table}: Error - {str(e)}")
 
         logger.info("=" * 50)
         logger.info("Gold job completed successfully!")
@@ -265,9 +904,12 @@ def main():
     except Exception as e:
         logger.error(f"Gold job failed: {str(e)}")
         raise
+    finally:
+        metrics.emit()
+        metrics.close()
 
 
 if __name__ == "__main__":
     main()
-    job.commit()
+    commit_job(job)
 
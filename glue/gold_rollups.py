@@ -0,0 +1,155 @@
+from datetime import datetime, time, timedelta
+
+from pyspark.sql.functions import col, current_timestamp, date_format, date_trunc, lit, sum as sum_
+
+from hll_sketch import hll_estimate, hll_merge
+
+
+# Finest first; every grain after hour is derived from its source grain, never from Silver
+ROLLUP_GRAINS = ["hour", "day", "week", "month"]
+ROLLUP_SOURCES = {"day": "hour", "week": "day", "month": "day"}
+ROLLUP_DIMENSIONS = ["category", "user_segment"]
+# Identity partition each grain is refreshed by: a touched partition is rebuilt
+# whole and overwritten. Days, weeks and months each hold one period per
+# partition; hours are partitioned by their day.
+ROLLUP_PARTITIONS = {"hour": "date_key", "day": "date_key", "week": "week_key", "month": "month_key"}
+# Period each partition column holds, keyed by its start in Spark and Python formats
+PARTITION_PERIODS = {"date_key": "day", "week_key": "week", "month_key": "month"}
+PARTITION_FORMATS = {"date_key": ("yyyy-MM-dd", "%Y-%m-%d"), "week_key": ("yyyy-MM-dd", "%Y-%m-%d"),
+                     "month_key": ("yyyy-MM", "%Y-%m")}
+# Rollups whose periods tile each requested grain, coarsest first; weeks do not
+# tile months. None asks for one total over the whole range.
+ROLLUP_ROUTES = {
+    "hour": ["hour"],
+    "day": ["day", "hour"],
+    "week": ["week", "day", "hour"],
+    "month": ["month", "day", "hour"],
+    None: ["month", "week", "day", "hour"],
+}
+
+
+def rollup_columns(grain):
+    return [
+        ("period_start", "TIMESTAMP"), (ROLLUP_PARTITIONS[grain], "STRING"),
+        ("category", "STRING"), ("user_segment", "STRING"),
+        ("total_orders", "BIGINT"), ("total_revenue", "DOUBLE"), ("avg_order_value", "DOUBLE"),
+        ("unique_customers", "BIGINT"), ("customer_sketch", "ARRAY<TINYINT>"), ("refresh_date", "TIMESTAMP"),
+    ]
+
+
+def partition_value(grain, column):
+    partition = ROLLUP_PARTITIONS[grain]
+    return date_format(date_trunc(PARTITION_PERIODS[partition], column), PARTITION_FORMATS[partition][0]) \
+        .alias(partition)
+
+
+def _day(date_key):
+    return datetime.strptime(date_key, "%Y-%m-%d")
+
+
+def _next_period(start, grain):
+    if grain == "day":
+        return start + timedelta(days=1)
+    if grain == "week":
+        return start + timedelta(days=7)
+    return (start + timedelta(days=32)).replace(day=1)
+
+
+def partition_keys(grain, date_keys):
+    # Partitions of `grain` holding the periods that cover the given date_key values
+    partition = ROLLUP_PARTITIONS[grain]
+    return sorted({_truncate(_day(d), PARTITION_PERIODS[partition]).strftime(PARTITION_FORMATS[partition][1])
+                   for d in date_keys})
+
+
+def source_date_keys(grain, date_keys):
+    # Every day of the `grain` periods covering the given days: the date_key
+    # partitions of the source grain a rebuild of those periods reads
+    days = set()
+    for start in {_truncate(_day(d), grain) for d in date_keys}:
+        day, end = start, _next_period(start, grain)
+        while day < end:
+            days.add(day.strftime("%Y-%m-%d"))
+            day += timedelta(days=1)
+    return sorted(days)
+
+
+def partition_range(grain, start, end):
+    # Partition filter covering [start, end), so reads by period_start prune
+    partition = ROLLUP_PARTITIONS[grain]
+    period, python_format = PARTITION_PERIODS[partition], PARTITION_FORMATS[partition][1]
+    first = _truncate(_as_datetime(start), period).strftime(python_format)
+    last = _truncate(_as_datetime(end), period).strftime(python_format)
+    return (col(partition) >= lit(first)) & (col(partition) <= lit(last))
+
+
+def aggregate_rollup(df, grain, dimensions, precision):
+    # Re-aggregates rollup rows to a coarser grain (None: one row per dimension
+    # value); unique customers only merge through the sketches
+    groups = list(dimensions)
+    if grain:
+        df = df.withColumn("period_start", date_trunc(grain, col("period_start")))
+        groups = ["period_start"] + groups
+    totals = df.groupBy(*groups).agg(
+        sum_("total_orders").alias("total_orders"),
+        sum_("total_revenue").alias("total_revenue")
+    ).withColumn("avg_order_value", col("total_revenue") / col("total_orders"))
+    if not precision:
+        return totals
+    sketches = hll_merge(df, groups, "customer_sketch", precision, "customer_sketch")
+    return totals.join(sketches, groups, "left") \
+        .withColumn("unique_customers", hll_estimate("customer_sketch"))
+
+
+def finish_rollup(df, grain, precision):
+    # df: period_start, the dimensions, total_orders, total_revenue and, with
+    # sketches, customer_sketch
+    if precision:
+        df = df.withColumn("unique_customers", hll_estimate("customer_sketch"))
+    else:
+        df = df.withColumn("unique_customers", lit(None).cast("bigint")) \
+            .withColumn("customer_sketch", lit(None).cast("array<tinyint>"))
+    return df.select(
+        col("period_start"),
+        partition_value(grain, col("period_start")),
+        *ROLLUP_DIMENSIONS,
+        col("total_orders"),
+        col("total_revenue"),
+        (col("total_revenue") / col("total_orders")).alias("avg_order_value"),
+        col("unique_customers"),
+        col("customer_sketch"),
+        current_timestamp().alias("refresh_date")
+    )
+
+
+def derive_rollup(source_df, grain, precision):
+    totals = aggregate_rollup(source_df, grain, ROLLUP_DIMENSIONS, precision)
+    return finish_rollup(totals.drop("avg_order_value", "unique_customers"), grain, precision)
+
+
+def _as_datetime(value):
+    return value if isinstance(value, datetime) else datetime.combine(value, time())
+
+
+def _truncate(value, grain):
+    value = value.replace(minute=0, second=0, microsecond=0)
+    if grain == "hour":
+        return value
+    value = value.replace(hour=0)
+    if grain == "week":
+        return value - timedelta(days=value.weekday())
+    if grain == "month":
+        return value.replace(day=1)
+    return value
+
+
+def route_rollup(grain, start, end):
+    # Coarsest rollup that answers `grain` periods over [start, end) exactly:
+    # its periods must tile the requested ones and both range bounds
+    if grain not in ROLLUP_ROUTES:
+        raise ValueError(f"Unknown rollup grain: {grain}")
+    start, end = _as_datetime(start), _as_datetime(end)
+    for candidate in ROLLUP_ROUTES[grain]:
+        if _truncate(start, candidate) == start and _truncate(end, candidate) == end:
+            return candidate
+    raise ValueError(f"No rollup answers [{start}, {end}) exactly; bounds must fall on whole hours")
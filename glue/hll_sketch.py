@@ -0,0 +1,68 @@
+import math
+
+from pyspark.sql.functions import bin as bin_, col, collect_list, expr, length, lit, map_from_entries, \
+    max as max_, posexplode, shiftleft, shiftrightunsigned, struct, when, xxhash64
+
+
+# 2^12 registers: about 1.6% standard error in 4 KB per sketch
+DEFAULT_PRECISION = 12
+
+
+def hll_error_bound(precision=DEFAULT_PRECISION):
+    # Relative standard error of the HyperLogLog estimate
+    return 1.04 / math.sqrt(1 << precision)
+
+
+def _registers(df, group_columns, value_column, precision):
+    # The top `precision` bits of a 64-bit hash pick the register; the rank is
+    # the position of the first set bit in the rest. bin() of a negative long is
+    # its 64-bit two's complement, so 65 - length(bin(w)) is the leading-zero count + 1.
+    hashed = xxhash64(col(value_column))
+    rest = shiftleft(hashed, precision)
+    return df.filter(col(value_column).isNotNull()).select(
+        *group_columns,
+        shiftrightunsigned(hashed, 64 - precision).cast("int").alias("_hll_idx"),
+        when(rest == 0, lit(64 - precision + 1)).otherwise(lit(65) - length(bin_(rest))).cast("tinyint").alias("_hll_rank"),
+    )
+
+
+def _to_sketch(registers, group_columns, precision, alias):
+    # Max rank per register (combined map-side, so the shuffle is at most
+    # 2^precision rows per group), then one dense array per group
+    size = 1 << precision
+    return registers.groupBy(*group_columns, "_hll_idx") \
+        .agg(max_("_hll_rank").alias("_hll_rank")) \
+        .groupBy(*group_columns) \
+        .agg(map_from_entries(collect_list(struct("_hll_idx", "_hll_rank"))).alias("_hll_map")) \
+        .select(*group_columns,
+                expr(f"transform(sequence(0, {size - 1}), i -> coalesce(_hll_map[i], CAST(0 AS TINYINT)))").alias(alias))
+
+
+def hll_sketch(df, group_columns, value_column, precision=DEFAULT_PRECISION, alias="sketch"):
+    # One sketch of the distinct non-null values of value_column per group
+    return _to_sketch(_registers(df, group_columns, value_column, precision), group_columns, precision, alias)
+
+
+def hll_merge(df, group_columns, sketch_column, precision=DEFAULT_PRECISION, alias="sketch"):
+    # Union of the sketches in each group (e.g. days into weeks); all must share one precision
+    registers = df.filter(col(sketch_column).isNotNull()) \
+        .select(*group_columns, posexplode(col(sketch_column)).alias("_hll_idx", "_hll_rank"))
+    return _to_sketch(registers, group_columns, precision, alias)
+
+
+def hll_estimate(sketch_column):
+    # Bias-corrected harmonic mean of the registers, with linear counting while
+    # empty registers remain in the small range; a 64-bit hash needs no
+    # large-range correction
+    s = sketch_column
+    # The closed form for alpha only holds from 128 registers (precision 7) up
+    alpha = f"(CASE size({s}) WHEN 16 THEN 0.673D WHEN 32 THEN 0.697D WHEN 64 THEN 0.709D " \
+            f"ELSE 0.7213D / (1 + 1.079D / size({s})) END)"
+    raw = f"({alpha} * size({s}) * size({s}) / aggregate({s}, 0D, (acc, r) -> acc + pow(2D, -r)))"
+    zeros = f"size(filter({s}, r -> r = 0))"
+    return expr(f"""
+        CAST(round(CASE
+            WHEN {raw} <= 2.5 * size({s}) AND {zeros} > 0 THEN size({s}) * ln(size({s}) / {zeros})
+            ELSE {raw}
+        END) AS BIGINT)
+    """)
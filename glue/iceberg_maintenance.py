@@ -0,0 +1,391 @@
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+from pyspark.sql.functions import current_timestamp
+
+from iceberg_tables import (
+    get_table_properties, get_table_property, latest_snapshot_summary, partition_transforms, set_table_properties,
+    snapshot_committed_at
+)
+from table_stats import ACTIVE_ROWS_PROPERTY, ACTIVE_ROWS_SNAPSHOT_PROPERTY, active_rows_properties, table_stats
+
+
+logger = logging.getLogger("cdc-iceberg-job")
+
+LAST_ORPHAN_CLEANUP_PROPERTY = "cdc.maintenance.last-orphan-cleanup"
+# Set on archive appends so a purge whose Silver delete did not commit resumes
+# with the same cutoff instead of archiving the rows twice; the source snapshot
+# is informational
+TOMBSTONE_CUTOFF_PROPERTY = "cdc.tombstones.cutoff"
+TOMBSTONE_SOURCE_PROPERTY = "cdc.tombstones.source-snapshot-id"
+
+
+@dataclass
+class MaintenancePolicy:
+    target_file_size_bytes: int = 134217728
+    # A data file below this fraction of the target size counts as small
+    small_file_ratio: float = 0.75
+    # Small files a partition needs before rewriting it pays for the I/O
+    min_small_files: int = 5
+    # Delete files in a partition before they are folded into its data files
+    max_delete_files: int = 10
+    max_snapshots: int = 100
+    snapshot_retention_hours: int = 72
+    retain_last_snapshots: int = 10
+    max_manifests: int = 50
+    orphan_cleanup_interval_hours: int = 168
+    orphan_file_age_hours: int = 72
+    time_budget_seconds: int = 900
+    # Soft-deleted Silver rows older than this are archived and removed; None keeps them
+    tombstone_retention_days: Optional[int] = None
+    # Fewer tombstones than this are not worth a delete commit and file rewrites
+    min_tombstones: int = 10000
+
+
+@dataclass
+class TableHealth:
+    data_files: int = 0
+    data_bytes: int = 0
+    small_files: int = 0
+    delete_files: int = 0
+    compaction_partitions: List[str] = field(default_factory=list)
+    # Partition field values of the same partitions, for the rewrite's filter
+    compaction_partition_values: List[Dict] = field(default_factory=list)
+    snapshots: int = 0
+    oldest_snapshot_at: Optional[datetime] = None
+    manifests: int = 0
+
+
+@dataclass
+class MaintenanceResult:
+    table: str
+    action: str
+    reason: str
+    seconds: float = 0.0
+    bytes_rewritten: int = 0
+    details: Dict = field(default_factory=dict)
+    error: Optional[str] = None
+
+
+def inspect_table(spark, table_identifier, policy):
+    health = TableHealth()
+    small_threshold = int(policy.target_file_size_bytes * policy.small_file_ratio)
+
+    partitions = spark.sql(f"""
+        SELECT
+            partition,
+            CAST(partition AS STRING) AS partition_key,
+            SUM(CASE WHEN content = 0 THEN 1 ELSE 0 END) AS data_files,
+            SUM(CASE WHEN content = 0 THEN file_size_in_bytes ELSE 0 END) AS data_bytes,
+            SUM(CASE WHEN content = 0 AND file_size_in_bytes < {small_threshold} THEN 1 ELSE 0 END) AS small_files,
+            SUM(CASE WHEN content != 0 THEN 1 ELSE 0 END) AS delete_files
+        FROM {table_identifier}.files
+        GROUP BY partition
+    """).collect()
+
+    for p in partitions:
+        health.data_files += p["data_files"]
+        health.data_bytes += p["data_bytes"]
+        health.small_files += p["small_files"]
+        health.delete_files += p["delete_files"]
+        if p["small_files"] >= policy.min_small_files or p["delete_files"] >= policy.max_delete_files:
+            health.compaction_partitions.append(p["partition_key"])
+            health.compaction_partition_values.append(p["partition"].asDict())
+
+    snapshots = spark.sql(f"""
+        SELECT COUNT(*) AS snapshots, MIN(committed_at) AS oldest FROM {table_identifier}.snapshots
+    """).collect()[0]
+    health.snapshots = snapshots["snapshots"]
+    health.oldest_snapshot_at = snapshots["oldest"]
+
+    health.manifests = spark.sql(f"SELECT COUNT(*) FROM {table_identifier}.manifests").collect()[0][0]
+    return health
+
+
+def _literal(value):
+    if isinstance(value, str):
+        return f"'{value}'"
+    if isinstance(value, date):
+        return f"DATE '{value}'"
+    return str(value)
+
+
+def _partition_term(transform, values):
+    # Row filter selecting one partition value of a transform; None when the
+    # transform has no such filter (bucket, truncate) or the value is unknown
+    if transform.startswith("days(") and transform.endswith(")"):
+        column = transform[5:-1]
+        day = values.get(f"{column}_day")
+        if day is None:
+            return None
+        if isinstance(day, int):
+            day = date(1970, 1, 1) + timedelta(days=day)
+        return f"{column} >= TIMESTAMP '{day}' AND {column} < TIMESTAMP '{day + timedelta(days=1)}'"
+    if "(" not in transform and values.get(transform) is not None:
+        return f"{transform} = {_literal(values[transform])}"
+    return None
+
+
+def compaction_predicate(spark, table_identifier, partition_values):
+    # where clause of rewrite_data_files covering only the partitions that need
+    # it; Iceberg projects it onto the partition spec, so other partitions are
+    # never planned. None compacts the whole table.
+    transforms = partition_transforms(spark, table_identifier)
+    if not transforms or not partition_values:
+        return None
+    terms = []
+    for values in partition_values:
+        parts = [_partition_term(t, values) for t in transforms]
+        if any(p is None for p in parts):
+            return None
+        terms.append("(" + " AND ".join(parts) + ")")
+    return " OR ".join(terms)
+
+
+def tombstone_predicate(cutoff):
+    # _audit_updated_at is set by every MERGE clause, including stale deletes
+    return f"is_active = false AND _audit_updated_at < TIMESTAMP '{cutoff}'"
+
+
+def pending_tombstone_cutoff(spark, table_identifier, archive_identifier):
+    # Cutoff of the last archive append while Silver still holds rows it
+    # covers, i.e. its Silver delete never committed. Every MERGE clause moves
+    # _audit_updated_at past a cutoff in the past, so rows matching it can only
+    # leave Silver: any still there were archived by that append, whatever
+    # Silver committed since.
+    if archive_identifier is None or not spark.catalog.tableExists(archive_identifier):
+        return None
+    rows = spark.sql(f"""
+        SELECT summary['{TOMBSTONE_CUTOFF_PROPERTY}'] FROM {archive_identifier}.snapshots
+        WHERE summary['{TOMBSTONE_CUTOFF_PROPERTY}'] IS NOT NULL
+        ORDER BY committed_at DESC LIMIT 1
+    """).collect()
+    if not rows:
+        return None
+    cutoff = rows[0][0]
+    remaining = spark.sql(f"SELECT 1 FROM {table_identifier} WHERE {tombstone_predicate(cutoff)} LIMIT 1").collect()
+    return cutoff if remaining else None
+
+
+def plan_tombstone_purge(spark, table_identifier, archive_identifier, policy, now):
+    cutoff = pending_tombstone_cutoff(spark, table_identifier, archive_identifier)
+    if cutoff is not None:
+        return ("purge_tombstones", f"resuming purge of tombstones before {cutoff}",
+                {"cutoff": cutoff, "archive": archive_identifier, "archived": True})
+
+    cutoff = (now - timedelta(days=policy.tombstone_retention_days)).strftime("%Y-%m-%d %H:%M:%S")
+    tombstones = spark.sql(f"""
+        SELECT COUNT(*) FROM {table_identifier} WHERE {tombstone_predicate(cutoff)}
+    """).collect()[0][0]
+    if tombstones < policy.min_tombstones:
+        return None
+    return ("purge_tombstones", f"{tombstones} tombstones before {cutoff}",
+            {"cutoff": cutoff, "archive": archive_identifier, "archived": False})
+
+
+def plan_actions(spark, table_identifier, health, policy, protected_snapshot_id=None,
+                 purge_tombstones=False, archive_identifier=None):
+    now = datetime.now()
+    actions = []
+
+    retention_cutoff = now - timedelta(hours=policy.snapshot_retention_hours)
+    if health.snapshots > policy.max_snapshots or (
+        health.oldest_snapshot_at is not None and health.oldest_snapshot_at < retention_cutoff
+    ):
+        older_than = retention_cutoff
+        if health.snapshots > policy.max_snapshots:
+            # Past the count, everything before the newest max_snapshots goes, however young
+            kept_from = spark.sql(f"""
+                SELECT committed_at FROM {table_identifier}.snapshots
+                ORDER BY committed_at DESC LIMIT {policy.max_snapshots}
+            """).collect()[-1]["committed_at"]
+            older_than = max(older_than, kept_from)
+        if protected_snapshot_id is not None:
+            # Keep everything a downstream incremental reader still has to start from
+            protected_at = snapshot_committed_at(spark, table_identifier, protected_snapshot_id)
+            if protected_at is not None and protected_at < older_than:
+                older_than = protected_at
+        if health.oldest_snapshot_at is not None and health.oldest_snapshot_at < older_than:
+            actions.append(("expire_snapshots", f"{health.snapshots} snapshots, oldest {health.oldest_snapshot_at}",
+                            {"older_than": older_than}))
+
+    if purge_tombstones and policy.tombstone_retention_days:
+        # Before compaction, which then folds the purge's delete files
+        purge = plan_tombstone_purge(spark, table_identifier, archive_identifier, policy, now)
+        if purge is not None:
+            actions.append(purge)
+
+    if health.compaction_partitions:
+        predicate = compaction_predicate(spark, table_identifier, health.compaction_partition_values)
+        actions.append(("rewrite_data_files",
+                        f"{len(health.compaction_partitions)} partitions with >= {policy.min_small_files} small "
+                        f"or >= {policy.max_delete_files} delete files", {"where": predicate} if predicate else {}))
+
+    if health.delete_files >= policy.max_delete_files:
+        actions.append(("rewrite_position_delete_files", f"{health.delete_files} delete files", {}))
+
+    if health.manifests > policy.max_manifests:
+        actions.append(("rewrite_manifests", f"{health.manifests} manifests", {}))
+
+    last_cleanup = get_table_property(spark, table_identifier, LAST_ORPHAN_CLEANUP_PROPERTY)
+    cleanup_interval = timedelta(hours=policy.orphan_cleanup_interval_hours)
+    if last_cleanup is None or now - datetime.fromisoformat(last_cleanup) > cleanup_interval:
+        actions.append(("remove_orphan_files", f"last cleanup {last_cleanup or 'never'}", {}))
+
+    return actions
+
+
+def _procedure_table(table_identifier):
+    # CALL procedures take the table name without the catalog prefix
+    catalog, name = table_identifier.split(".", 1)
+    return catalog, name
+
+
+def run_action(spark, table_identifier, action, params, policy):
+    catalog, name = _procedure_table(table_identifier)
+    bytes_rewritten = 0
+
+    if action == "expire_snapshots":
+        older_than = params["older_than"].strftime("%Y-%m-%d %H:%M:%S")
+        rows = spark.sql(f"""
+            CALL {catalog}.system.expire_snapshots(
+                table => '{name}',
+                older_than => TIMESTAMP '{older_than}',
+                retain_last => {policy.retain_last_snapshots}
+            )
+        """).collect()
+
+    elif action == "rewrite_data_files":
+        # Tables with a declared sort order keep it through compaction; binpack
+        # would concatenate sorted files back into overlapping ranges
+        strategy = "sort" if get_table_property(spark, table_identifier, "sort-order") else "binpack"
+        where = f'where => "{params["where"]}",' if params.get("where") else ""
+        rows = spark.sql(f"""
+            CALL {catalog}.system.rewrite_data_files(
+                table => '{name}',
+                strategy => '{strategy}',
+                {where}
+                options => map(
+                    'min-input-files', '{policy.min_small_files}',
+                    'delete-file-threshold', '{policy.max_delete_files}',
+                    'target-file-size-bytes', '{policy.target_file_size_bytes}',
+                    'partial-progress.enabled', 'true'
+                )
+            )
+        """).collect()
+        result = rows[0].asDict() if rows else {}
+        bytes_rewritten = result.get("rewritten_bytes_count")
+        if bytes_rewritten is None:
+            # Older Iceberg runtimes do not report bytes; the replace snapshot does
+            bytes_rewritten = int(latest_snapshot_summary(spark, table_identifier).get("removed-files-size", 0))
+
+    elif action == "rewrite_position_delete_files":
+        rows = spark.sql(f"CALL {catalog}.system.rewrite_position_delete_files(table => '{name}')").collect()
+        result = rows[0].asDict() if rows else {}
+        bytes_rewritten = result.get("rewritten_bytes_count") or 0
+
+    elif action == "rewrite_manifests":
+        rows = spark.sql(f"CALL {catalog}.system.rewrite_manifests(table => '{name}')").collect()
+
+    elif action == "remove_orphan_files":
+        older_than = (datetime.now() - timedelta(hours=policy.orphan_file_age_hours)).strftime("%Y-%m-%d %H:%M:%S")
+        rows = spark.sql(f"""
+            CALL {catalog}.system.remove_orphan_files(
+                table => '{name}',
+                older_than => TIMESTAMP '{older_than}'
+            )
+        """).collect()
+        set_table_properties(spark, table_identifier, {LAST_ORPHAN_CLEANUP_PROPERTY: datetime.now().isoformat()})
+        return int(bytes_rewritten or 0), {"orphan_files_removed": len(rows)}
+
+    elif action == "purge_tombstones":
+        return purge_tombstones(spark, table_identifier, params)
+
+    else:
+        raise ValueError(f"Unknown maintenance action: {action}")
+
+    return int(bytes_rewritten or 0), (rows[0].asDict() if rows else {})
+
+
+def purge_tombstones(spark, table_identifier, params):
+    predicate = tombstone_predicate(params["cutoff"])
+    before = table_stats(spark, table_identifier)
+
+    archived = 0
+    if params["archive"] is not None and not params["archived"]:
+        spark.table(table_identifier).where(predicate) \
+            .withColumn("_archived_at", current_timestamp()) \
+            .writeTo(params["archive"]) \
+            .option(f"snapshot-property.{TOMBSTONE_CUTOFF_PROPERTY}", params["cutoff"]) \
+            .option(f"snapshot-property.{TOMBSTONE_SOURCE_PROPERTY}", str(before.snapshot_id)) \
+            .append()
+        archived = int(latest_snapshot_summary(spark, params["archive"]).get("added-records", 0))
+
+    spark.sql(f"DELETE FROM {table_identifier} WHERE {predicate}")
+    after = table_stats(spark, table_identifier)
+
+    # Only inactive rows went, so a counter valid before the delete still is
+    properties = get_table_properties(spark, table_identifier)
+    if properties.get(ACTIVE_ROWS_SNAPSHOT_PROPERTY) == str(before.snapshot_id):
+        set_table_properties(spark, table_identifier,
+                             active_rows_properties(properties[ACTIVE_ROWS_PROPERTY], after.snapshot_id))
+
+    summary = latest_snapshot_summary(spark, table_identifier)
+    # Under merge-on-read the bytes only drop once compaction applies the delete files
+    return int(summary.get("removed-files-size", 0)), {
+        "cutoff": params["cutoff"],
+        "archived_rows": archived,
+        "rows_before": before.rows,
+        "rows_after": after.rows,
+        "bytes_before": before.bytes,
+        "bytes_after": after.bytes,
+    }
+
+
+def maintain_tables(spark, table_identifiers, policy=None, protected_snapshots=None, tombstone_archives=None):
+    # tombstone_archives: Silver table -> archive table (None purges without archiving)
+    policy = policy or MaintenancePolicy()
+    protected_snapshots = protected_snapshots or {}
+    tombstone_archives = tombstone_archives or {}
+    deadline = time.time() + policy.time_budget_seconds
+    results = []
+
+    for table_identifier in table_identifiers:
+        try:
+            health = inspect_table(spark, table_identifier, policy)
+            actions = plan_actions(spark, table_identifier, health, policy,
+                                   protected_snapshots.get(table_identifier),
+                                   table_identifier in tombstone_archives,
+                                   tombstone_archives.get(table_identifier))
+        except Exception as e:
+            logger.warning(f"Maintenance inspection failed for {table_identifier}: {str(e)}")
+            continue
+
+        if not actions:
+            logger.info(f"Maintenance: {table_identifier} healthy ({health.data_files} files, "
+                        f"{health.small_files} small, {health.snapshots} snapshots), nothing to do")
+            continue
+
+        for action, reason, params in actions:
+            if time.time() >= deadline:
+                logger.warning(f"Maintenance time budget spent, deferring {action} on {table_identifier}")
+                results.append(MaintenanceResult(table_identifier, action, reason, error="deferred: time budget"))
+                continue
+
+            started = time.time()
+            result = MaintenanceResult(table_identifier, action, reason)
+            try:
+                result.bytes_rewritten, result.details = run_action(spark, table_identifier, action, params, policy)
+                logger.info(f"Maintenance: {action} on {table_identifier} ({reason}) -> {result.details}")
+            except Exception as e:
+                result.error = str(e)
+                logger.warning(f"Maintenance: {action} failed on {table_identifier}: {str(e)}")
+            result.seconds = time.time() - started
+            results.append(result)
+
+    total_bytes = sum(r.bytes_rewritten for r in results)
+    logger.info(f"Maintenance finished: {len(results)} actions, {total_bytes} bytes rewritten")
+    return results
@@ -0,0 +1,136 @@
+import logging
+
+
+logger = logging.getLogger("cdc-iceberg-job")
+
+
+def get_table_properties(spark, table_identifier):
+    rows = spark.sql(f"SHOW TBLPROPERTIES {table_identifier}").collect()
+    return {r["key"]: r["value"] for r in rows}
+
+
+def get_table_property(spark, table_identifier, key, default=None):
+    return get_table_properties(spark, table_identifier).get(key, default)
+
+
+def set_table_properties(spark, table_identifier, properties):
+    assignments = ", ".join(f"'{k}'='{v}'" for k, v in properties.items())
+    spark.sql(f"ALTER TABLE {table_identifier} SET TBLPROPERTIES ({assignments})")
+
+
+def add_missing_columns(spark, table_identifier, columns):
+    existing = set(spark.table(table_identifier).columns)
+    missing = [(name, sql_type) for name, sql_type in columns if name not in existing]
+    if missing:
+        spark.sql(f"ALTER TABLE {table_identifier} ADD COLUMNS ({', '.join(f'{n} {t}' for n, t in missing)})")
+    return [name for name, _ in missing]
+
+
+def current_snapshot_id(spark, table_identifier):
+    rows = spark.sql(f"""
+        SELECT snapshot_id FROM {table_identifier}.history
+        WHERE is_current_ancestor = true
+        ORDER BY made_current_at DESC LIMIT 1
+    """).collect()
+    return rows[0]["snapshot_id"] if rows else None
+
+
+def is_current_ancestor(spark, table_identifier, snapshot_id):
+    # False once the snapshot has been expired or rolled back, which means
+    # incremental reads starting from it are no longer possible.
+    rows = spark.sql(f"""
+        SELECT COUNT(*) FROM {table_identifier}.history
+        WHERE snapshot_id = {int(snapshot_id)} AND is_current_ancestor = true
+    """).collect()
+    return rows[0][0] > 0
+
+
+def snapshot_committed_at(spark, table_identifier, snapshot_id):
+    rows = spark.sql(f"""
+        SELECT committed_at FROM {table_identifier}.snapshots WHERE snapshot_id = {int(snapshot_id)}
+    """).collect()
+    return rows[0]["committed_at"] if rows else None
+
+
+def latest_snapshot_summary(spark, table_identifier):
+    rows = spark.sql(f"""
+        SELECT summary FROM {table_identifier}.snapshots
+        ORDER BY committed_at DESC LIMIT 1
+    """).collect()
+    return rows[0]["summary"] if rows else {}
+
+
+def read_appends_between(spark, table_identifier, start_snapshot_id, end_snapshot_id):
+    # Rows appended after start (exclusive) up to end (inclusive). Without a
+    # start snapshot the whole table as of end is returned.
+    reader = spark.read.format("iceberg")
+    if start_snapshot_id is None:
+        reader = reader.option("snapshot-id", str(end_snapshot_id))
+    else:
+        reader = reader.option("start-snapshot-id", str(start_snapshot_id)) \
+                       .option("end-snapshot-id", str(end_snapshot_id))
+    return reader.load(table_identifier)
+
+
+def added_bytes_between(spark, table_identifier, start_snapshot_id, end_snapshot_id):
+    # Data file bytes committed after start (exclusive) up to end (inclusive),
+    # from snapshot summaries; without a start, the table's size as of end.
+    # Compaction (replace) and delete snapshots add no new rows to read.
+    if end_snapshot_id is None:
+        return 0
+    if start_snapshot_id is None:
+        rows = spark.sql(f"""
+            SELECT summary['total-files-size'] FROM {table_identifier}.snapshots
+            WHERE snapshot_id = {int(end_snapshot_id)}
+        """).collect()
+        return int(rows[0][0] or 0) if rows else 0
+
+    rows = spark.sql(f"""
+        SELECT SUM(CAST(s.summary['added-files-size'] AS BIGINT))
+        FROM {table_identifier}.history h
+        JOIN {table_identifier}.snapshots s ON h.snapshot_id = s.snapshot_id
+        WHERE h.is_current_ancestor = true
+          AND s.operation IN ('append', 'overwrite')
+          AND h.made_current_at > (SELECT made_current_at FROM {table_identifier}.history
+                                   WHERE snapshot_id = {int(start_snapshot_id)})
+          AND h.made_current_at <= (SELECT made_current_at FROM {table_identifier}.history
+                                    WHERE snapshot_id = {int(end_snapshot_id)})
+    """).collect()
+    return int(rows[0][0] or 0)
+
+
+def ancestor_snapshots_between(spark, table_identifier, start_snapshot_id, end_snapshot_id):
+    # Current-ancestor snapshots after start (exclusive) up to end (inclusive),
+    # oldest first; without a start, every retained ancestor up to end
+    start_filter = ""
+    if start_snapshot_id is not None:
+        start_filter = f"""AND h.made_current_at > (SELECT made_current_at FROM {table_identifier}.history
+                                                    WHERE snapshot_id = {int(start_snapshot_id)})"""
+    return spark.sql(f"""
+        SELECT s.snapshot_id, s.operation,
+               CAST(s.summary['added-files-size'] AS BIGINT) AS added_bytes,
+               CAST(s.summary['total-files-size'] AS BIGINT) AS total_bytes
+        FROM {table_identifier}.history h
+        JOIN {table_identifier}.snapshots s ON h.snapshot_id = s.snapshot_id
+        WHERE h.is_current_ancestor = true
+          {start_filter}
+          AND h.made_current_at <= (SELECT made_current_at FROM {table_identifier}.history
+                                    WHERE snapshot_id = {int(end_snapshot_id)})
+        ORDER BY h.made_current_at
+    """).collect()
+
+
+def live_files(spark, table_identifier, snapshot_id):
+    # (snapshot that added it, content, path) of every data and delete file in
+    # snapshot_id; content 0 is data, 1 position deletes, 2 equality deletes
+    return spark.read.format("iceberg").option("snapshot-id", str(snapshot_id)) \
+        .load(f"{table_identifier}.entries") \
+        .filter("status < 2") \
+        .selectExpr("snapshot_id", "data_file.content AS content", "data_file.file_path AS path") \
+        .collect()
+
+
+def partition_transforms(spark, table_identifier):
+    # DESCRIBE lists the current spec as "Part 0 | days(processed_at)" rows
+    rows = spark.sql(f"DESCRIBE TABLE EXTENDED {table_identifier}").collect()
+    return [r["data_type"] for r in rows if (r["col_name"] or "").startswith("Part ")]
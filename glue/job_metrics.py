@@ -0,0 +1,284 @@
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+
+logger = logging.getLogger("cdc-iceberg-job")
+
+# Spark job description carrying the current timer label, so the stages the
+# status store records can be attributed to the job stage that submitted them
+STAGE_PROPERTY = "spark.job.description"
+TERMINAL_STATUSES = ("COMPLETE", "FAILED", "SKIPPED")
+
+
+class StageMetricsCollector:
+    # Reads finished stages from Spark's own status store instead of listening
+    # from Python, so no listener event (one per task) crosses py4j. Task time
+    # quantiles come from the store's per-stage task summary.
+
+    def __init__(self, sc):
+        self._sc = sc
+        self._store = sc._jsc.sc().statusStore()
+        self._quantiles = sc._gateway.new_array(sc._jvm.double, 2)
+        self._quantiles[0], self._quantiles[1] = 0.99, 1.0
+        self._lock = threading.Lock()
+        self._seen = set()
+        # Every stage at or below this id was already terminal at the last collect
+        self._floor = -1
+        self.stages = []
+
+    def collect(self):
+        with self._lock:
+            unfinished = []
+            newest = self._floor
+            # Newest first, so only stages since the last collect are visited
+            iterator = self._stage_list().iterator()
+            while iterator.hasNext():
+                data = iterator.next()
+                stage_id = data.stageId()
+                if stage_id <= self._floor:
+                    break
+                newest = max(newest, stage_id)
+                status = data.status().toString()
+                if status not in TERMINAL_STATUSES:
+                    unfinished.append(stage_id)
+                    continue
+                key = (stage_id, data.attemptId())
+                if key in self._seen or status == "SKIPPED":
+                    continue
+                self._seen.add(key)
+                self.stages.append(self._stage_metrics(data, status))
+            self._floor = min(unfinished) - 1 if unfinished else newest
+
+    def _stage_list(self):
+        try:
+            return self._store.stageList(None)
+        except Exception:
+            # Spark 3.4+ adds defaulted parameters, which py4j has to pass explicitly
+            jvm = self._sc._jvm
+            return self._store.stageList(None, False, False, self._sc._gateway.new_array(jvm.double, 0),
+                                         jvm.java.util.Collections.emptyList())
+
+    def _stage_metrics(self, data, status):
+        description = data.description()
+        tasks = data.numCompleteTasks()
+        run_ms = data.executorRunTime()
+        p99, longest = self._task_quantiles(data)
+        return {
+            "stage_id": data.stageId(),
+            "label": description.get() if description.isDefined() else None,
+            "name": data.name(),
+            "tasks": data.numTasks(),
+            "failed": status == "FAILED",
+            "input_bytes": data.inputBytes(),
+            "output_bytes": data.outputBytes(),
+            "shuffle_read_bytes": data.shuffleReadBytes(),
+            "shuffle_write_bytes": data.shuffleWriteBytes(),
+            "memory_spill_bytes": data.memoryBytesSpilled(),
+            "disk_spill_bytes": data.diskBytesSpilled(),
+            "executor_run_ms": run_ms,
+            "task_ms_max": longest,
+            "task_ms_p99": p99,
+            # Longest task over the mean: 1.0 is perfectly even, large values mean skew
+            "task_skew": round(longest / (run_ms / tasks), 2) if longest and tasks and run_ms else None,
+        }
+
+    def _task_quantiles(self, data):
+        # (p99, max) task run time; (0, 0) once the stage's tasks were evicted
+        try:
+            summary = self._store.taskSummary(data.stageId(), data.attemptId(), self._quantiles)
+            if summary.isEmpty():
+                return 0, 0
+            run_times = summary.get().executorRunTime()
+            return int(run_times.apply(0)), int(run_times.apply(1))
+        except Exception as e:
+            logger.warning(f"Task summary unavailable for stage {data.stageId()}: {str(e)}")
+            return 0, 0
+
+
+class FileSink:
+    def __init__(self, path):
+        self.path = path
+
+    def emit(self, document):
+        os.makedirs(self.path, exist_ok=True)
+        with open(f"{self.path.rstrip('/')}/{document['job']}-{document['run_id']}.json", "w") as f:
+            json.dump(document, f, indent=2)
+
+
+class HadoopFileSink:
+    # s3:// (or any Hadoop filesystem) through the JVM, as raw_compactor does
+    def __init__(self, spark, path):
+        self.spark = spark
+        self.path = path
+
+    def emit(self, document):
+        jvm = self.spark.sparkContext._jvm
+        path = jvm.org.apache.hadoop.fs.Path(
+            f"{self.path.rstrip('/')}/{document['job']}/{document['run_id']}.json"
+        )
+        fs = path.getFileSystem(self.spark.sparkContext._jsc.hadoopConfiguration())
+        stream = fs.create(path, True)
+        try:
+            stream.write(bytearray(json.dumps(document).encode("utf-8")))
+        finally:
+            stream.close()
+
+
+class EmfSink:
+    # CloudWatch Embedded Metric Format: one log line per job stage, picked up
+    # from the continuous log stream and turned into metrics without API calls
+    def __init__(self, namespace="CdcPipeline"):
+        self.namespace = namespace
+
+    def emit(self, document):
+        for stage in document["stages"]:
+            print(json.dumps({
+                "_aws": {
+                    "Timestamp": int(time.time() * 1000),
+                    "CloudWatchMetrics": [{
+                        "Namespace": self.namespace,
+                        "Dimensions": [["Job", "Stage"], ["Job", "Stage", "Table"]],
+                        "Metrics": [
+                            {"Name": "Seconds", "Unit": "Seconds"},
+                            {"Name": "Records", "Unit": "Count"},
+                            {"Name": "ShuffleBytes", "Unit": "Bytes"},
+                            {"Name": "SpillBytes", "Unit": "Bytes"},
+                            {"Name": "InputBytes", "Unit": "Bytes"},
+                        ],
+                    }],
+                },
+                "Job": document["job"],
+                "Stage": stage["stage"],
+                "Table": stage.get("table", "all"),
+                "RunId": document["run_id"],
+                "Seconds": stage["seconds"],
+                "Records": stage.get("records", 0),
+                "ShuffleBytes": stage["spark"]["shuffle_read_bytes"],
+                "SpillBytes": stage["spark"]["memory_spill_bytes"] + stage["spark"]["disk_spill_bytes"],
+                "InputBytes": stage["spark"]["input_bytes"],
+            }), flush=True)
+
+
+def create_sinks(spark, spec):
+    # "emf,s3://bucket/metrics" -> [EmfSink(), HadoopFileSink(...)]; "" or "none" -> []
+    sinks = []
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        if item == "none":
+            continue
+        if item == "emf":
+            sinks.append(EmfSink())
+        elif "://" in item:
+            sinks.append(HadoopFileSink(spark, item))
+        else:
+            sinks.append(FileSink(item))
+    return sinks
+
+
+class RunMetrics:
+    def __init__(self, spark, job_name, sinks=None, listen=True):
+        self.spark = spark
+        self.job_name = job_name
+        self.sinks = sinks or []
+        self.run_id = uuid.uuid4().hex[:12]
+        self.started_at = time.time()
+        self.stages = []
+        self.tables = {}
+        self._lock = threading.Lock()
+        self.collector = None
+        if listen:
+            try:
+                self.collector = StageMetricsCollector(spark.sparkContext)
+            except Exception as e:
+                logger.warning(f"Spark stage metrics unavailable, timing only: {str(e)}")
+
+    @contextmanager
+    def stage(self, name, **labels):
+        # Yields a dict the caller can add counters to, e.g. timing["records"] = n
+        sc = self.spark.sparkContext
+        label = "/".join([str(v) for v in labels.values()] + [name])
+        previous = sc.getLocalProperty(STAGE_PROPERTY)
+        sc.setLocalProperty(STAGE_PROPERTY, label)
+        timing = {"stage": name, **labels, "label": label, "started_at": time.time()}
+        try:
+            yield timing
+        except Exception as e:
+            timing["error"] = str(e).splitlines()[0] if str(e) else type(e).__name__
+            raise
+        finally:
+            sc.setLocalProperty(STAGE_PROPERTY, previous)
+            timing["seconds"] = round(time.time() - timing["started_at"], 3)
+            with self._lock:
+                self.stages.append(timing)
+            # Collected as stages finish so the store's stage retention never drops them
+            self._collect()
+            logger.info(f"Stage {label} took {timing['seconds']}s")
+
+    def _collect(self):
+        if self.collector is None:
+            return
+        try:
+            self.collector.collect()
+        except Exception as e:
+            logger.warning(f"Could not read Spark stage metrics: {str(e)}")
+
+    def record(self, key, values):
+        with self._lock:
+            self.tables[key] = values
+
+    def document(self):
+        self._collect()
+        spark_stages = list(self.collector.stages) if self.collector is not None else []
+        stages = []
+        for timing in self.stages:
+            own = [s for s in spark_stages if s["label"] == timing["label"]]
+            stages.append(dict(timing, spark={
+                "stages": len(own),
+                "tasks": sum(s["tasks"] for s in own),
+                "input_bytes": sum(s["input_bytes"] for s in own),
+                "output_bytes": sum(s["output_bytes"] for s in own),
+                "shuffle_read_bytes": sum(s["shuffle_read_bytes"] for s in own),
+                "shuffle_write_bytes": sum(s["shuffle_write_bytes"] for s in own),
+                "memory_spill_bytes": sum(s["memory_spill_bytes"] for s in own),
+                "disk_spill_bytes": sum(s["disk_spill_bytes"] for s in own),
+                "task_skew_max": max((s["task_skew"] for s in own if s["task_skew"]), default=None),
+                "task_ms_p99_max": max((s["task_ms_p99"] for s in own), default=None),
+            }))
+        return {
+            "job": self.job_name,
+            "run_id": self.run_id,
+            "started_at": datetime.fromtimestamp(self.started_at, tz=timezone.utc).isoformat(),
+            "seconds": round(time.time() - self.started_at, 3),
+            "stages": stages,
+            "tables": dict(self.tables),
+            "spark_stages": spark_stages,
+        }
+
+    def emit(self):
+        document = self.document()
+        for sink in self.sinks:
+            try:
+                sink.emit(document)
+            except Exception as e:
+                logger.warning(f"Metrics sink {type(sink).__name__} failed: {str(e)}")
+        return document
+
+    def flush(self):
+        # Long-running (streaming) jobs emit one document per batch instead of per run
+        document = self.emit()
+        with self._lock:
+            self.stages = []
+            self.tables = {}
+        if self.collector is not None:
+            with self.collector._lock:
+                self.collector.stages = []
+        self.started_at = time.time()
+        return document
+
+    def close(self):
+        self.collector = None
@@ -0,0 +1,56 @@
+from pyspark import SparkConf
+from pyspark.context import SparkContext
+from pyspark.sql import SparkSession
+
+try:
+    from awsglue.utils import getResolvedOptions
+    from awsglue.context import GlueContext
+    from awsglue.job import Job
+    IN_GLUE = True
+except ImportError:
+    # Local runs (benchmarks/) have no awsglue; the caller builds the session
+    # and its Hadoop glue_catalog before importing a job module.
+    IN_GLUE = False
+
+
+def resolve_options(argv, names):
+    if IN_GLUE:
+        return getResolvedOptions(argv, names)
+
+    options = {}
+    for name in names:
+        flag = f"--{name}"
+        if flag not in argv or argv.index(flag) + 1 >= len(argv):
+            raise ValueError(f"Missing required option {flag}")
+        options[name] = argv[argv.index(flag) + 1]
+    return options
+
+
+def init_job(args, conf=None):
+    if not IN_GLUE:
+        return SparkSession.builder.getOrCreate(), None
+
+    sc = SparkContext(conf=conf or SparkConf())
+    glue_context = GlueContext(sc)
+    job = Job(glue_context)
+    job.init(args["JOB_NAME"], args)
+    return glue_context.spark_session, job
+
+
+def configure_glue_catalog(spark, warehouse):
+    if not IN_GLUE:
+        return
+    spark.conf.set("spark.sql.catalog.glue_catalog", "org.apache.iceberg.spark.SparkCatalog")
+    spark.conf.set("spark.sql.catalog.glue_catalog.catalog-impl", "org.apache.iceberg.aws.glue.GlueCatalog")
+    spark.conf.set("spark.sql.catalog.glue_catalog.warehouse", warehouse)
+    spark.conf.set("spark.sql.catalog.glue_catalog.io-impl", "org.apache.iceberg.aws.s3.S3FileIO")
+
+
+def location_clause(path):
+    # Hadoop catalogs place every table under the warehouse and reject LOCATION
+    return f"LOCATION '{path}'" if IN_GLUE else ""
+
+
+def commit_job(job):
+    if job is not None:
+        job.commit()
@@ -0,0 +1,206 @@
+import json
+import logging
+import math
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+from raw_manifest import RawFile, committed_paths, list_raw_files
+
+
+logger = logging.getLogger("cdc-iceberg-job")
+
+MANIFEST_DIR = "_manifests"
+
+
+@dataclass
+class CompactionPolicy:
+    small_file_bytes: int = 8 * 1024 * 1024
+    target_segment_bytes: int = 128 * 1024 * 1024
+    # A window needs this many small objects before packing it is worth a job
+    min_files_per_window: int = 20
+    window_minutes: int = 60
+    # Windows are only packed once they have been closed this long
+    grace_minutes: int = 15
+    delete_sources: bool = True
+    keep_manifest_versions: int = 5
+
+
+def _fs(spark, path):
+    jvm = spark.sparkContext._jvm
+    hadoop_path = jvm.org.apache.hadoop.fs.Path(path)
+    return hadoop_path.getFileSystem(spark.sparkContext._jsc.hadoopConfiguration()), hadoop_path
+
+
+def load_compacted_manifest(spark, compacted_table_path):
+    # Manifests are immutable versioned files; the highest version is current.
+    fs, manifest_dir = _fs(spark, f"{compacted_table_path}/{MANIFEST_DIR}")
+    if not fs.exists(manifest_dir):
+        return 0, {"segments": []}
+
+    versions = sorted(
+        int(status.getPath().getName()[1:-5])
+        for status in fs.listStatus(manifest_dir)
+        if status.getPath().getName().startswith("v") and status.getPath().getName().endswith(".json")
+    )
+    if not versions:
+        return 0, {"segments": []}
+
+    jvm = spark.sparkContext._jvm
+    stream = fs.open(jvm.org.apache.hadoop.fs.Path(manifest_dir, f"v{versions[-1]:08d}.json"))
+    try:
+        content = jvm.org.apache.commons.io.IOUtils.toString(stream, "UTF-8")
+    finally:
+        stream.close()
+    return versions[-1], json.loads(content)
+
+
+def write_compacted_manifest(spark, compacted_table_path, version, manifest, policy):
+    # create(overwrite=False) publishes the new version in one step and fails if a
+    # concurrent compactor already claimed the version, so readers never see a
+    # partially written manifest and two writers cannot both win.
+    fs, manifest_dir = _fs(spark, f"{compacted_table_path}/{MANIFEST_DIR}")
+    jvm = spark.sparkContext._jvm
+    stream = fs.create(jvm.org.apache.hadoop.fs.Path(manifest_dir, f"v{version:08d}.json"), False)
+    try:
+        stream.write(bytearray(json.dumps(manifest).encode("utf-8")))
+    finally:
+        stream.close()
+
+    # Versions are written one at a time, so each write retires exactly one
+    expired = version - policy.keep_manifest_versions
+    if expired >= 1:
+        fs.delete(jvm.org.apache.hadoop.fs.Path(manifest_dir, f"v{expired:08d}.json"), False)
+
+
+def drop_deleted_segments(spark, compacted_table_path, manifest):
+    # Segments whose part files are all gone, e.g. expired by the bucket
+    # lifecycle, are dropped so the manifest does not grow forever
+    existing = {f.path for f in list_raw_files(spark, compacted_table_path)}
+    kept = [s for s in manifest["segments"]
+            if s.get("source_files") or any(part["path"] in existing for part in s["parts"])]
+    dropped = len(manifest["segments"]) - len(kept)
+    manifest["segments"] = kept
+    return dropped
+
+
+def prefer_compacted(spark, compacted_table_path, listed, include_ingested=False):
+    # Swap raw objects covered by a segment for the segment's part files.
+    # Segments packed from already-ingested objects are skipped unless asked for.
+    _, manifest = load_compacted_manifest(spark, compacted_table_path)
+    covered = set()
+    candidates = []
+    for segment in manifest["segments"]:
+        covered.update(segment.get("source_files", []))
+        if include_ingested or not segment["ingested"]:
+            candidates += [RawFile(**part) for part in segment["parts"]]
+
+    candidates += [f for f in listed if f.path not in covered]
+    return candidates
+
+
+def _window_key(modification_time, window_minutes):
+    window_ms = window_minutes * 60 * 1000
+    start = modification_time - modification_time % window_ms
+    return start, datetime.fromtimestamp(start / 1000, tz=timezone.utc).strftime("%Y%m%d%H%M")
+
+
+def _delete_files(spark, paths):
+    deleted = []
+    for path in paths:
+        fs, hadoop_path = _fs(spark, path)
+        if fs.delete(hadoop_path, False) or not fs.exists(hadoop_path):
+            deleted.append(path)
+    return deleted
+
+
+def compact_raw_table(spark, table, raw_path, compacted_table_path, manifest_table, policy=None):
+    policy = policy or CompactionPolicy()
+    version, manifest = load_compacted_manifest(spark, compacted_table_path)
+    stats = {"table": table, "segments": 0, "files_packed": 0, "bytes_packed": 0, "sources_deleted": 0,
+             "segments_dropped": 0}
+
+    # Finish source deletion a previous run committed to but did not complete
+    pending_delete = [p for s in manifest["segments"] for p in s.get("source_files", [])]
+    deleted = set()
+    if policy.delete_sources and pending_delete:
+        deleted = set(_delete_files(spark, pending_delete))
+        for segment in manifest["segments"]:
+            segment["source_files"] = [p for p in segment.get("source_files", []) if p not in deleted]
+        stats["sources_deleted"] += len(deleted)
+    if manifest["segments"]:
+        stats["segments_dropped"] = drop_deleted_segments(spark, compacted_table_path, manifest)
+    if deleted or stats["segments_dropped"]:
+        version += 1
+        write_compacted_manifest(spark, compacted_table_path, version, manifest, policy)
+
+    covered = {p for s in manifest["segments"] for p in s.get("source_files", [])}
+    cutoff_ms = int((time.time() - policy.grace_minutes * 60) * 1000)
+    window_ms = policy.window_minutes * 60 * 1000
+
+    small = [
+        f for f in list_raw_files(spark, raw_path)
+        if f.size < policy.small_file_bytes and f.path not in covered
+    ]
+    windows = {}
+    for f in small:
+        start, key = _window_key(f.modification_time, policy.window_minutes)
+        if start + window_ms <= cutoff_ms:
+            windows.setdefault(key, []).append(f)
+
+    ingested = committed_paths(spark, manifest_table, table, [f for files in windows.values() for f in files])
+    new_segments = []
+
+    for key, files in sorted(windows.items()):
+        if len(files) < policy.min_files_per_window:
+            continue
+        # Keep already-ingested objects apart so readers can skip their segments outright
+        groups = {
+            True: [f for f in files if f.path in ingested],
+            False: [f for f in files if f.path not in ingested],
+        }
+        for is_ingested, group in groups.items():
+            if not group:
+                continue
+            total_bytes = sum(f.size for f in group)
+            # Plain directory names: key=value dirs would surface as partition columns on read
+            segment_path = f"{compacted_table_path}/{key}/{uuid.uuid4().hex}"
+            spark.read.text([f.path for f in group]) \
+                .coalesce(max(1, math.ceil(total_bytes / policy.target_segment_bytes))) \
+                .write.option("compression", "gzip") \
+                .text(segment_path)
+
+            parts = [
+                {"path": p.path, "size": p.size, "modification_time": p.modification_time}
+                for p in list_raw_files(spark, segment_path)
+            ]
+            new_segments.append({
+                "window": key,
+                "path": segment_path,
+                "ingested": is_ingested,
+                "bytes": total_bytes,
+                "parts": parts,
+                "source_files": [f.path for f in group],
+                "created_at": datetime.now(timezone.utc).isoformat(),
+            })
+            stats["segments"] += 1
+            stats["files_packed"] += len(group)
+            stats["bytes_packed"] += total_bytes
+
+    if new_segments:
+        manifest["segments"] = manifest["segments"] + new_segments
+        version += 1
+        write_compacted_manifest(spark, compacted_table_path, version, manifest, policy)
+
+        if policy.delete_sources:
+            sources = [p for s in new_segments for p in s["source_files"]]
+            deleted = set(_delete_files(spark, sources))
+            for segment in manifest["segments"]:
+                segment["source_files"] = [p for p in segment.get("source_files", []) if p not in deleted]
+            stats["sources_deleted"] += len(deleted)
+            version += 1
+            write_compacted_manifest(spark, compacted_table_path, version, manifest, policy)
+
+    logger.info(f"Raw compaction for {table}: {stats}")
+    return stats
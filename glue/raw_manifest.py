@@ -0,0 +1,236 @@
+import hashlib
+import json
+import logging
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from typing import List
+
+from pyspark.sql.functions import col, current_timestamp, lit
+from pyspark.sql.types import StructType, StructField, StringType, LongType
+
+
+logger = logging.getLogger("cdc-iceberg-job")
+
+BATCH_ID_PROPERTY = "cdc.raw-batch-id"
+
+LISTING_SCHEMA = StructType([
+    StructField("file_path", StringType(), False),
+    StructField("file_size", LongType(), False),
+    StructField("modification_time", LongType(), False),
+])
+
+
+@dataclass
+class RawFile:
+    path: str
+    size: int
+    modification_time: int
+
+
+@dataclass
+class RawBatch:
+    table: str
+    files: List[RawFile] = field(default_factory=list)
+
+    @property
+    def paths(self):
+        return [f.path for f in self.files]
+
+    @property
+    def total_bytes(self):
+        return sum(f.size for f in self.files)
+
+    @property
+    def batch_id(self):
+        # Deterministic over the file set, so a retried run that finds the same
+        # pending files produces the same id and can detect its own earlier commit.
+        digest = hashlib.sha1()
+        for f in sorted(self.files, key=lambda x: x.path):
+            digest.update(f"{f.path}|{f.size}|{f.modification_time}\n".encode("utf-8"))
+        return f"{self.table}-{digest.hexdigest()[:20]}"
+
+
+def create_manifest_table(spark, manifest_table, location=None):
+    spark.sql(f"""
+        CREATE TABLE IF NOT EXISTS {manifest_table} (
+            table_name STRING, file_path STRING, file_size BIGINT,
+            modification_time BIGINT, batch_id STRING, committed_at TIMESTAMP
+        ) USING iceberg
+        {f"LOCATION '{location}'" if location else ""}
+        PARTITIONED BY (table_name)
+        TBLPROPERTIES ('format-version'='2')
+    """)
+    logger.info(f"Raw ingest manifest {manifest_table} created/verified")
+
+
+def list_raw_files(spark, path, after=None, lookback=0):
+    # Goes through the Hadoop FileSystem API so the same code lists s3:// in Glue
+    # and file:// (or a bare local path) when run offline. With `after`, only the
+    # top-level directories from `after` on, less `lookback` before it for late
+    # arrivals, are listed recursively; objects directly under path always are.
+    jvm = spark.sparkContext._jvm
+    hadoop_path = jvm.org.apache.hadoop.fs.Path(path)
+    fs = hadoop_path.getFileSystem(spark.sparkContext._jsc.hadoopConfiguration())
+
+    if not fs.exists(hadoop_path):
+        return []
+    if after is None:
+        return _list_recursive(fs, hadoop_path)
+
+    files, directories = [], []
+    for status in fs.listStatus(hadoop_path):
+        if status.isDirectory():
+            directories.append(status.getPath())
+        elif _is_data_file(status):
+            files.append(_raw_file(status))
+    directories.sort(key=lambda p: p.getName())
+    first = max(0, bisect_left([p.getName() for p in directories], after) - lookback)
+    for directory in directories[first:]:
+        files += _list_recursive(fs, directory)
+    logger.info(f"Listed {len(directories) - first} of {len(directories)} raw directories under {path} from {after}")
+    return files
+
+
+def _is_data_file(status):
+    name = status.getPath().getName()
+    return not (name.startswith("_") or name.startswith("."))
+
+
+def _raw_file(status):
+    return RawFile(
+        path=status.getPath().toString(),
+        size=status.getLen(),
+        modification_time=status.getModificationTime()
+    )
+
+
+def _list_recursive(fs, hadoop_path):
+    files = []
+    iterator = fs.listFiles(hadoop_path, True)
+    while iterator.hasNext():
+        status = iterator.next()
+        if _is_data_file(status):
+            files.append(_raw_file(status))
+    return files
+
+
+def listing_cursor(spark, manifest_table, table, path):
+    # Top-level directory under path of the newest committed object, in name
+    # order; None for objects committed directly under path. The max path never
+    # sorts past the max directory name, so the cursor can only list too much.
+    fs, hadoop_path = _hadoop_path(spark, path)
+    root = fs.makeQualified(hadoop_path).toString().rstrip("/") + "/"
+    newest = spark.sql(f"""
+        SELECT MAX(file_path) FROM {manifest_table}
+        WHERE table_name = '{table}' AND left(file_path, {len(root)}) = '{root}'
+    """).collect()[0][0]
+    if newest is None or "/" not in newest[len(root):]:
+        return None
+    return newest[len(root):].split("/", 1)[0]
+
+
+def _committed_df(spark, manifest_table, table):
+    return spark.read.table(manifest_table) \
+        .filter(col("table_name") == table) \
+        .select("file_path")
+
+
+def find_new_raw_files(spark, manifest_table, table, path, listed=None):
+    # listed lets callers substitute their own candidates, e.g. compacted segments
+    if listed is None:
+        listed = list_raw_files(spark, path)
+    if not listed:
+        return RawBatch(table=table)
+
+    listing_df = spark.createDataFrame(
+        [(f.path, f.size, f.modification_time) for f in listed], LISTING_SCHEMA
+    )
+    new_rows = listing_df.join(_committed_df(spark, manifest_table, table), "file_path", "left_anti") \
+        .orderBy("modification_time", "file_path") \
+        .collect()
+
+    batch = RawBatch(table=table, files=[
+        RawFile(path=r.file_path, size=r.file_size, modification_time=r.modification_time)
+        for r in new_rows
+    ])
+    logger.info(
+        f"Raw listing for {table}: {len(listed)} objects, {len(batch.files)} new "
+        f"({batch.total_bytes} bytes)"
+    )
+    return batch
+
+
+def committed_paths(spark, manifest_table, table, files):
+    if not files:
+        return set()
+    listing_df = spark.createDataFrame(
+        [(f.path, f.size, f.modification_time) for f in files], LISTING_SCHEMA
+    )
+    rows = listing_df.join(_committed_df(spark, manifest_table, table), "file_path", "left_semi") \
+        .select("file_path") \
+        .collect()
+    return {r.file_path for r in rows}
+
+
+def batch_committed(spark, target_table, batch_id):
+    rows = spark.sql(f"""
+        SELECT COUNT(*) FROM {target_table}.snapshots
+        WHERE summary['{BATCH_ID_PROPERTY}'] = '{batch_id}'
+    """).collect()
+    return rows[0][0] > 0
+
+
+def record_raw_batch(spark, manifest_table, batch):
+    if not batch.files:
+        return
+
+    spark.createDataFrame(
+        [(f.path, f.size, f.modification_time) for f in batch.files], LISTING_SCHEMA
+    ).select(
+        lit(batch.table).alias("table_name"),
+        col("file_path"),
+        col("file_size"),
+        col("modification_time"),
+        lit(batch.batch_id).alias("batch_id"),
+        current_timestamp().alias("committed_at")
+    ).writeTo(manifest_table).append()
+
+    logger.info(f"Recorded {len(batch.files)} raw files for {batch.table} as batch {batch.batch_id}")
+
+
+def _hadoop_path(spark, path):
+    jvm = spark.sparkContext._jvm
+    hadoop_path = jvm.org.apache.hadoop.fs.Path(path)
+    return hadoop_path.getFileSystem(spark.sparkContext._jsc.hadoopConfiguration()), hadoop_path
+
+
+def pin_raw_batch(spark, pin_path, batch):
+    # Written before the Bronze append: a run that dies before the manifest is
+    # updated leaves the exact file list behind, so the next run retries the
+    # same batch id instead of a new one that also takes in later arrivals.
+    fs, hadoop_path = _hadoop_path(spark, pin_path)
+    stream = fs.create(hadoop_path, True)
+    try:
+        stream.write(bytearray(json.dumps({
+            "table": batch.table,
+            "files": [{"path": f.path, "size": f.size, "modification_time": f.modification_time} for f in batch.files],
+        }).encode("utf-8")))
+    finally:
+        stream.close()
+
+
+def load_pinned_batch(spark, pin_path):
+    fs, hadoop_path = _hadoop_path(spark, pin_path)
+    if not fs.exists(hadoop_path):
+        return None
+    stream = fs.open(hadoop_path)
+    try:
+        content = json.loads(spark.sparkContext._jvm.org.apache.commons.io.IOUtils.toString(stream, "UTF-8"))
+    finally:
+        stream.close()
+    return RawBatch(table=content["table"], files=[RawFile(**f) for f in content["files"]])
+
+
+def clear_pinned_batch(spark, pin_path):
+    fs, hadoop_path = _hadoop_path(spark, pin_path)
+    fs.delete(hadoop_path, False)
@@ -0,0 +1,68 @@
+import logging
+import math
+from dataclasses import dataclass
+from typing import Optional
+
+
+logger = logging.getLogger("cdc-iceberg-job")
+
+# "{start}:{end}:{buckets}:{done}" while a chunk is being merged bucket by bucket
+CATCHUP_PROGRESS_PROPERTY = "cdc.silver.catchup-progress"
+
+
+@dataclass
+class CatchupChunk:
+    # Bronze snapshot range (start exclusive, end inclusive); no start reads the table as of end
+    start_snapshot_id: Optional[int]
+    end_snapshot_id: int
+    bytes: int
+    # Id hash ranges the chunk is merged in when one snapshot alone exceeds the budget
+    buckets: int = 1
+
+
+def plan_catchup_chunks(snapshots, start_snapshot_id, max_bytes):
+    # snapshots: ancestor_snapshots_between rows, oldest first. Cuts the range
+    # after a snapshot once the appended bytes reach max_bytes; max_bytes <= 0
+    # keeps the whole range as one chunk.
+    if not snapshots:
+        return []
+    if max_bytes <= 0:
+        total = sum(s["added_bytes"] or 0 for s in snapshots if s["operation"] == "append")
+        if start_snapshot_id is None:
+            total = snapshots[-1]["total_bytes"] or 0
+        return [CatchupChunk(start_snapshot_id, snapshots[-1]["snapshot_id"], total)]
+
+    chunks = []
+    chunk_start = start_snapshot_id
+    size = 0
+    if start_snapshot_id is None:
+        # Reading without a start returns everything committed before the
+        # oldest retained snapshot too
+        size = (snapshots[0]["total_bytes"] or 0) - (snapshots[0]["added_bytes"] or 0)
+    for snapshot in snapshots:
+        # Compaction and delete snapshots add no rows to an append read
+        if snapshot["operation"] == "append":
+            size += snapshot["added_bytes"] or 0
+        if size >= max_bytes:
+            chunks.append(CatchupChunk(chunk_start, snapshot["snapshot_id"], size, math.ceil(size / max_bytes)))
+            chunk_start = snapshot["snapshot_id"]
+            size = 0
+    if chunk_start != snapshots[-1]["snapshot_id"]:
+        chunks.append(CatchupChunk(chunk_start, snapshots[-1]["snapshot_id"], size))
+    return chunks
+
+
+def progress_value(chunk, done):
+    return f"{chunk.start_snapshot_id}:{chunk.end_snapshot_id}:{chunk.buckets}:{done}"
+
+
+def completed_buckets(chunk, progress):
+    # Buckets of this exact chunk a failed run already merged and committed
+    if not progress:
+        return 0
+    start, _, rest = progress.partition(":")
+    end, _, rest = rest.partition(":")
+    buckets, _, done = rest.partition(":")
+    if (start, end, buckets) != (str(chunk.start_snapshot_id), str(chunk.end_snapshot_id), str(chunk.buckets)):
+        return 0
+    return int(done)
@@ -0,0 +1,118 @@
+import logging
+from dataclasses import asdict, dataclass, field
+from typing import List, Optional
+
+from pyspark.sql.functions import broadcast, col, desc, max as max_, sum as sum_
+
+
+logger = logging.getLogger("cdc-iceberg-job")
+
+MB = 1024 * 1024
+
+
+@dataclass
+class SkewPolicy:
+    sample_fraction: float = 0.01
+    # A key is heavy when its rows alone would fill this many average shuffle partitions
+    heavy_partitions: float = 2.0
+    # Sampled rows below this say nothing about a single key
+    min_key_rows: int = 20
+    # The dimension rows of the heavy keys are broadcast; past this many keys a
+    # plain shuffle join is kept
+    max_heavy_keys: int = 1000
+    # Dimension sides up to this size on storage-expanded estimates are broadcast whole
+    broadcast_bytes: int = 64 * MB
+    seed: int = 17
+
+
+@dataclass
+class SkewReport:
+    join: str
+    key: str
+    # broadcast: whole dimension side broadcast; split: heavy keys joined
+    # against a broadcast of their dimension rows, the rest shuffled; shuffle: unchanged
+    strategy: str = "shuffle"
+    small_side_bytes: Optional[int] = None
+    sampled_rows: int = 0
+    heavy_keys: int = 0
+    # Estimated shares of the large side's rows on the heavy keys and on the heaviest one
+    heavy_share: float = 0.0
+    top_key_share: float = 0.0
+    top_keys: List[str] = field(default_factory=list)
+
+    def as_dict(self):
+        return asdict(self)
+
+
+def sample_heavy_keys(df, key, partitions, policy):
+    # (heavy key values, report fields) from a Bernoulli sample of the large side;
+    # Silver is clustered by id, so Iceberg column bounds say nothing about how
+    # often a user or product id occurs
+    counts = df.select(key).filter(col(key).isNotNull()) \
+        .sample(fraction=policy.sample_fraction, seed=policy.seed) \
+        .groupBy(key).count() \
+        .persist()
+    try:
+        totals = counts.agg(sum_("count").alias("rows"), max_("count").alias("top")).first()
+        sampled = totals["rows"] or 0
+        threshold = max(policy.min_key_rows, policy.heavy_partitions * sampled / max(partitions, 1))
+        heavy = counts.filter(col("count") >= threshold) \
+            .orderBy(desc("count")) \
+            .limit(policy.max_heavy_keys + 1) \
+            .collect()
+    finally:
+        counts.unpersist()
+    stats = {
+        "sampled_rows": sampled,
+        "heavy_keys": len(heavy),
+        "heavy_share": round(sum(r["count"] for r in heavy) / sampled, 4) if sampled else 0.0,
+        "top_key_share": round((totals["top"] or 0) / sampled, 4) if sampled else 0.0,
+        "top_keys": [str(r[key]) for r in heavy[:5]],
+    }
+    return [r[key] for r in heavy], stats
+
+
+def plan_size_bytes(df):
+    # Spark's optimizer estimate of the plan's output; exact for persisted
+    # frames, file sizes for table scans. None when the plan cannot be sized.
+    try:
+        return int(df._jdf.queryExecution().optimizedPlan().stats().sizeInBytes().toString())
+    except Exception as e:
+        logger.warning(f"Could not estimate plan size: {str(e)}")
+        return None
+
+
+def skew_join(large_df, small_df, key, how, name, partitions, small_bytes=None, policy=None):
+    # Joins a skewed fact side (left) to a dimension side on `key` for an
+    # inner, left or left_semi join; returns (joined, SkewReport)
+    policy = policy or SkewPolicy()
+    if small_bytes is None:
+        # A small side that fits a broadcast never needs the sample
+        small_bytes = plan_size_bytes(small_df)
+    report = SkewReport(name, key, small_side_bytes=small_bytes)
+
+    if small_bytes is not None and small_bytes <= policy.broadcast_bytes:
+        report.strategy = "broadcast"
+        joined = large_df.join(broadcast(small_df), key, how)
+    else:
+        heavy, stats = sample_heavy_keys(large_df, key, partitions, policy)
+        for attribute, value in stats.items():
+            setattr(report, attribute, value)
+        if not heavy or len(heavy) > policy.max_heavy_keys:
+            joined = large_df.join(small_df, key, how)
+        else:
+            # Heavy rows never reach the shuffle, so no task receives a whole hot key
+            report.strategy = "split"
+            is_heavy = col(key).isin(heavy)
+            heavy_part = large_df.filter(is_heavy).join(broadcast(small_df.filter(is_heavy)), key, how)
+            rest = large_df.filter(~is_heavy | col(key).isNull()) \
+                .join(small_df.filter(~is_heavy), key, how)
+            joined = rest.unionByName(heavy_part)
+
+    if report.strategy == "broadcast":
+        logger.info(f"Join {name} on {key}: broadcasting the ~{small_bytes // MB} MB dimension side")
+    else:
+        logger.info(f"Join {name} on {key}: {report.strategy}, {report.heavy_keys} heavy keys holding "
+                    f"~{report.heavy_share:.1%} of {report.sampled_rows} sampled rows, "
+                    f"top key ~{report.top_key_share:.1%}")
+    return joined, report
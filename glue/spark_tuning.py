@@ -0,0 +1,101 @@
+import logging
+import math
+from dataclasses import dataclass
+
+
+logger = logging.getLogger("cdc-iceberg-job")
+
+MB = 1024 * 1024
+
+
+@dataclass
+class TuningPolicy:
+    target_partition_bytes: int = 128 * MB
+    max_shuffle_partitions: int = 2000
+    # In-memory size relative to bytes on storage
+    json_expansion: float = 1.0
+    gzip_expansion: float = 6.0
+    parquet_expansion: float = 3.0
+    # Spark's own default; a side smaller than this always broadcasts
+    min_broadcast_bytes: int = 10 * MB
+    # Beyond this the driver collect and executor copies cost more than the shuffle
+    max_broadcast_bytes: int = 256 * MB
+
+
+@dataclass
+class TuningPlan:
+    input_bytes: int
+    shuffle_partitions: int
+    advisory_partition_bytes: int
+    broadcast_threshold_bytes: int
+    reason: str
+
+
+def raw_input_bytes(files, policy):
+    # Compacted segments are gzip; raw objects from the sink connector are plain NDJSON
+    return int(sum(
+        f.size * (policy.gzip_expansion if f.path.endswith(".gz") else policy.json_expansion)
+        for f in files
+    ))
+
+
+def parquet_input_bytes(size, policy):
+    return int(size * policy.parquet_expansion)
+
+
+def broadcast_threshold(side_bytes, policy):
+    # Broadcasts a join side of side_bytes with some headroom; a side past the
+    # ceiling, or of unknown size, keeps Spark's default
+    if side_bytes is None or side_bytes > policy.max_broadcast_bytes:
+        return policy.min_broadcast_bytes
+    return min(policy.max_broadcast_bytes, max(policy.min_broadcast_bytes, int(side_bytes * 1.2)))
+
+
+def plan_tuning(input_bytes, parallelism, policy=None, broadcast_side_bytes=None):
+    # broadcast_side_bytes is the estimated size of the smaller join side, e.g.
+    # the collapsed batch a MERGE joins against the Silver table
+    policy = policy or TuningPolicy()
+    parallelism = max(1, parallelism)
+
+    wanted = math.ceil(input_bytes / policy.target_partition_bytes)
+    # Whole waves over the available cores; never fewer tasks than cores
+    partitions = max(parallelism, math.ceil(wanted / parallelism) * parallelism)
+    partitions = min(partitions, max(parallelism, policy.max_shuffle_partitions))
+
+    # Small inputs get small advisory sizes so AQE does not coalesce a quiet hour
+    # into a single task; large inputs keep the target size.
+    advisory = max(MB, min(policy.target_partition_bytes, input_bytes // parallelism or MB))
+
+    broadcast = broadcast_threshold(broadcast_side_bytes, policy)
+
+    reason = (
+        f"~{input_bytes // MB} MB in memory over {parallelism} cores -> {partitions} shuffle partitions, "
+        f"{advisory // MB} MB advisory"
+    )
+    if broadcast_side_bytes is not None:
+        reason += f", join side ~{broadcast_side_bytes // MB} MB -> broadcast below {broadcast // MB} MB"
+    return TuningPlan(input_bytes, partitions, advisory, broadcast, reason)
+
+
+def combine_plans(plans):
+    # Session confs are shared by every table running concurrently, so the
+    # largest input decides; AQE coalesces the partitions smaller tables do not need.
+    plans = [p for p in plans if p is not None]
+    if not plans:
+        return None
+    return TuningPlan(
+        input_bytes=max(p.input_bytes for p in plans),
+        shuffle_partitions=max(p.shuffle_partitions for p in plans),
+        advisory_partition_bytes=max(p.advisory_partition_bytes for p in plans),
+        broadcast_threshold_bytes=min(p.broadcast_threshold_bytes for p in plans),
+        reason="largest of: " + "; ".join(p.reason for p in plans),
+    )
+
+
+def apply_tuning(spark, plan, label=""):
+    spark.conf.set("spark.sql.adaptive.enabled", "true")
+    spark.conf.set("spark.sql.adaptive.coalescePartitions.enabled", "true")
+    spark.conf.set("spark.sql.shuffle.partitions", str(plan.shuffle_partitions))
+    spark.conf.set("spark.sql.adaptive.advisoryPartitionSizeInBytes", str(plan.advisory_partition_bytes))
+    spark.conf.set("spark.sql.autoBroadcastJoinThreshold", str(plan.broadcast_threshold_bytes))
+    logger.info(f"Spark tuning {label}: {plan.reason}".replace("  ", " "))
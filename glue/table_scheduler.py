@@ -0,0 +1,58 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Optional
+
+
+logger = logging.getLogger("cdc-iceberg-job")
+
+POOL_PROPERTY = "spark.scheduler.pool"
+
+
+@dataclass
+class TableRunResult:
+    table: str
+    succeeded: bool
+    started_at: float
+    duration_seconds: float
+    error: Optional[str] = None
+
+
+def run_tables(spark, tables, process_fn, max_workers, pool_prefix="cdc"):
+    # Each table runs on its own driver thread and FAIR pool, so one table's
+    # MERGE does not queue behind another's scan. Requires spark.scheduler.mode=FAIR
+    # on the SparkContext; with FIFO the pools are ignored but threads still overlap.
+    sc = spark.sparkContext
+
+    def _run(table):
+        pool_name = f"{pool_prefix}_{table}"
+        sc.setLocalProperty(POOL_PROPERTY, pool_name)
+        sc.setJobGroup(pool_name, f"{pool_prefix} processing for {table}")
+        started_at = time.time()
+        try:
+            process_fn(table)
+            return TableRunResult(table, True, started_at, time.time() - started_at)
+        except Exception as e:
+            logger.warning(f"Skipping table {table} due to error: {str(e)}")
+            return TableRunResult(table, False, started_at, time.time() - started_at, str(e))
+        finally:
+            sc.setLocalProperty(POOL_PROPERTY, None)
+
+    workers = max(1, min(max_workers, len(tables)))
+    logger.info(f"Scheduling {len(tables)} tables on {workers} driver threads")
+
+    wall_start = time.time()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=pool_prefix) as executor:
+        results = list(executor.map(_run, tables))
+
+    log_run_summary(results, time.time() - wall_start)
+    return results
+
+
+def log_run_summary(results, wall_seconds):
+    serial_seconds = sum(r.duration_seconds for r in results)
+    for r in results:
+        status = "OK" if r.succeeded else f"FAILED ({r.error})"
+        logger.info(f"  {r.table}: {status} in {r.duration_seconds:.1f}s")
+    logger.info(f"Tables finished in {wall_seconds:.1f}s wall clock ({serial_seconds:.1f}s summed)")
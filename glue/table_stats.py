@@ -0,0 +1,126 @@
+import logging
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+from cdc_collapse import change_is_newer_sql
+from iceberg_tables import current_snapshot_id, get_table_properties
+
+
+logger = logging.getLogger("cdc-iceberg-job")
+
+ACTIVE_ROWS_PROPERTY = "cdc.stats.active-rows"
+# Snapshot the counter was valid for; any other commit to the table invalidates it
+ACTIVE_ROWS_SNAPSHOT_PROPERTY = "cdc.stats.active-rows-snapshot-id"
+
+
+@dataclass
+class TableStats:
+    snapshot_id: Optional[int] = None
+    rows: int = 0
+    # False while delete files exist: rows is then a lower bound
+    rows_exact: bool = True
+    data_files: int = 0
+    delete_files: int = 0
+    position_deletes: int = 0
+    equality_deletes: int = 0
+    added_records: int = 0
+    deleted_records: int = 0
+    bytes: int = 0
+    active_rows: Optional[int] = None
+
+    def as_dict(self):
+        return asdict(self)
+
+
+def _summary_int(summary, key):
+    return int(summary.get(key, 0) or 0)
+
+
+def table_stats(spark, table_identifier):
+    # Everything here comes from snapshot summaries and manifests; no data file is read
+    stats = TableStats()
+    rows = spark.sql(f"""
+        SELECT s.snapshot_id, s.summary
+        FROM {table_identifier}.snapshots s
+        JOIN {table_identifier}.history h ON s.snapshot_id = h.snapshot_id
+        WHERE h.is_current_ancestor = true
+        ORDER BY h.made_current_at DESC LIMIT 1
+    """).collect()
+    if not rows:
+        return stats
+
+    stats.snapshot_id = rows[0]["snapshot_id"]
+    summary = rows[0]["summary"]
+    if "total-records" in summary:
+        stats.data_files = _summary_int(summary, "total-data-files")
+        stats.delete_files = _summary_int(summary, "total-delete-files")
+        stats.position_deletes = _summary_int(summary, "total-position-deletes")
+        stats.equality_deletes = _summary_int(summary, "total-equality-deletes")
+        stats.bytes = _summary_int(summary, "total-files-size")
+        total_records = _summary_int(summary, "total-records")
+    else:
+        # Snapshots written by older writers carry no totals; manifests always do
+        files = spark.sql(f"""
+            SELECT
+                SUM(CASE WHEN content = 0 THEN 1 ELSE 0 END) AS data_files,
+                SUM(CASE WHEN content != 0 THEN 1 ELSE 0 END) AS delete_files,
+                SUM(CASE WHEN content = 0 THEN record_count ELSE 0 END) AS records,
+                SUM(CASE WHEN content = 1 THEN record_count ELSE 0 END) AS position_deletes,
+                SUM(CASE WHEN content = 2 THEN record_count ELSE 0 END) AS equality_deletes,
+                SUM(file_size_in_bytes) AS bytes
+            FROM {table_identifier}.files
+        """).collect()[0]
+        stats.data_files = files["data_files"] or 0
+        stats.delete_files = files["delete_files"] or 0
+        stats.position_deletes = files["position_deletes"] or 0
+        stats.equality_deletes = files["equality_deletes"] or 0
+        stats.bytes = files["bytes"] or 0
+        total_records = files["records"] or 0
+
+    # Exact while the table has no delete files. A position delete whose data
+    # file was already compacted away, or a second delete of the same row, still
+    # counts until rewrite_position_delete_files drops it, so with delete files
+    # this undercounts. The jobs write no equality deletes.
+    stats.rows = total_records - stats.position_deletes
+    stats.rows_exact = stats.delete_files == 0
+    stats.added_records = _summary_int(summary, "added-records")
+    stats.deleted_records = _summary_int(summary, "deleted-records")
+
+    properties = get_table_properties(spark, table_identifier)
+    if properties.get(ACTIVE_ROWS_SNAPSHOT_PROPERTY) == str(stats.snapshot_id):
+        stats.active_rows = int(properties[ACTIVE_ROWS_PROPERTY])
+    return stats
+
+
+def active_rows(spark, table_identifier):
+    # The maintained counter when it matches the current snapshot, else one full count
+    properties = get_table_properties(spark, table_identifier)
+    snapshot_id = current_snapshot_id(spark, table_identifier)
+    if snapshot_id is None:
+        return 0
+    if properties.get(ACTIVE_ROWS_SNAPSHOT_PROPERTY) == str(snapshot_id):
+        return int(properties[ACTIVE_ROWS_PROPERTY])
+
+    logger.info(f"Active row counter for {table_identifier} missing or stale, recounting")
+    return spark.sql(f"SELECT COUNT(*) FROM {table_identifier} WHERE is_active = true").collect()[0][0]
+
+
+def active_row_delta(flagged_df):
+    # Mirrors merge_silver's clauses over the MERGE source joined to the target
+    # row by cdc_processor.flag_unchanged, so no second join is needed: newer
+    # changes replace the row, a stale delete still deactivates it, unmatched
+    # changes are inserted as they are.
+    newer = change_is_newer_sql(("src_source_lsn", "src_ts_ms"), ("_tgt_source_lsn", "_tgt_ts_ms"))
+    return flagged_df.selectExpr(f"""
+        COALESCE(SUM(
+            CASE
+                WHEN _tgt_id IS NULL THEN IF(is_active, 1, 0)
+                WHEN {newer} THEN IF(is_active, 1, 0) - IF(_tgt_is_active, 1, 0)
+                WHEN op = 'd' THEN -IF(_tgt_is_active, 1, 0)
+                ELSE 0
+            END), 0)
+    """).first()[0]
+
+
+def active_rows_properties(active, snapshot_id):
+    return {ACTIVE_ROWS_PROPERTY: active, ACTIVE_ROWS_SNAPSHOT_PROPERTY: snapshot_id}
@@ -114,7 +114,7 @@ setup_connectors() {
             "value.converter.schemas.enable": "false",
             "transforms": "unwrap",
             "transforms.unwrap.type": "io.debezium.transforms.ExtractNewRecordState",
-            "transforms.unwrap.add.fields": "op,ts_ms,source",
+            "transforms.unwrap.add.fields": "op,ts_ms,source.lsn",
             "heartbeat.interval.ms": "5000"
         }')
 
@@ -58,7 +58,7 @@ class DebeziumConnectorManager:
             "value.converter.schemas.enable": "false",
             "transforms": "unwrap",
             "transforms.unwrap.type": "io.debezium.transforms.ExtractNewRecordState",
-            "transforms.unwrap.add.fields": "op,ts_ms,source",
+            "transforms.unwrap.add.fields": "op,ts_ms,source.lsn",
             "transforms.unwrap.delete.handling.mode": "rewrite",
             "heartbeat.interval.ms": "5000",
             "schema.history.internal.kafka.bootstrap.servers": os.getenv("KAFKA_BOOTSTRAP_SERVERS", "localhost:9092"),
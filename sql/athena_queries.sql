@@ -65,3 +65,21 @@ SELECT
     COUNT(CASE WHEN op = 'd' THEN 1 END) as deletes
 FROM "cdc_demo_dev"."bronze_orders";
 
+
+SELECT
+    period_start,
+    category,
+    SUM(total_orders) as total_orders,
+    SUM(total_revenue) as total_revenue
+FROM "cdc_demo_dev"."gold_sales_rollup_month"
+GROUP BY period_start, category
+ORDER BY period_start DESC, total_revenue DESC;
+
+SELECT
+    period_start,
+    user_segment,
+    SUM(total_revenue) as total_revenue
+FROM "cdc_demo_dev"."gold_sales_rollup_hour"
+WHERE date_key = CAST(current_date AS VARCHAR)
+GROUP BY period_start, user_segment
+ORDER BY period_start, user_segment;
@@ -109,12 +109,16 @@ resource "aws_glue_job" "cdc_processor" {
     "--JOB_NAME"                         = "${var.project_name}-${var.environment}-cdc-processor"
     "--DATABASE_NAME"                    = "cdc_demo"
     "--S3_BUCKET"                        = var.s3_bucket_name
+    "--INGEST_MODE"                      = "incremental"
+    "--SILVER_LAYOUT"                    = var.silver_layout
+    "--extra-py-files"                   = "s3://${var.s3_bucket_name}/scripts/cdc_collapse.py,s3://${var.s3_bucket_name}/scripts/cdc_schemas.py,s3://${var.s3_bucket_name}/scripts/iceberg_maintenance.py,s3://${var.s3_bucket_name}/scripts/iceberg_tables.py,s3://${var.s3_bucket_name}/scripts/job_metrics.py,s3://${var.s3_bucket_name}/scripts/job_runtime.py,s3://${var.s3_bucket_name}/scripts/raw_compactor.py,s3://${var.s3_bucket_name}/scripts/raw_manifest.py,s3://${var.s3_bucket_name}/scripts/silver_catchup.py,s3://${var.s3_bucket_name}/scripts/skew_joins.py,s3://${var.s3_bucket_name}/scripts/spark_tuning.py,s3://${var.s3_bucket_name}/scripts/table_scheduler.py,s3://${var.s3_bucket_name}/scripts/table_stats.py"
     "--KAFKA_BOOTSTRAP_SERVERS"          = var.kafka_bootstrap_servers
     "--REGION"                           = var.aws_region
     "--enable-continuous-cloudwatch-log" = "true"
     "--enable-metrics"                   = ""
     "--additional-python-modules"        = "pyiceberg==0.5.1"
     "--datalake-formats"                 = "iceberg"
+    "--conf"                             = "spark.sql.extensions=org.apache.iceberg.spark.extensions.IcebergSparkSessionExtensions"
   }
 
   worker_type       = var.worker_type
@@ -142,11 +146,13 @@ resource "aws_glue_job" "gold_processor" {
     "--JOB_NAME"                         = "${var.project_name}-${var.environment}-gold-processor"
     "--DATABASE_NAME"                    = "cdc_demo"
     "--S3_BUCKET"                        = var.s3_bucket_name
+    "--extra-py-files"                   = "s3://${var.s3_bucket_name}/scripts/gold_incremental.py,s3://${var.s3_bucket_name}/scripts/gold_rollups.py,s3://${var.s3_bucket_name}/scripts/hll_sketch.py,s3://${var.s3_bucket_name}/scripts/iceberg_tables.py,s3://${var.s3_bucket_name}/scripts/job_metrics.py,s3://${var.s3_bucket_name}/scripts/job_runtime.py,s3://${var.s3_bucket_name}/scripts/skew_joins.py,s3://${var.s3_bucket_name}/scripts/spark_tuning.py,s3://${var.s3_bucket_name}/scripts/table_scheduler.py,s3://${var.s3_bucket_name}/scripts/table_stats.py"
     "--REGION"                           = var.aws_region
     "--enable-continuous-cloudwatch-log" = "true"
     "--enable-metrics"                   = ""
     "--additional-python-modules"        = "pyiceberg==0.5.1"
     "--datalake-formats"                 = "iceberg"
+    "--conf"                             = "spark.sql.extensions=org.apache.iceberg.spark.extensions.IcebergSparkSessionExtensions"
   }
 
   worker_type       = var.worker_type
@@ -158,6 +164,45 @@ resource "aws_glue_job" "gold_processor" {
   })
 }
 
+# Continuous Bronze/Silver from Kafka; while it runs, schedule the batch job
+# with --RUN_LAYERS maintenance only so the two never MERGE the same table.
+resource "aws_glue_job" "cdc_streaming" {
+  count        = var.enable_streaming_job ? 1 : 0
+  name         = "${var.project_name}-${var.environment}-cdc-streaming"
+  role_arn     = aws_iam_role.glue_role.arn
+  glue_version = "4.0"
+
+  command {
+    name            = "gluestreaming"
+    python_version  = "3"
+    script_location = "s3://${var.s3_bucket_name}/scripts/cdc_streaming.py"
+  }
+
+  execution_property { max_concurrent_runs = 1 }
+
+  default_arguments = {
+    "--JOB_NAME"                         = "${var.project_name}-${var.environment}-cdc-streaming"
+    "--DATABASE_NAME"                    = "cdc_demo"
+    "--S3_BUCKET"                        = var.s3_bucket_name
+    "--SILVER_LAYOUT"                    = var.silver_layout
+    "--KAFKA_BOOTSTRAP_SERVERS"          = var.kafka_bootstrap_servers
+    "--TRIGGER_SECONDS"                  = tostring(var.streaming_trigger_seconds)
+    "--MAX_OFFSETS_PER_TRIGGER"          = tostring(var.streaming_max_offsets_per_trigger)
+    "--extra-py-files"                   = "s3://${var.s3_bucket_name}/scripts/cdc_collapse.py,s3://${var.s3_bucket_name}/scripts/cdc_processor.py,s3://${var.s3_bucket_name}/scripts/cdc_schemas.py,s3://${var.s3_bucket_name}/scripts/iceberg_maintenance.py,s3://${var.s3_bucket_name}/scripts/iceberg_tables.py,s3://${var.s3_bucket_name}/scripts/job_metrics.py,s3://${var.s3_bucket_name}/scripts/job_runtime.py,s3://${var.s3_bucket_name}/scripts/raw_compactor.py,s3://${var.s3_bucket_name}/scripts/raw_manifest.py,s3://${var.s3_bucket_name}/scripts/silver_catchup.py,s3://${var.s3_bucket_name}/scripts/skew_joins.py,s3://${var.s3_bucket_name}/scripts/spark_tuning.py,s3://${var.s3_bucket_name}/scripts/table_scheduler.py,s3://${var.s3_bucket_name}/scripts/table_stats.py"
+    "--enable-continuous-cloudwatch-log" = "true"
+    "--enable-metrics"                   = ""
+    "--datalake-formats"                 = "iceberg"
+    "--conf"                             = "spark.sql.extensions=org.apache.iceberg.spark.extensions.IcebergSparkSessionExtensions"
+  }
+
+  worker_type       = var.worker_type
+  number_of_workers = var.number_of_workers
+
+  tags = merge(var.tags, {
+    Name = "${var.project_name}-${var.environment}-cdc-streaming"
+  })
+}
+
 resource "aws_glue_catalog_database" "data_lake" {
   name        = "${var.project_name}_${var.environment}_data_lake"
   description = "CDC Pipeline Data Lake Database"
@@ -185,6 +230,8 @@ resource "null_resource" "upload_glue_scripts" {
     # Recreate when scripts change
     cdc_script_hash  = fileexists("${path.module}/../../glue/cdc_processor.py") ? filesha256("${path.module}/../../glue/cdc_processor.py") : "none"
     gold_script_hash = fileexists("${path.module}/../../glue/gold_processor.py") ? filesha256("${path.module}/../../glue/gold_processor.py") : "none"
+    # Helper modules shipped to the jobs through --extra-py-files
+    lib_scripts_hash = sha256(join(",", [for f in sort(fileset("${path.module}/../../glue", "*.py")) : filesha256("${path.module}/../../glue/${f}")]))
   }
 
   provisioner "local-exec" {
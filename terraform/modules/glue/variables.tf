@@ -45,6 +45,30 @@ variable "kafka_bootstrap_servers" {
   sensitive   = true
 }
 
+variable "silver_layout" {
+  type        = string
+  default     = "days"
+  description = "Silver partition layout: days (days(processed_at)) or bucket (bucket(N, id))"
+}
+
+variable "enable_streaming_job" {
+  type        = bool
+  default     = false
+  description = "Create the continuous Kafka -> Bronze/Silver streaming job"
+}
+
+variable "streaming_trigger_seconds" {
+  type        = number
+  default     = 60
+  description = "Micro-batch trigger interval of the streaming job"
+}
+
+variable "streaming_max_offsets_per_trigger" {
+  type        = number
+  default     = 500000
+  description = "Kafka offsets read per micro-batch across all CDC topics"
+}
+
 variable "tags" {
   type = map(string)
   default = {
@@ -0,0 +1,25 @@
+import os
+import sys
+
+import pytest
+
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The Glue helper modules, and the local Spark session and data generators the benchmarks use
+for path in (os.path.join(REPO_ROOT, "glue"), os.path.join(REPO_ROOT, "benchmarks")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+
+@pytest.fixture(scope="session")
+def spark(tmp_path_factory):
+    pytest.importorskip("pyspark")
+    from local_spark import create_local_spark
+
+    session = create_local_spark(str(tmp_path_factory.mktemp("warehouse")), "cdc-tests", {
+        "spark.scheduler.mode": "FAIR",
+        "spark.sql.shuffle.partitions": "4",
+    })
+    yield session
+    session.stop()
@@ -0,0 +1,22 @@
+import pytest
+
+pytest.importorskip("pyspark")
+
+from hll_accuracy import measure, synthetic_orders  # noqa: E402
+from hll_sketch import hll_sketch  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def orders_df(spark):
+    return synthetic_orders(spark, 200000, 50000, 62).localCheckpoint()
+
+
+# 6 uses the small-register bias constant, 10 and up the closed form
+@pytest.mark.parametrize("precision", [6, 10, 12])
+@pytest.mark.parametrize("grain", ["day", "week", "month"])
+def test_estimates_within_error_bound(spark, orders_df, precision, grain):
+    daily_df = hll_sketch(orders_df, ["date_key"], "user_id", precision, "customer_sketch")
+    result = measure(orders_df, daily_df, grain, precision)
+    # About 95% of estimates fall within twice the standard error; beyond
+    # four times it is a bug rather than bad luck
+    assert result["max_relative_error"] <= 4 * result["standard_error_bound"], result